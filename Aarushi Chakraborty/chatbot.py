@@ -1,15 +1,29 @@
 import streamlit as st
 import requests
-import json
-import threading
 import time
+import sys
+import uuid
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import fitz
-from langdetect import detect, DetectorFactory
 
-DetectorFactory.seed = 0
+# Shared ClauseEase toolkit lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clauseease import (api_client, archive, chat_view, doc_registry, encoding, extractors, language, lazy,
+                        legal_chunker, metrics, ollama_client, profiling, spool, summary_tree,
+                        translation_memory, versioning)
+from clauseease.embeddings import default_library
+from clauseease.diagnostics import render_diagnostics_panel
+from clauseease.scheduler import (
+    BULK, INTERACTIVE, CancelToken, GenerationCancelled, SchedulerBusy, default_scheduler,
+)
+
+metrics.start_http_exporter()
 
 st.set_page_config(page_title="Chatbot", layout="wide")
+# File parsers and langdetect load on first use; warm them up in the background meanwhile
+lazy.prewarm()
 st.markdown("""
 <style>
 header .stAppName { 
@@ -82,100 +96,399 @@ st.markdown("""
 
 
 
-# PDF / TXT Processing
-def is_pdf_file(file_bytes: bytes) -> bool:
-    return b"%PDF" in file_bytes[:64]
+# Upload Loading
+SPOOLED_WINDOW_BYTES = 16000
 
-def extract_pdf_fast(file_bytes: bytes) -> str:
-    try:
-        doc = fitz.open(stream=file_bytes, filetype="pdf")
-        return "\n".join(page.get_text("text") for page in doc)
-    except:
-        return ""
+def charge(name, n):
+    """Reserve ``n`` bytes of the session's memory budget for document ``name``."""
+    if not st.session_state.mem_budget.try_acquire(n):
+        return False
+    st.session_state.mem_charges[name] = st.session_state.mem_charges.get(name, 0) + n
+    return True
+
+def release_charge(name):
+    st.session_state.mem_budget.release(st.session_state.mem_charges.pop(name, 0))
 
-def chunk_text(text, chunk_size=800):
-    words = text.split()
-    out, cur = [], []
-    for w in words:
-        cur.append(w)
-        if sum(len(x) + 1 for x in cur) >= chunk_size:
-            out.append(" ".join(cur))
-            cur = []
-    if cur:
-        out.append(" ".join(cur))
-    return out
+def release_document(name):
+    """Drop this session's handle to a document and return its memory budget."""
+    info = st.session_state.pdf_data.pop(name, None)
+    if info is not None:
+        info.release()
+    release_charge(name)
+
+def load_upload(file):
+    """Return (full_text, chunks); very large text uploads are memory-mapped, not decoded whole."""
+    budget = st.session_state.mem_budget
+    kind = extractors.sniff(file.getbuffer()[:extractors.SNIFF_BYTES], file.name)
+    text_like = kind in (extractors.TXT, extractors.CSV)
+
+    # Large text (or text over the session ceiling) is spooled; full_text keeps only a leading window
+    if text_like and (spool.is_large(file.size) or not charge(file.name, file.size)):
+        file_encoding = encoding.detect_encoding(file.getbuffer())
+        if spool.byte_splittable(file_encoding):
+            doc = spool.SpooledDocument(file, encoding=file_encoding, budget=budget)
+            return doc.decode(0, min(doc.size, SPOOLED_WINDOW_BYTES)), doc.chunks
+        # UTF-16 and the like cannot be chunked by byte offsets, so they are decoded whole and must fit
+        if not charge(file.name, file.size):
+            raise spool.BudgetExceeded("this session's memory limit is reached. Start a New Chat to free earlier files.")
+    if not text_like and not charge(file.name, file.size):
+        raise spool.BudgetExceeded("this session's memory limit is reached. Start a New Chat to free earlier files.")
+
+    # Format is sniffed from the content; the text is extracted once.
+    # Content-defined chunks keep their hashes across revisions of the same contract
+    full_text = extractors.extract(file.getvalue(), file.name).text
+    return full_text, versioning.cdc_chunks(full_text)
 
 
 # Ollama Streaming
-stop_flag = threading.Event()
+@st.cache_resource
+def get_scheduler():
+    # One scheduler per server process, shared by every session and background job
+    return default_scheduler()
 
 def stop_generation():
-    stop_flag.set()
+    st.session_state.cancel_token.cancel()
+    st.session_state.pending = None
+    st.session_state.generating = False
+    st.session_state.stopped = True
+
+def get_api():
+    # Thin-client mode (CLAUSEEASE_API_URL set): processing runs in the ClauseEase API service
+    return api_client.from_env(user=st.session_state.session_id)
+
+def local_stream(prompt, priority=INTERACTIVE, affinity=None):
+    # Users asking the same thing at once share one generation; only the first takes a slot
+    user, scheduler = st.session_state.session_id, get_scheduler()
+    return ollama_client.coalesced_stream(
+        prompt, model="llama3:latest", timeout=300, cancel_token=st.session_state.cancel_token,
+        affinity=affinity, slot=lambda token: scheduler.slot(user, priority, token),
+    )
 
-def stream_resp(prompt):
+def stream_resp(prompt, priority=INTERACTIVE, affinity=None):
+    """Stream a reply; ``affinity`` (a file name) keeps follow-ups on the same Ollama server."""
+    api = get_api()
+    if api:
+        return render_stream(api.chat(prompt, cancel_token=st.session_state.cancel_token))
+    return render_stream(local_stream(prompt, priority, affinity))
+
+def render_stream(pieces):
+    """Show streamed text as it arrives; returns the final reply."""
+    placeholder = st.empty()
+    reply = ""
     try:
-        r = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "llama3:latest", "prompt": prompt},
-            stream=True,
-            timeout=300,
-        )
-        placeholder = st.empty()
-        reply = ""
         last = time.time()
-
-        for line in r.iter_lines():
-            if stop_flag.is_set():
-                break
-            if line:
-                data = json.loads(line.decode("utf-8"))
-                if "response" in data:
-                    reply += data["response"]
-                    if time.time() - last > 0.1:
-                        placeholder.markdown(reply + "▌")
-                        last = time.time()
+        for piece in pieces:
+            reply += piece
+            if time.time() - last > 0.1:
+                placeholder.markdown(reply + "▌")
+                last = time.time()
 
         placeholder.markdown(reply.strip() or "*No response*")
         return reply.strip()
 
+    except GenerationCancelled:
+        # Keep what was already shown
+        placeholder.markdown((reply.strip() + "\n\n" if reply.strip() else "") + "*Generation stopped*")
+        return reply.strip()
+    except SchedulerBusy as e:
+        st.warning(str(e))
+        return ""
     except Exception as e:
         st.error(f"Error connecting to Ollama: {e}")
         return ""
 
 
-# Helpers
-def fast_detect_lang(text: str) -> str:
-    snippet = text[:500].strip()
-    if not snippet or snippet.isascii():
-        return "English"
-    try:
-        lang_code = detect(snippet)
-        mapping = {
-            "en": "English","hi": "Hindi","es": "Spanish","fr": "French","de": "German",
-            "zh-cn": "Chinese","zh-tw": "Chinese","ru": "Russian","ja": "Japanese",
-            "ko": "Korean","ar": "Arabic","it": "Italian","bn": "Bengali"
-        }
-        return mapping.get(lang_code, lang_code)
-    except:
-        return "Unknown"
-
-
 # Summaries / Translation / Q&A
-def summarize_file(name):
+def summarize_file(name, request=""):
     info = st.session_state.pdf_data.get(name)
-    return stream_resp(f"Summarize the following text:\n\n{info['full_text'][:4000]}")
+    api = get_api()
+    if api:
+        return render_stream(api.summarize(info, request, cancel_token=st.session_state.cancel_token))
+    tree = info.get("tree")
+    # Precomputed in the background after upload: answer instantly when it is there
+    if tree is not None:
+        request = request.lower().replace(name.lower(), "")
+        section = tree.section_summary(request)
+        if section:
+            return section
+        if tree.ready and not tree.find_section(request):
+            return tree.document_summary
+    return stream_resp(f"Summarize the following text:\n\n{info['full_text'][:4000]}", priority=BULK,
+                       affinity=name)
 
 def translate_file(name):
     info = st.session_state.pdf_data.get(name)
-    return stream_resp(
-        f"The text is in {info['lang']}. Translate it to English:\n\n{info['original_text'][:4000]}"
-    )
+    api = get_api()
+    if api:
+        return render_stream(api.translate(info, cancel_token=st.session_state.cancel_token))
+    tree = info.get("tree")
+    if tree is not None and tree.translation:
+        return tree.translation
+    if tree is not None and tree.ready:
+        return summary_tree.ALREADY_ENGLISH
+
+    # Sentences translated before (in any document) come from the translation memory
+    def translated():
+        yield translation_memory.default_memory().translate(
+            info["original_text"][:4000], info["lang"], lambda prompt: "".join(local_stream(prompt, BULK, name)),
+            cancel_token=st.session_state.cancel_token,
+        )
+
+    with st.spinner("Translating..."):
+        return render_stream(translated())
+
+def retrieve(info, question, k=5):
+    """Top chunks by embedding similarity; embeddings of unchanged chunks come from the cache."""
+    if not isinstance(info["chunks"], list):
+        return []
+    # One index holds every open document; the question searches this document's rows of it
+    library = default_library()
+    try:
+        library.sync(info["key"], info["chunks"])
+        return [text for _, text in library.search(question, k=k, docs=[info["key"]])]
+    except requests.RequestException:
+        # No embedding model on the server: fall back to the leading window
+        return []
 
 def answer_from_file(name, question):
     info = st.session_state.pdf_data.get(name)
+    api = get_api()
+    if api:
+        return render_stream(api.ask(info, question, cancel_token=st.session_state.cancel_token))
+    clauses = info.get("clauses")
+    keys, clause_chunks = clauses.resolve(question) if clauses else ([], [])
+    if clause_chunks:
+        # The question names a clause: send just that clause
+        clause_text = "\n\n".join(c["text"] for c in clause_chunks)
+        return stream_resp(
+            f"Use only these clauses ({', '.join(keys)}) to answer.\n\nCLAUSES:\n{clause_text}\n\nQ:{question}\nA:",
+            affinity=name,
+        )
+    passages = retrieve(info, question)
+    context = "\n\n".join(passages) if passages else info["full_text"][:4000]
     return stream_resp(
-        f"Use only this document to answer.\n\nDOC:\n{info['full_text'][:4000]}\n\nQ:{question}\nA:"
+        f"Use only this document to answer.\n\nDOC:\n{context}\n\nQ:{question}\nA:",
+        affinity=name,
+    )
+
+
+# File Handling
+@st.cache_resource
+def get_registry():
+    # Documents are shared by every session on this server, keyed by content hash
+    return doc_registry.default_registry()
+
+def close_document(fields):
+    # Runs when the registry evicts the document: stop background work, unmap spooled files
+    if fields["tree"] is not None:
+        fields["tree"].cancel()
+    if fields.get("spooled") is not None:
+        fields["spooled"].close()
+    default_library().drop(fields["key"])
+
+def ingest(key, file):
+    """Extract, chunk and index an upload; runs once per unique file content on the server."""
+    full_text, chunks = load_upload(file)
+
+    with metrics.stage_timer("language_detection"):
+        lang = language.detect_language(full_text)
+
+    # Clause index for direct section lookup (skipped for spooled files: full_text is only a window)
+    clauses = legal_chunker.ClauseIndex.from_text(full_text) if isinstance(chunks, list) else None
+    return document_fields(key, file.name, full_text, chunks, lang, clauses)
+
+def ingest_prepared(key, name, prepared):
+    """Document fields from the output of the ingestion pipeline (archive members)."""
+    clauses = legal_chunker.ClauseIndex(prepared["clause_chunks"])
+    return document_fields(key, name, prepared["full_text"], prepared["chunks"], prepared["lang"], clauses)
+
+def document_fields(key, name, full_text, chunks, lang, clauses):
+    # Revisions of the same contract share a family; unchanged chunks reuse earlier work
+    family = versioning.document_family(name)
+    diff = versioning.default_store().add_version(family, chunks) if isinstance(chunks, list) else None
+
+    # Chunk -> section -> document summaries (and a translation) are precomputed in the background;
+    # summaries are cached by content, so only changed clauses are summarised again
+    tree = summary_tree.for_document(name, clauses.chunks if clauses else chunks, lang=lang, source_text=full_text)
+
+    return {
+        # Content hash: the document's registry key and its name in the library index
+        "key": key,
+        "full_text": full_text,
+        "chunks": chunks,
+        "chunk_count": len(chunks),
+        "preview": full_text[:500],
+        "clauses": clauses,
+        "tree": tree,
+        "lang": lang,
+        "original_text": full_text,
+        "family": family,
+        "diff": diff,
+        # Spooled uploads keep a temp file and memory map open until the document is evicted
+        "spooled": chunks.doc if isinstance(chunks, spool.LazyChunks) else None,
+    }
+
+def archive_member_name(member):
+    # Questions name files by their base name; keep the folder only if that is taken
+    name = posixpath.basename(member)
+    return member if name in st.session_state.pdf_data else name
+
+def process_archive(file):
+    """Ingest every contract in a ZIP upload, with per-file progress; returns the summary message."""
+    api = get_api()
+    registry = get_registry()
+    session_keys = {info.key for info in st.session_state.pdf_data.values()}
+    attached = {}
+
+    def known(key):
+        # In this chat already, or ingested by another session: attach it without extracting again
+        if key in session_keys:
+            return True
+        handle = registry.lookup(key) if api is None else None
+        if handle is not None:
+            attached[key] = handle
+        return handle is not None
+
+    if api:
+        # The API server extracts in its own process pool; keep several uploads in flight
+        options = {"process": api.upload, "executor": ThreadPoolExecutor(max_workers=8), "max_pending": 16}
+    else:
+        options = {}
+
+    counts = {"added": 0, archive.DUPLICATE: 0, archive.SKIPPED: 0, archive.FAILED: 0}
+    problems = []
+    with zipfile.ZipFile(file) as zf:
+        total = archive.member_count(zf)
+        progress = st.progress(0.0, text=f"Reading `{file.name}`...")
+        for done, result in enumerate(archive.ingest(zf, skip=known, **options), 1):
+            status = result.status
+            name = archive_member_name(result.name)
+            try:
+                if status == archive.PREPARED:
+                    if api:
+                        info = result.value
+                    else:
+                        if not charge(name, len(result.value["full_text"])):
+                            raise spool.BudgetExceeded("this session's memory limit is reached")
+                        info = registry.acquire(
+                            result.key, lambda: ingest_prepared(result.key, result.name, result.value),
+                            cleanup=close_document,
+                        )
+                elif status == archive.DUPLICATE and result.key in attached:
+                    info = attached.pop(result.key)
+                else:
+                    info = None
+            except Exception as e:
+                release_charge(name)
+                status, info = archive.FAILED, None
+                result = result._replace(error=str(e))
+
+            if info is not None:
+                st.session_state.pdf_data[name] = info
+                session_keys.add(result.key)
+                counts["added"] += 1
+            else:
+                counts[status] += 1
+                if status == archive.FAILED:
+                    problems.append(f"- `{result.name}`: {result.error}")
+            progress.progress(done / max(total, 1), text=f"{done}/{total} · `{result.name}`: {status}")
+        progress.empty()
+
+    if api:
+        options["executor"].shutdown(wait=False)
+    message = (
+        f"Archive `{file.name}`: **{counts['added']} documents** added, "
+        f"{counts[archive.DUPLICATE]} already processed, {counts[archive.SKIPPED]} skipped, "
+        f"{counts[archive.FAILED]} failed."
+    )
+    if problems:
+        message += "\n\n" + "\n".join(problems[:20]) + ("\n- ..." if len(problems) > 20 else "")
+    return message
+
+def process_uploads(uploaded_files):
+    """Attach uploads not seen in this session; returns True if any were added."""
+    new = False
+    for file in uploaded_files:
+        if file.name in st.session_state.uploaded_names:
+            continue
+
+        st.session_state.uploaded_names.append(file.name)
+
+        if archive.is_archive(file.getbuffer()[:extractors.SNIFF_BYTES], file.name):
+            # Contract bundles: every member goes through the parallel pipeline
+            try:
+                content = process_archive(file)
+            except zipfile.BadZipFile as e:
+                content = f"Could not read `{file.name}`: {e}"
+            st.session_state.msgs.append({"role": "assistant", "content": content})
+            new = True
+            continue
+
+        try:
+            api = get_api()
+            if api:
+                info = api.upload(file.getvalue(), file.name)
+            else:
+                key = doc_registry.content_key(file.getbuffer())
+                # ?profile=<token> profiles this ingestion, labelled with the document hash
+                with profiling.profile("ingest", label=key, enabled=profiling.requested(st.query_params)):
+                    info = get_registry().acquire(key, lambda: ingest(key, file), cleanup=close_document)
+        except Exception as e:
+            release_charge(file.name)
+            st.session_state.msgs.append({
+                "role": "assistant",
+                "content": f"Could not read `{file.name}`: {e}"
+            })
+            new = True
+            continue
+        preview = info["preview"]
+
+        st.session_state.msgs.append({
+            "role": "assistant",
+            "content": (
+                f"Processing `{file.name}`...\n\n"
+                f"Preview:\n```text\n{preview}\n```"
+            )
+        })
+
+        # The session keeps a handle; the text, chunks and summaries are shared
+        st.session_state.pdf_data[file.name] = info
+
+        st.session_state.msgs.append({
+            "role": "assistant",
+            "content": (
+                f"Your file `{file.name}` has been processed into **{info['chunk_count']} chunks**.\n"
+                f"Language detected: **{info['lang']}**.\n"
+                "How can I help with this?"
+            )
+        })
+        diff = info["diff"]
+        if diff and diff["previous"] and not info.shared:
+            st.session_state.msgs.append({
+                "role": "assistant",
+                "content": (
+                    f"This looks like version {diff['version']} of `{info['family']}`: "
+                    f"{len(diff['reused'])} chunks are unchanged and reused, "
+                    f"{len(diff['added'])} changed and {len(diff['removed'])} removed."
+                )
+            })
+
+        new = True
+
+    return new
+
+
+@chat_view.fragment
+def upload_panel():
+    # Runs as a fragment: picking files does not re-render the chat
+    uploaded_files = st.file_uploader(
+        "",
+        accept_multiple_files=True,
+        key=f"uploader_{st.session_state.upload_key}",
+        label_visibility="collapsed"
     )
+    if uploaded_files and process_uploads(uploaded_files):
+        st.rerun()
 
 
 # Session State
@@ -185,7 +498,12 @@ for key, default in {
     "uploaded_names": [],
     "generating": False,
     "pdf_data": {},
-    "upload_key": 0
+    "upload_key": 0,
+    "session_id": uuid.uuid4().hex,
+    "cancel_token": CancelToken(),
+    "mem_budget": spool.MemoryBudget(),
+    "mem_charges": {},
+    "pending": None,
 }.items():
     st.session_state.setdefault(key, default)
 
@@ -197,7 +515,10 @@ with st.sidebar:
         if len(st.session_state.msgs) > 1:
             st.session_state.hist.append(st.session_state.msgs)
         st.session_state.msgs = [{"role":"assistant","content":"Hello! How can I help you today?"}]
-        st.session_state.pdf_data = {}
+        chat_view.reset()
+        # Shared documents stay cached for other sessions; only this session's handles go
+        for name in list(st.session_state.pdf_data):
+            release_document(name)
         st.session_state.uploaded_names = []
         st.session_state.upload_key += 1
         st.rerun()
@@ -205,12 +526,7 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("<div class='upload-heading'>Upload Files</div>", unsafe_allow_html=True)
 
-    uploaded_files = st.file_uploader(
-        "",
-        accept_multiple_files=True,
-        key=f"uploader_{st.session_state.upload_key}",
-        label_visibility="collapsed"
-    )
+    upload_panel()
 
     st.markdown("---")
     st.markdown("<h2 style='text-align: left; color: white;'>Previous Chats</h2>", unsafe_allow_html=True)
@@ -235,17 +551,19 @@ with st.sidebar:
 
             if st.button(f"Chat {idx+1}: {summary}", key=f"hist_{idx}", use_container_width=True):
                 st.session_state.msgs = chat
+                chat_view.reset()
                 st.session_state.uploaded_names = [
                     m["file_name"] for m in chat if m.get("type") == "file"
                 ]
                 st.session_state.upload_key += 1
                 st.rerun()
 
+    st.markdown("---")
+    render_diagnostics_panel()
+
 
 # Chat Window
-for msg in st.session_state.msgs:
-    with st.chat_message(msg["role"]):
-        st.write(msg["content"])
+chat_view.render_messages(st.session_state.msgs)
 
 
 # Chat Input
@@ -253,25 +571,38 @@ input_text = st.chat_input("Ask me anything...")
 
 if input_text and not st.session_state.generating:
     st.session_state.msgs.append({"role":"user","content":input_text})
-    with st.chat_message("user"):
-        st.write(input_text)
-
     st.session_state.generating = True
-    stop_flag.clear()
+    st.session_state.cancel_token.reset()
+    st.session_state.pending = input_text
 
-    with st.chat_message("assistant"):
+
+@chat_view.fragment
+def live_reply():
+    # The streaming reply is a fragment: its Stop button does not re-render the history
+    if st.session_state.pop("stopped", False):
+        st.rerun()
+    input_text = st.session_state.pending
+    if not input_text:
+        return
+
+    with st.chat_message("user"):
+        st.markdown(chat_view.prepare_markdown(input_text))
+
+    # ?profile=<token> profiles this answer, including the generation thread; labelled with the document hash
+    profiled = profiling.profile("answer", label="chat", enabled=profiling.requested(st.query_params))
+    with st.chat_message("assistant"), profiled as run:
         st.button("Stop Generation", on_click=stop_generation)
         with st.spinner("Thinking..."):
-
             text = input_text.lower()
             data = st.session_state.pdf_data
             reply = None
+            target = None
 
             if "summarize" in text and data:
                 target = next((fn for fn in data if fn.lower() in text), None)
                 if not target and len(data) == 1:
                     target = list(data.keys())[0]
-                reply = summarize_file(target) if target else "Which file?"
+                reply = summarize_file(target, input_text) if target else "Which file?"
 
             if reply is None and "translate" in text and data:
                 target = next((fn for fn in data if fn.lower() in text), None)
@@ -281,74 +612,20 @@ if input_text and not st.session_state.generating:
 
             if reply is None and data:
                 target = next((fn for fn in data if fn.lower() in text), None)
+                if not target and len(data) == 1 and legal_chunker.find_references(input_text):
+                    target = list(data.keys())[0]
                 if target:
                     reply = answer_from_file(target, input_text)
 
             if reply is None:
                 reply = stream_resp(input_text)
+            if run is not None and target in data:
+                run.label = data[target].key
 
     st.session_state.msgs.append({"role":"assistant","content":reply})
+    st.session_state.pending = None
     st.session_state.generating = False
     st.rerun()
 
 
-# File Handling
-if uploaded_files:
-    new = False
-    for file in uploaded_files:
-        if file.name in st.session_state.uploaded_names:
-            continue
-
-        st.session_state.uploaded_names.append(file.name)
-        file_bytes = file.getvalue()
-        suffix = Path(file.name).suffix.lower()
-
-        is_pdf = (suffix == ".pdf") or is_pdf_file(file_bytes)
-
-        if is_pdf:
-            preview = extract_pdf_fast(file_bytes)[:500]
-        else:
-            try:
-                preview = file_bytes.decode("utf-8", errors="ignore")[:500]
-            except:
-                preview = file_bytes.decode("latin-1", errors="ignore")[:500]
-
-        st.session_state.msgs.append({
-            "role": "assistant",
-            "content": (
-                f"Processing `{file.name}`...\n\n"
-                f"Preview:\n```text\n{preview}\n```"
-            )
-        })
-
-        if is_pdf:
-            full_text = extract_pdf_fast(file_bytes)
-        else:
-            try:
-                full_text = file_bytes.decode("utf-8", errors="ignore")
-            except:
-                full_text = file_bytes.decode("latin-1", errors="ignore")
-
-        lang = fast_detect_lang(full_text)
-        chunks = chunk_text(full_text)
-
-        st.session_state.pdf_data[file.name] = {
-            "full_text": full_text,
-            "chunks": chunks,
-            "lang": lang,
-            "original_text": full_text,
-        }
-
-        st.session_state.msgs.append({
-            "role": "assistant",
-            "content": (
-                f"Your file `{file.name}` has been processed into **{len(chunks)} chunks**.\n"
-                f"Language detected: **{lang}**.\n"
-                "How can I help with this?"
-            )
-        })
-
-        new = True
-
-    if new:
-        st.rerun()
+live_reply()
@@ -1,8 +1,12 @@
 import streamlit as st
-import ollama
-import pandas as pd
-import PyPDF2
 import json
+import sys
+from pathlib import Path
+
+# Shared ClauseEase toolkit lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clauseease import chat_view, extractors, lazy, metrics, ollama_client, router, tuning
+from clauseease.tabular import TableIndex, read_csv_columnar
 
 # -------------------------------
 # Helper: Text Chunking Function
@@ -32,13 +36,17 @@ def chunk_text(text, chunk_size=500, overlap=100):
 
 # Page Configuration
 st.set_page_config(page_title="🤖 Chatbot", page_icon="🤖", layout="wide")
+# Parsers and pandas load on first upload; warm them up in the background meanwhile
+lazy.prewarm(lazy.PREWARM_MODULES + ("pandas",))
 st.title("🤖 Local Ollama Chatbot")
 
 # Sidebar for Chat History & Model Selection
 st.sidebar.title("💬 Chat History")
 
 # Model selector (from your installed models)
+AUTO_MODEL = "Auto (route by task)"
 available_models = [
+    AUTO_MODEL,
     "phi3:latest",
     "mistral:latest",
     "gemma2:2b",
@@ -60,6 +68,8 @@ if "doc_json" not in st.session_state:
     st.session_state.doc_json = None
 if "chunks" not in st.session_state:
     st.session_state.chunks = []
+if "table" not in st.session_state:
+    st.session_state.table = None
 
 file_content = ""
 
@@ -67,21 +77,19 @@ if uploaded_file is not None:
     st.sidebar.success(f"Uploaded: {uploaded_file.name}")
 
     # -------- Extract File Content --------
-    if uploaded_file.type == "text/plain":
-        file_content = uploaded_file.read().decode("utf-8")
-        st.sidebar.text_area("File Preview (Text)", file_content[:400], height=150)
-
-    elif uploaded_file.type == "application/pdf":
-        pdf_reader = PyPDF2.PdfReader(uploaded_file)
-        for page in pdf_reader.pages:
-            file_content += page.extract_text() or ""
-        st.sidebar.text_area("File Preview (PDF)", file_content[:400], height=150)
-
-    elif uploaded_file.type == "text/csv":
-        df = pd.read_csv(uploaded_file)
+    file_kind = extractors.sniff(uploaded_file.getvalue(), uploaded_file.name)
+
+    if file_kind == extractors.CSV:
+        # Keep the table columnar; only the schema summary is chunked as text
+        df = read_csv_columnar(uploaded_file)
         st.sidebar.dataframe(df.head())
-        # You can decide how to convert CSV into text; here we use head as text
-        file_content = df.to_csv(index=False)
+        st.session_state.table = TableIndex(df, name=uploaded_file.name)
+        file_content = st.session_state.table.schema_summary()
+
+    else:
+        file_content = extractors.extract(uploaded_file.getvalue(), uploaded_file.name, kind=file_kind).text
+        st.sidebar.text_area(f"File Preview ({file_kind.upper()})", file_content[:400], height=150)
+        st.session_state.table = None
 
     # -------- Store as JSON --------
     st.session_state.doc_json = {
@@ -92,7 +100,9 @@ if uploaded_file is not None:
 
     # -------- Chunking Process --------
     if file_content.strip():
-        raw_chunks = chunk_text(file_content, chunk_size=800, overlap=150)
+        # Calibrated with `python -m clauseease.calibrate`; 800/150 until then
+        chunk_size, overlap = tuning.chunk_settings(default=(800, 150))
+        raw_chunks = chunk_text(file_content, chunk_size=chunk_size, overlap=overlap)
         st.session_state.chunks = [
             {"id": i, "text": chunk}
             for i, chunk in enumerate(raw_chunks)
@@ -160,7 +170,11 @@ user_input = st.chat_input("Type your message...")
 if user_input and st.session_state.current:
 
     # Use chunked document as context instead of just first 200 chars
-    context_text = build_context_from_chunks(max_chars=2000)
+    with metrics.stage_timer("retrieval"):
+        if st.session_state.table is not None:
+            context_text = st.session_state.table.context_for(user_input)
+        else:
+            context_text = build_context_from_chunks(max_chars=2000)
 
     if context_text:
         final_prompt = f"""
@@ -178,12 +192,21 @@ Document Chunks:
     else:
         final_prompt = user_input
 
-    # Send prompt to selected Ollama model
-    response = ollama.chat(
-        model=model_name,
-        messages=[{"role": "user", "content": final_prompt}]
-    )
-    bot_reply = response['message']['content']
+    # Send prompt to selected Ollama model (or let the router pick one)
+    # Aggregations over a CSV are computed in pandas, no LLM call needed
+    computed = st.session_state.table.answer_aggregate(user_input) \
+        if st.session_state.table is not None else None
+
+    if computed:
+        bot_reply = computed
+    else:
+        task = router.QA if context_text else router.CHAT
+        chosen_model, options = router.route(
+            task, final_prompt, override=None if model_name == AUTO_MODEL else model_name
+        )
+        bot_reply = ollama_client.chat(
+            [{"role": "user", "content": final_prompt}], model=chosen_model, options=options
+        )
 
     # Save Messages
     st.session_state.chats[st.session_state.current].append(("You", user_input))
@@ -191,5 +214,8 @@ Document Chunks:
 
 # Display Chat Messages
 if st.session_state.current:
-    for role, msg in st.session_state.chats[st.session_state.current]:
-        st.chat_message("user" if role == "You" else "assistant").markdown(msg)
+    chat_view.render_messages(
+        [{"role": "user" if role == "You" else "assistant", "content": msg}
+         for role, msg in st.session_state.chats[st.session_state.current]],
+        key=st.session_state.current,
+    )
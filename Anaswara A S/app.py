@@ -1,54 +1,40 @@
 import streamlit as st
 import random
 import time
-import requests
-import json
-import io 
+import sys
+from pathlib import Path
 
-# Required for document processing
-from pypdf import PdfReader 
-from langchain_text_splitters import RecursiveCharacterTextSplitter 
+# Shared ClauseEase toolkit lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clauseease import chat_view, extractors, lazy, ollama_client, tuning
 
 # ---------------- PAGE SETUP ----------------
 st.set_page_config(page_title="Chatbot", page_icon="🤖", layout="wide")
 
+# Document libraries load on first upload; warm them up in the background meanwhile
+lazy.prewarm(lazy.PREWARM_MODULES + ("langchain_text_splitters",))
+
 # --- File Processing and Chunking ---
 
 def extract_text_from_uploaded_file(uploaded_file):
-    """Extracts text from PDF or plain text files."""
-    file_type = uploaded_file.type
-    file_content = uploaded_file.getvalue()
-    text = ""
-
-    # Handle PDF files
-    if 'pdf' in file_type:
-        try:
-            pdf_reader = PdfReader(io.BytesIO(file_content))
-            for page in pdf_reader.pages:
-                text += page.extract_text() if page.extract_text() else ""
-        except Exception as e:
-            st.error(f"Error extracting text from PDF: {e}")
-            return None
-    
-    # Handle plain text files
-    elif 'text' in file_type or 'json' in file_type:
-        try:
-            text = file_content.decode("utf-8")
-        except Exception as e:
-            st.error(f"Error decoding text file: {e}")
-            return None
-            
-    else:
-        st.warning(f"Unsupported file type: {file_type}. Only PDF and text files are supported.")
+    """Extracts text from PDF, plain text or JSON files."""
+    try:
+        return extractors.extract(uploaded_file.getvalue(), uploaded_file.name).text
+    except extractors.UnsupportedFormat:
+        st.warning(f"Unsupported file type: {uploaded_file.type}. Only PDF and text files are supported.")
+        return None
+    except Exception as e:
+        st.error(f"Error extracting text from file: {e}")
         return None
-        
-    return text
 
 def chunk_text(text, chunk_size=1000, chunk_overlap=200):
     """Chunks the text using a RecursiveCharacterTextSplitter."""
     if not text:
         return []
 
+    # Required for document processing; imported here so chatting alone does not pay for it
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
@@ -69,8 +55,6 @@ def get_ollama_streaming_response(prompt, context_chunks=None, model_name="llama
     Call local Ollama server and yield the model's text response chunks using streaming.
     Takes an optional list of context_chunks (JSON structure).
     """
-    url = "http://localhost:11434/api/generate"
-    
     # Base system prompt
     system_prompt = "You are a helpful, concise, and friendly assistant. Always respond in English. When providing code, always wrap it in a markdown code block."
     
@@ -81,29 +65,9 @@ def get_ollama_streaming_response(prompt, context_chunks=None, model_name="llama
         context_instruction = f"\n\n---CONTEXT---\n\nUse the following document text to answer the user's question. If the answer is not found in the context, state that explicitly. \n\nDOCUMENT TEXT: {context_text}"
         system_prompt += context_instruction
 
-    payload = {
-        "model": model_name,
-        "prompt": prompt,
-        "stream": True,  
-        "system": system_prompt
-    }
-    
-    
     try:
-        with requests.post(url, json=payload, stream=True, timeout=timeout) as resp:
-            resp.raise_for_status()
-            
-            for line in resp.iter_lines():
-                if line:
-                    try:
-                        data = json.loads(line)
-                        response_chunk = data.get("response", "")
-                        yield response_chunk
-                        if data.get("done"):
-                            break
-                    except json.JSONDecodeError:
-                        continue
-                        
+        yield from ollama_client.stream_generate(prompt, model=model_name, system=system_prompt, timeout=timeout)
+
     except Exception as e:
         yield f"[error: Cannot connect to Ollama server or request failed: {e}]"
 
@@ -153,7 +117,8 @@ if uploaded_file is not None:
             
             if raw_text:
                 # 2. Chunk Text
-                file_chunks = chunk_text(raw_text)
+                chunk_size, chunk_overlap = tuning.chunk_settings("llama3.1:8b", default=(1000, 200))
+                file_chunks = chunk_text(raw_text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
                 
                 # 3. Store in Session State
                 st.session_state.current_file_chunks = file_chunks
@@ -186,9 +151,7 @@ st.title("🤖 Chatbot")
 messages = st.session_state.chats[st.session_state.current_chat]
 
 # Display chat messages
-for msg in messages:
-    with st.chat_message(msg["role"]):
-        st.markdown(msg["content"])
+chat_view.render_messages(messages, key=st.session_state.current_chat)
 
 # ---------------- CHAT INPUT ----------------
 if prompt := st.chat_input("Type your message..."):
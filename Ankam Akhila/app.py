@@ -1,15 +1,21 @@
 import streamlit as st
 import requests
-import json
-from PyPDF2 import PdfReader
+import sys
+from pathlib import Path
+
+# Shared ClauseEase toolkit lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clauseease import extractors, language, lazy, ollama_client, translation_memory, tuning
 
 # -------------------------
 # CONFIG
 # -------------------------
 st.set_page_config(page_title="ChatBot", page_icon="💬", layout="wide")
+# PDF parsing and langdetect load on first upload; warm them up in the background meanwhile
+lazy.prewarm((("fitz", "pypdf"), "langdetect"))
 
 MODEL_NAME = "tinyllama"   # Use small model for 8GB RAM
-OLLAMA_URL = "http://localhost:11434"
+# Ollama servers come from OLLAMA_URLS (comma-separated) or OLLAMA_URL; requests are load-balanced
 
 
 # -------------------------
@@ -17,39 +23,32 @@ OLLAMA_URL = "http://localhost:11434"
 # -------------------------
 def check_ollama_alive():
     try:
-        r = requests.get(f"{OLLAMA_URL}/api/version", timeout=3)
-        if r.status_code == 200:
-            return True, r.json()
-        return False, f"HTTP {r.status_code}"
+        return True, ollama_client.version()
+    except requests.HTTPError as e:
+        return False, f"HTTP {e.response.status_code}"
     except Exception as e:
         return False, str(e)
 
 
 def ollama_query(prompt, model=MODEL_NAME):
     try:
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False
-        }
-        r = requests.post(f"{OLLAMA_URL}/api/generate",
-                          json=payload, timeout=60)
-
-        if r.status_code != 200:
-            return f"❌ Ollama error: {r.text}"
-
-        return r.json().get("response", "").strip()
+        return ollama_client.generate(prompt, model=model, timeout=60).strip()
 
+    except requests.HTTPError as e:
+        return f"❌ Ollama error: {e.response.text}"
     except Exception as e:
         return f"❌ Connection error: {e}"
 
 
+def translate_to_english(text, lang):
+    """Translate via the shared translation memory; only unseen sentences reach the model."""
+    return translation_memory.default_memory().translate(
+        text, lang, lambda prompt: ollama_client.generate(prompt, model=MODEL_NAME, timeout=60).strip()
+    )
+
+
 def extract_pdf_text(uploaded_file):
-    reader = PdfReader(uploaded_file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    return text
+    return extractors.extract(uploaded_file.getvalue(), uploaded_file.name).text
 
 
 def chunk_text(text, size=800):
@@ -106,18 +105,32 @@ if uploaded_pdf:
     st.write(text[:1000] + "...")   # Preview only
 
     # Chunking
-    chunks = chunk_text(text)
+    # Calibrated size in characters (about 6 per word); 800 words until calibrated
+    chunk_chars, _ = tuning.chunk_settings(MODEL_NAME, default=(4800, 0))
+    chunks = chunk_text(text, size=max(50, chunk_chars // 6))
 
     st.markdown("### 🧩 Chunks")
     st.info(f"Total chunks: {len(chunks)} (hidden)")   # Only show count
 
+    # Only chunks that are not in English need translating
+    chunk_langs = [language.detect_language(chunk) for chunk in chunks]
+    foreign = sum(language.needs_translation(lang) for lang in chunk_langs)
+    if foreign:
+        st.caption(f"{foreign} of {len(chunks)} chunks will be translated to English")
+
     # Translate + Summarize
     final_summary = ""
 
     with st.spinner("Translating & Summarizing into English..."):
-        for chunk in chunks:
+        for chunk, lang in zip(chunks, chunk_langs):
+            if language.needs_translation(lang):
+                try:
+                    chunk = translate_to_english(chunk, lang)
+                except Exception as e:
+                    final_summary += f"❌ Translation failed: {e}\n\n"
+                    continue
             prompt = f"""
-            Translate the following text to English and summarize it clearly:
+            Summarize the following text clearly:
 
             {chunk}
             """
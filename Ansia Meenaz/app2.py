@@ -1,24 +1,29 @@
 import streamlit as st
-import ollama
 import time
 import json
 import tempfile
 import os
-
-# --- Import Libraries for File Reading ---
-# These are necessary for PDF/DOCX file handling
-try:
-    from pypdf import PdfReader
-except ImportError:
+import sys
+from pathlib import Path
+
+# Shared ClauseEase toolkit lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clauseease import chat_view, extractors, lazy, legal_chunker, ollama_client, router, tuning
+from clauseease.diagnostics import render_diagnostics_panel
+
+# --- Libraries for File Reading ---
+# These are necessary for PDF/DOCX file handling. Only check they are installed here:
+# importing them is left to the first upload (or the background pre-warm below)
+if not (lazy.available("fitz") or lazy.available("pypdf")):
     st.error("Please install pypdf: pip install pypdf")
     st.stop()
 
-try:
-    import docx
-except ImportError:
+if not lazy.available("docx"):
     st.error("Please install python-docx: pip install python-docx")
     st.stop()
 
+lazy.prewarm()
+
 # --- Configuration ---
 OLLAMA_MODEL = 'llama3.2:3b' 
 SYSTEM_PROMPT = """
@@ -37,53 +42,19 @@ def local_css(file_name):
     except FileNotFoundError:
         st.warning(f"{file_name} not found. Custom styles may not load.")
 
-# --- 2. Backend Functions (Chunking & API) ---
-def chunk_text(text, chunk_size=4000, overlap=500):
-    """Splits text into smaller overlapping chunks."""
-    chunks = []
-    start = 0
-    text_len = len(text)
-    while start < text_len:
-        end = start + chunk_size
-        if end < text_len:
-            last_period = text.rfind('.', start, end)
-            if last_period != -1: end = last_period + 1
-            else:
-                last_space = text.rfind(' ', start, end)
-                if last_space != -1: end = last_space
-        chunks.append(text[start:end])
-        start = end - overlap
-        if start >= end: start = end 
-    return chunks
-
+# --- 2. Backend Functions (API) ---
 @st.cache_data 
-def get_ollama_response(messages):
+def get_ollama_response(messages, model=OLLAMA_MODEL, options=None):
     """Calls the Ollama API with message history."""
     try:
-        response = ollama.chat(
-            model=OLLAMA_MODEL,
-            messages=messages, 
-            stream=False
-        )
-        return response['message']['content']
+        return ollama_client.chat(messages, model=model, options=options)
     except Exception as e:
         return f"Error: {e}"
 
 def extract_text_from_file(uploaded_file):
-    """Extracts raw text from PDF or DOCX file object."""
-    text = ""
+    """Extracts raw text from PDF, DOCX or text file object."""
     try:
-        if uploaded_file.type == "application/pdf":
-            reader = PdfReader(uploaded_file)
-            for page in reader.pages:
-                text += page.extract_text() or ""
-        elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            doc = docx.Document(uploaded_file)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        else: 
-            text = uploaded_file.read().decode("utf-8")
-        return text
+        return extractors.extract(uploaded_file.getvalue(), uploaded_file.name).text
     except Exception as e:
         st.error(f"Error reading file: {e}")
         return None
@@ -98,12 +69,12 @@ local_css("style.css")
 with st.sidebar:
     st.title("CLAUSE EASE")
     st.markdown("### *Your Legal Assistant*")
-    st.caption(f"Engine: **{OLLAMA_MODEL}**")
+    st.caption(f"Engine: **{OLLAMA_MODEL}** (chat) · summaries auto-routed")
     
     st.markdown("---")
     if st.button("📝 New Conversation", use_container_width=True):
         st.session_state.messages = []
-        keys_to_clear = ["document_text", "uploaded_file_name"]
+        keys_to_clear = ["document_text", "uploaded_file_name", "clause_index"]
         for key in keys_to_clear:
             if key in st.session_state: del st.session_state[key]
         st.rerun()
@@ -114,6 +85,9 @@ with st.sidebar:
             if msg['role'] == 'user':
                 st.caption(f"• {msg['content'][:25]}...")
 
+    st.markdown("---")
+    render_diagnostics_panel()
+
 if "messages" not in st.session_state:
     st.session_state.messages = [{"role": "assistant", "content": "Welcome. Upload a legal document to begin analysis."}]
 
@@ -129,6 +103,7 @@ with col_main_1:
         if "uploaded_file_name" not in st.session_state or st.session_state.uploaded_file_name != uploaded_file.name:
             st.session_state.uploaded_file_name = uploaded_file.name
             if "document_text" in st.session_state: del st.session_state.document_text
+            if "clause_index" in st.session_state: del st.session_state.clause_index
         
         # Summarize Button Logic
         if st.button(f"Summarize Document", use_container_width=True):
@@ -151,8 +126,11 @@ with col_main_1:
                     text_to_process = loaded_data['content']
                     os.remove(temp_filename)
 
-                    # Chunking Process
-                    chunks = chunk_text(text_to_process, chunk_size=4000, overlap=200)
+                    # Chunking Process: one chunk per clause, whole clauses packed into map prompts
+                    max_chars, _ = tuning.chunk_settings(default=(4000, 0))
+                    clause_chunks = legal_chunker.chunk_by_clause(text_to_process, max_chars=max_chars)
+                    st.session_state.clause_index = legal_chunker.ClauseIndex(clause_chunks)
+                    chunks = legal_chunker.pack_clauses(clause_chunks, max_chars=max_chars)
                     total_chunks = len(chunks)
                     
                     progress_bar = st.progress(0)
@@ -169,7 +147,9 @@ with col_main_1:
                             {'role': 'system', 'content': SYSTEM_PROMPT},
                             {'role': 'user', 'content': f"Analyze this section. Summarize key legal points in English:\n\n{chunk}"}
                         ]
-                        summary = get_ollama_response(msgs)
+                        # Per-chunk notes only need a small, fast model
+                        model, options = router.route(router.MAP, chunk)
+                        summary = get_ollama_response(msgs, model=model, options=options)
                         partial_summaries.append(summary)
                         progress_bar.progress((i + 1) / total_chunks)
                     
@@ -180,7 +160,8 @@ with col_main_1:
                              {'role': 'system', 'content': "You are an expert summarizer. Output in English."},
                              {'role': 'user', 'content': f"Create a cohesive executive summary from these notes:\n\n{combined_text}"}
                         ]
-                        final_response = get_ollama_response(msgs)
+                        model, options = router.route(router.SYNTHESIS, combined_text)
+                        final_response = get_ollama_response(msgs, model=model, options=options)
                         
                         total_time = int(time.time() - overall_start_time)
                         status_text.empty() 
@@ -196,9 +177,7 @@ with col_main_2:
     st.subheader("CONSULTATION CHAT")
     
     # Display Messages
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    chat_view.render_messages(st.session_state.messages)
 
     # User Input
     if prompt := st.chat_input("Type your legal question here..."):
@@ -211,8 +190,16 @@ with col_main_2:
             with st.spinner("Consulting..."):
                 chat_history_for_ai = [{'role': 'system', 'content': SYSTEM_PROMPT}]
 
-                if "document_text" in st.session_state:
-                    doc_context = st.session_state.document_text[:15000] 
+                # A question naming a clause ("What does 12.3 say?") only needs that clause
+                clause_chunks = []
+                if "clause_index" in st.session_state:
+                    _, clause_chunks = st.session_state.clause_index.resolve(prompt)
+
+                if clause_chunks or "document_text" in st.session_state:
+                    if clause_chunks:
+                        doc_context = "\n\n".join(c["text"] for c in clause_chunks)
+                    else:
+                        doc_context = st.session_state.document_text[:15000] 
                     chat_history_for_ai.append({
                         'role': 'user', 
                         'content': f"Context:\n\n{doc_context}\n\n(End Context)"
@@ -1,12 +1,11 @@
 import streamlit as st
-import requests
-import json
-import pandas as pd
-import chardet
-import fitz 
+import sys
+from pathlib import Path
 
-from langdetect import detect, DetectorFactory
-DetectorFactory.seed = 0
+# Shared ClauseEase toolkit lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clauseease import chat_view, encoding, extractors, language, lazy, map_rerank, ollama_client, tuning
+from clauseease.tabular import TableIndex, read_csv_columnar
 
 st.set_page_config(
     page_title="Language Simplifier",
@@ -15,6 +14,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Parsers, langdetect and pandas load on first use; warm them up in the background meanwhile
+lazy.prewarm(lazy.PREWARM_MODULES + ("pandas",))
+
 def detect_output_language(user_input):
     """Detect if the user is asking for a specific output language."""
     if not user_input:
@@ -40,35 +42,34 @@ def detect_output_language(user_input):
         if key in text:
             return code  
 
-    try:
-        return detect(user_input)
-    except:
-        return "en" 
+    return language.detect_code(user_input) or "en"
 
 # STREAMING OLLAMA FUNCTION
-def stream_ollama(prompt):
-    """Stream response from local Ollama (Llama 3 model)."""
+def stream_partials(tokens):
+    """Yield the growing reply as tokens arrive."""
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "llama3", "prompt": prompt, "stream": True},
-            stream=True
-        )
-
         partial_text = ""
-        for line in response.iter_lines(decode_unicode=True):
-            if not line:
-                continue
-            try:
-                data = json.loads(line)
-                token = data.get("response", "")
-                partial_text += token
-                yield partial_text
-            except:
-                continue
+        for token in tokens:
+            partial_text += token
+            yield partial_text
+
+    except Exception as e:
+        yield f"⚠️ Error communicating with Ollama: {e}"
+
+def stream_ollama(prompt):
+    """Stream response from local Ollama (Llama 3 model)."""
+    return stream_partials(ollama_client.stream_generate(prompt, model="llama3"))
 
+def stream_map_rerank(question, chunks, output_lang):
+    """Ask every relevant chunk on a small model, then stream one merged answer."""
+    try:
+        with st.spinner(f"Searching {len(chunks)} excerpts..."):
+            hits = map_rerank.map_answers(question, chunks, user=st.session_state.current_session)
     except Exception as e:
         yield f"⚠️ Error communicating with Ollama: {e}"
+        return
+    reply_lang = None if output_lang == "en" else language.LANGUAGE_NAMES.get(output_lang, output_lang)
+    yield from stream_partials(map_rerank.merged_stream(question, hits, model="llama3", language=reply_lang))
 
 # UTILITY: CHUNK TEXT
 def chunk_text(text, max_chars=1000, overlap=100):
@@ -178,35 +179,38 @@ if uploaded_file is None:
 elif uploaded_file.name != current_chat.get("uploaded_file_name"):
 
     content = ""
-    if uploaded_file.name.endswith(".txt"):
-        raw_data = uploaded_file.read()
-        detected = chardet.detect(raw_data)
-        encoding = detected["encoding"] or "utf-8"
-
-        content = raw_data.decode(encoding, errors="ignore")
+    raw_data = uploaded_file.getvalue()
+    file_kind = extractors.sniff(raw_data, uploaded_file.name)
+    current_chat["table"] = None
 
-    elif uploaded_file.name.endswith(".pdf"):
+    if file_kind == extractors.TXT:
+        # Sampled detection: constant time regardless of file size
+        content, _ = encoding.decode(raw_data, errors="ignore")
 
-        with fitz.open(stream=uploaded_file.read(), filetype="pdf") as doc:
-            for page in doc:
-                text = page.get_text("text")
-                if text:
-                    content += text + "\n"
+    elif file_kind == extractors.CSV:
+        # Keep tables columnar: questions get the schema plus matching rows only
+        df = read_csv_columnar(uploaded_file)
+        current_chat["table"] = TableIndex(df, name=uploaded_file.name)
 
-    elif uploaded_file.name.endswith(".csv"):
-        df = pd.read_csv(uploaded_file)
-        content = df.to_string()
-
-    current_chat["file_chunks"] = chunk_text(content, max_chars=1000, overlap=100)
+    else:
+        content = extractors.extract(raw_data, uploaded_file.name, kind=file_kind).text
+
+    max_chars, overlap = tuning.chunk_settings("llama3", default=(1000, 100))
+    current_chat["file_chunks"] = chunk_text(content, max_chars=max_chars, overlap=overlap)
+    # Tagged once here so English-only documents skip the multilingual instructions
+    current_chat["foreign_chunks"] = sum(
+        language.needs_translation(language.detect_language(chunk)) for chunk in current_chat["file_chunks"]
+    )
     current_chat["uploaded_file_name"] = uploaded_file.name
 
-    info_message = f"📄 **File loaded:** {len(current_chat['file_chunks'])} chunks extracted."
+    if current_chat["table"] is not None:
+        info_message = f"📊 **Table loaded:** {len(df)} rows × {len(df.columns)} columns."
+    else:
+        info_message = f"📄 **File loaded:** {len(current_chat['file_chunks'])} chunks extracted."
     current_chat["messages"].append({"role": 'assistant', "content": info_message})
 
 # Display chat history
-for message in chat_history:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+chat_view.render_messages(chat_history, key=f"session_{st.session_state.current_session}")
 
 # CHAT INPUT and STREAMING REPLY
 if prompt := st.chat_input("Type your question here..."):
@@ -216,10 +220,54 @@ if prompt := st.chat_input("Type your question here..."):
     chat_history.append({"role": "user", "content": prompt})
 
     output_lang = detect_output_language(prompt)
+    table = current_chat.get("table")
+
+    # Sums, counts and averages are computed directly in pandas
+    computed = table.answer_aggregate(prompt) if table is not None else None
+    if computed:
+        with st.chat_message("assistant"):
+            st.markdown(computed)
+        chat_history.append({"role": "assistant", "content": computed})
+        st.stop()
+
+    if table is not None:
+        full_prompt = f"""
+You are a multilingual AI assistant.
 
-    if file_chunks:
-        MAX_CHARS = 40000
-        combined_text = "\n".join(file_chunks)[:MAX_CHARS]
+You have access to the following table (schema and the rows relevant to the question):
+
+--- TABLE START ---
+{table.context_for(prompt)}
+--- TABLE END ---
+
+User question: {prompt}
+
+Instructions:
+- Answer only from the table
+- Answer only in requested language
+- Output language = {output_lang}
+
+Now respond in language = {output_lang}:
+"""
+    elif file_chunks and (map_rerank.is_broad(prompt)
+                          or sum(len(chunk) for chunk in file_chunks) > map_rerank.STUFF_CHARS):
+        # Broad question or long document: fan out over the chunks instead of truncating them
+        full_prompt = None
+    elif file_chunks and not current_chat.get("foreign_chunks", 1) and output_lang == "en":
+        combined_text = "\n".join(file_chunks)
+
+        # English document, English answer: no translation work for the model
+        full_prompt = f"""
+You have access to the following document:
+
+--- DOCUMENT CONTENT START ---
+{combined_text}
+--- DOCUMENT CONTENT END ---
+
+User question: {prompt}
+"""
+    elif file_chunks:
+        combined_text = "\n".join(file_chunks)
 
         full_prompt = f"""
 You are a multilingual AI assistant.
@@ -245,7 +293,11 @@ Now respond in language = {output_lang}:
     with st.chat_message("assistant"):
         placeholder = st.empty()
         final_text = ""
-        for partial in stream_ollama(full_prompt):
+        if full_prompt is None:
+            stream = stream_map_rerank(prompt, file_chunks, output_lang)
+        else:
+            stream = stream_ollama(full_prompt)
+        for partial in stream:
             placeholder.markdown(partial)
             final_text = partial
 
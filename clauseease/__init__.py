@@ -0,0 +1,6 @@
+"""
+Shared ClauseEase toolkit used by the team's Streamlit apps.
+
+Each app lives in its own folder and adds the repository root to
+``sys.path`` before importing from this package.
+"""
@@ -0,0 +1,136 @@
+"""
+Synchronous client for :mod:`clauseease.server`, used by the Streamlit apps.
+
+When ``CLAUSEEASE_API_URL`` is set, :func:`from_env` returns a client and
+the apps send uploads and questions to the API instead of processing them
+in the Streamlit process. Streaming endpoints yield text pieces as they
+arrive. Cancelling the session's token closes the stream, which makes the
+server stop the generation.
+
+Document calls take the :class:`RemoteDocument` returned by
+:meth:`APIClient.upload` (or a bare id). A replica that has not seen the
+document, or has released it after idling, answers 404; the client then
+uploads the document's bytes again and retries once.
+"""
+import json
+import os
+
+import requests
+
+API_URL = os.environ.get("CLAUSEEASE_API_URL")
+USER_HEADER = "X-ClauseEase-User"
+
+
+class APIError(RuntimeError):
+    """Raised when the API reports an error."""
+
+
+class RemoteDocument:
+    """Server-side document metadata, read like the local document handles."""
+
+    def __init__(self, meta, source=None):
+        self._meta = meta
+        self.key = meta.get("id")
+        self.shared = meta.get("shared", False)
+        # (data, filename), to upload again to a replica that does not have the document
+        self.source = source
+
+    def __getitem__(self, name):
+        return self._meta[name]
+
+    def get(self, name, default=None):
+        return self._meta.get(name, default)
+
+    def release(self):
+        # The server owns the document; other sessions may still use it
+        pass
+
+
+class APIClient:
+    def __init__(self, base_url=API_URL, user=None, timeout=300):
+        self.base_url = base_url.rstrip("/")
+        self.user = user
+        self.timeout = timeout
+
+    def _headers(self):
+        return {USER_HEADER: self.user} if self.user else {}
+
+    def _check(self, resp):
+        if resp.status_code >= 400:
+            raise APIError(f"{resp.status_code}: {resp.text.strip()[:300]}")
+        return resp
+
+    def upload(self, data, filename):
+        """Upload raw bytes; returns a :class:`RemoteDocument`."""
+        resp = requests.post(f"{self.base_url}/documents", params={"name": filename}, data=data,
+                             headers=self._headers(), timeout=self.timeout)
+        return RemoteDocument(self._check(resp).json(), source=(data, filename))
+
+    def _post(self, path, doc=None, **kwargs):
+        """
+        POST to ``path``, where ``{id}`` stands for ``doc``'s id.
+
+        On 404 a :class:`RemoteDocument` is uploaded again and the request
+        retried once: the replica serving it has not seen the document.
+        """
+        def send():
+            doc_id = doc.key if isinstance(doc, RemoteDocument) else doc
+            return requests.post(f"{self.base_url}{path.format(id=doc_id)}", headers=self._headers(),
+                                 timeout=self.timeout, **kwargs)
+
+        resp = send()
+        if resp.status_code == 404 and getattr(doc, "source", None):
+            resp.close()
+            fresh = self.upload(*doc.source)
+            doc._meta, doc.key = fresh._meta, fresh.key
+            resp = send()
+        return self._check(resp)
+
+    def search(self, doc, query, k=5):
+        return self._post("/documents/{id}/search", doc, json={"query": query, "k": k}).json()
+
+    def summarize(self, doc, request="", cancel_token=None):
+        return self._events("/documents/{id}/summarize", {"request": request}, cancel_token, doc)
+
+    def translate(self, doc, cancel_token=None):
+        return self._events("/documents/{id}/translate", {}, cancel_token, doc)
+
+    def ask(self, doc, question, cancel_token=None):
+        return self._events("/documents/{id}/ask", {"question": question}, cancel_token, doc)
+
+    def chat(self, prompt, cancel_token=None):
+        return self._events("/chat", {"prompt": prompt}, cancel_token)
+
+    def _events(self, path, payload, cancel_token=None, doc=None):
+        """Yield ``token`` texts from a server-sent event stream."""
+        with self._post(path, doc, json=payload, stream=True) as resp:
+            resp.encoding = "utf-8"
+            if cancel_token is not None:
+                cancel_token.attach(resp)
+            event = None
+            try:
+                for line in resp.iter_lines(decode_unicode=True):
+                    if cancel_token is not None and cancel_token.cancelled:
+                        break
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data = json.loads(line[5:])
+                        if event == "token":
+                            yield data["text"]
+                        elif event == "error":
+                            raise APIError(data.get("error", "generation failed"))
+                        elif event == "done":
+                            break
+            except (requests.RequestException, AttributeError, ValueError, OSError):
+                # Closing the response from another thread interrupts the read
+                if cancel_token is None or not cancel_token.cancelled:
+                    raise
+            finally:
+                if cancel_token is not None:
+                    cancel_token.detach(resp)
+
+
+def from_env(user=None):
+    """An :class:`APIClient` when ``CLAUSEEASE_API_URL`` is set, else ``None``."""
+    return APIClient(API_URL, user=user) if API_URL else None
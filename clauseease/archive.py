@@ -0,0 +1,148 @@
+"""
+Bulk ingestion of ZIP archives of contracts.
+
+Members are read straight out of the uploaded archive (nothing is
+extracted to disk) and dispatched to the ingestion pipeline in worker
+processes, so a bundle of thousands of contracts is extracted and chunked
+on every core. Only ``2 x workers`` members are held in memory at once:
+the next one is read when a worker frees up.
+
+Each member is keyed by the hash of its bytes; members whose key the
+caller has already processed, and repeats inside the archive, are
+skipped without being extracted. :func:`ingest` yields one
+:class:`Result` per member as it finishes, for per-file progress::
+
+    with zipfile.ZipFile(upload) as zf:
+        for result in archive.ingest(zf, skip=lambda key: key in done):
+            ...
+
+Folders, macOS resource forks, encrypted members and members larger than
+``CLAUSEEASE_ZIP_MEMBER_MB`` (or with a suspicious compression ratio) are
+reported as skipped. Outcomes are counted in
+``clauseease_archive_members_total{status}``.
+"""
+import os
+import posixpath
+import zipfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from . import doc_registry, extractors, metrics, pipeline
+
+MAX_MEMBER_BYTES = int(os.environ.get("CLAUSEEASE_ZIP_MEMBER_MB", "64")) * 1024 * 1024
+# Uncompressed/compressed sizes above this look like a zip bomb
+MAX_RATIO = 200
+READ_BLOCK = 1024 * 1024
+
+PREPARED = "prepared"
+DUPLICATE = "duplicate"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+Result = namedtuple("Result", "name key status value error")
+
+
+def is_archive(data, filename=""):
+    """True for a ZIP archive (DOCX files are ZIPs too, but are extracted as documents)."""
+    return extractors.sniff(data, filename) == extractors.ZIP
+
+
+def _skip_reason(info):
+    base = posixpath.basename(info.filename)
+    if info.is_dir() or not base:
+        return "folder"
+    if info.filename.startswith("__MACOSX/") or base.startswith("._") or base.startswith("."):
+        return "hidden file"
+    if info.flag_bits & 0x1:
+        return "encrypted"
+    if info.file_size > MAX_MEMBER_BYTES:
+        return f"larger than {MAX_MEMBER_BYTES // (1024 * 1024)} MB"
+    if info.compress_size and info.file_size / info.compress_size > MAX_RATIO:
+        return "suspicious compression ratio"
+    return None
+
+
+def members(zf):
+    """``(to ingest, skipped)``: ``ZipInfo`` entries, and ``(ZipInfo, reason)`` for the rest."""
+    wanted, skipped = [], []
+    for info in zf.infolist():
+        reason = _skip_reason(info)
+        if reason:
+            skipped.append((info, reason))
+        else:
+            wanted.append(info)
+    return wanted, skipped
+
+
+def read_member(zf, info, limit=MAX_MEMBER_BYTES):
+    """The member's bytes, streamed from the archive; never more than ``limit``."""
+    parts, size = [], 0
+    with zf.open(info) as f:
+        while True:
+            block = f.read(READ_BLOCK)
+            if not block:
+                break
+            size += len(block)
+            if size > limit:
+                # The header understated the size
+                raise ValueError(f"larger than {limit // (1024 * 1024)} MB")
+            parts.append(block)
+    return b"".join(parts)
+
+
+def ingest(zf, process=pipeline.prepare_document, skip=None, executor=None, max_pending=None):
+    """
+    Run ``process(data, name)`` over the archive's members; yields a :class:`Result` per member.
+
+    ``skip(key)`` returns True for content already processed. ``executor``
+    defaults to :func:`clauseease.pipeline.default_pool`; with a thread pool
+    (e.g. uploads to the API) ``process`` may be any callable. At most
+    ``max_pending`` members (default ``2 x pipeline.WORKERS``) are in flight.
+    """
+    executor = executor or pipeline.default_pool()
+    max_pending = max_pending or 2 * pipeline.WORKERS
+    wanted, skipped = members(zf)
+    for info, reason in skipped:
+        yield _result(info.filename, None, SKIPPED, error=reason)
+
+    seen, pending = set(), {}
+    queue = iter(wanted)
+    exhausted = False
+    with metrics.stage_timer("archive"):
+        while pending or not exhausted:
+            # Keep the workers busy while holding at most max_pending members in memory
+            while not exhausted and len(pending) < max_pending:
+                info = next(queue, None)
+                if info is None:
+                    exhausted = True
+                    break
+                try:
+                    data = read_member(zf, info)
+                except (ValueError, zipfile.BadZipFile, RuntimeError, OSError) as e:
+                    yield _result(info.filename, None, FAILED, error=str(e))
+                    continue
+                key = doc_registry.content_key(data)
+                if key in seen or (skip is not None and skip(key)):
+                    yield _result(info.filename, key, DUPLICATE)
+                    continue
+                seen.add(key)
+                pending[executor.submit(process, data, info.filename)] = (info.filename, key)
+            if not pending:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key = pending.pop(future)
+                try:
+                    yield _result(name, key, PREPARED, value=pipeline.collect(future.result()))
+                except Exception as e:
+                    yield _result(name, key, FAILED, error=str(e))
+
+
+def _result(name, key, status, value=None, error=None):
+    metrics.inc("clauseease_archive_members_total", status=status)
+    return Result(name, key, status, value, error)
+
+
+def member_count(zf):
+    """Number of members :func:`ingest` will yield a result for."""
+    return len(zf.infolist())
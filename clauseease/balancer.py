@@ -0,0 +1,186 @@
+"""
+Client-side load balancing over several Ollama servers.
+
+Set ``OLLAMA_URLS=http://gpu1:11434,http://gpu2:11434`` (``OLLAMA_URL``
+alone still works for a single server). Each request goes to a healthy
+endpoint, preferring:
+
+1. an endpoint that already has the model loaded (from ``/api/ps``),
+2. for follow-ups on a document, the endpoint that served it before, so
+   Ollama's prompt cache is reused, unless it is clearly busier than the
+   rest,
+3. otherwise the endpoint with the fewest requests in flight.
+
+A background thread polls ``/api/ps`` on every endpoint. Endpoints that
+fail the check, or refuse a connection, are ejected for a while and then
+probed again. If every endpoint is ejected, all of them are tried anyway
+rather than failing outright.
+"""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from . import metrics
+
+HEALTH_INTERVAL = float(os.environ.get("CLAUSEEASE_HEALTH_INTERVAL", "10"))
+EJECT_SECONDS = float(os.environ.get("CLAUSEEASE_EJECT_SECONDS", "30"))
+# A sticky endpoint is kept unless it has this many more requests in flight than the least busy one
+AFFINITY_SLACK = 2
+
+
+def configured_urls():
+    urls = os.environ.get("OLLAMA_URLS") or os.environ.get("OLLAMA_URL", "http://localhost:11434")
+    return [u.strip().rstrip("/") for u in urls.split(",") if u.strip()]
+
+
+class Endpoint:
+    def __init__(self, url):
+        self.url = url
+        self.in_flight = 0
+        self.loaded = set()
+        self.ejected_until = 0.0
+        self.failures = 0
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.ejected_until
+
+    def __repr__(self):
+        return f"Endpoint({self.url!r}, in_flight={self.in_flight}, healthy={self.healthy})"
+
+
+def _rendezvous(key, url):
+    return hashlib.blake2b(f"{key}|{url}".encode(), digest_size=8).digest()
+
+
+class Balancer:
+    """Least-outstanding-requests routing with model awareness and affinity."""
+
+    def __init__(self, urls=None, health_interval=HEALTH_INTERVAL, eject_seconds=EJECT_SECONDS):
+        self.endpoints = [Endpoint(u) for u in (urls or configured_urls())]
+        self.health_interval = health_interval
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._affinity = {}
+        self._checker = None
+
+    @property
+    def urls(self):
+        return [e.url for e in self.endpoints]
+
+    # --- Health ---
+    def check(self, endpoint, timeout=2):
+        """Probe one endpoint and record which models it has loaded."""
+        try:
+            resp = requests.get(f"{endpoint.url}/api/ps", timeout=timeout)
+            resp.raise_for_status()
+            loaded = {m["name"] for m in resp.json().get("models", [])}
+        except (requests.RequestException, ValueError):
+            self.eject(endpoint)
+            return False
+        with self._lock:
+            endpoint.loaded = loaded
+            endpoint.failures = 0
+            endpoint.ejected_until = 0.0
+        return True
+
+    def check_all(self):
+        for endpoint in self.endpoints:
+            self.check(endpoint)
+
+    def eject(self, endpoint):
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.ejected_until = time.monotonic() + self.eject_seconds
+        metrics.inc("clauseease_endpoint_ejections_total", endpoint=endpoint.url)
+
+    def start_health_checks(self):
+        """Poll every endpoint on a daemon thread; safe to call repeatedly."""
+        if len(self.endpoints) < 2:
+            return
+        with self._lock:
+            if self._checker is not None:
+                return
+            self._checker = threading.Thread(target=self._health_loop, daemon=True, name="ollama-health")
+        self._checker.start()
+
+    def _health_loop(self):
+        while True:
+            self.check_all()
+            time.sleep(self.health_interval)
+
+    # --- Routing ---
+    def pick(self, model=None, affinity=None):
+        """Choose an endpoint for ``model``; ``affinity`` keeps a document on one node."""
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.healthy] or list(self.endpoints)
+            least = min(e.in_flight for e in candidates)
+            warm = [e for e in candidates if model in e.loaded] if model else []
+            # Loading a model takes seconds: go cold only when the warm endpoints are clearly busier
+            if warm and min(e.in_flight for e in warm) <= least + AFFINITY_SLACK:
+                candidates = warm
+                least = min(e.in_flight for e in candidates)
+
+            if affinity is not None:
+                sticky = self._affinity.get(affinity)
+                if sticky not in candidates:
+                    # First request for this key: a stable choice that spreads keys over endpoints
+                    sticky = max(candidates, key=lambda e: _rendezvous(affinity, e.url))
+                if sticky.in_flight <= least + AFFINITY_SLACK:
+                    self._affinity[affinity] = sticky
+                    return sticky
+
+            return min(candidates, key=lambda e: (e.in_flight, e.failures))
+
+    def acquire(self, model=None, affinity=None):
+        """Pick an endpoint and count the request as in flight; pair with :meth:`release`."""
+        self.start_health_checks()
+        endpoint = self.pick(model, affinity)
+        with self._lock:
+            endpoint.in_flight += 1
+        metrics.inc("clauseease_endpoint_requests_total", endpoint=endpoint.url)
+        return endpoint
+
+    def release(self, endpoint, model=None, failed=False):
+        """Finish a request; ``failed`` ejects the endpoint, success marks ``model`` as loaded there."""
+        with self._lock:
+            endpoint.in_flight -= 1
+            if not failed and model:
+                endpoint.loaded.add(model)
+        if failed:
+            self.eject(endpoint)
+
+    @contextmanager
+    def lease(self, model=None, affinity=None):
+        """Yield the base URL of the chosen endpoint for the duration of one request."""
+        endpoint = self.acquire(model, affinity)
+        failed = False
+        try:
+            yield endpoint.url
+        except (requests.ConnectionError, requests.Timeout):
+            failed = True
+            raise
+        finally:
+            self.release(endpoint, model=model, failed=failed)
+
+    def stats(self):
+        with self._lock:
+            return [{"url": e.url, "in_flight": e.in_flight, "healthy": e.healthy,
+                     "loaded": sorted(e.loaded)} for e in self.endpoints]
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_balancer():
+    """Process-wide balancer over ``OLLAMA_URLS`` (or ``OLLAMA_URL``)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Balancer()
+        return _default
@@ -0,0 +1,239 @@
+"""
+Calibrate chunk size and overlap per model from measured throughput.
+
+For every model, sample contracts are chunked over a grid of chunk and
+overlap sizes and each chunk is summarised with the map prompt the
+summarisers use. Each grid point is scored on:
+
+- throughput: end-to-end documents per minute (chunking + every map call)
+- quality: the share of the contracts' facts (amounts, dates, periods,
+  percentages) that survive into the chunk summaries
+
+The fastest grid point whose quality clears ``--min-quality`` is stored
+with :mod:`clauseease.tuning`, where the chunkers pick it up; a model
+with no such point keeps the defaults. Chunks that
+would not fit the model's context window are never tried. Run it against
+the real Ollama servers the apps use::
+
+    python -m clauseease.calibrate --models phi3:latest,llama3:latest
+    python -m clauseease.calibrate --samples contracts/*.pdf --min-quality 0.8
+
+Without ``--samples``, synthetic contracts with known facts are generated.
+"""
+import argparse
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import extractors, ollama_client, router, summary_tree, tuning
+
+GRID_CHARS = (500, 800, 1200, 2000, 3000, 4000)
+GRID_OVERLAP = (0.0, 0.1, 0.2)
+MIN_QUALITY = 0.7
+# Ollama's default context window when OLLAMA_CONTEXT_LENGTH is not set
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("OLLAMA_CONTEXT_LENGTH", "4096"))
+
+FACT_RE = re.compile(
+    r"\$\s?\d[\d,]*|\d+(?:\.\d+)?\s?%|\d+\s+(?:days|months|years)\b|\b(?:19|20)\d{2}\b", re.IGNORECASE
+)
+
+PARTIES = ["Acme Holdings Ltd", "Globex Services LLP", "Initech Software Pvt Ltd", "Umbrella Logistics Inc"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+          "October", "November", "December"]
+CLAUSES = [
+    ("Fees", "The Client shall pay the Provider a monthly fee of ${amount} within {days} days of each invoice."),
+    ("Late Payment", "Overdue amounts accrue interest at {pct}% per month until paid in full."),
+    ("Term", "This Agreement commences on {date} and continues for {months} months unless terminated earlier."),
+    ("Termination", "Either party may terminate this Agreement on {days} days' written notice to the other."),
+    ("Liability", "Each party's aggregate liability is capped at ${amount} in any contract year."),
+    ("Service Levels", "The Provider shall keep the service available {pct}% of the time in each calendar month."),
+    ("Confidentiality", "Confidential Information must be protected for {months} months after termination."),
+    ("Insurance", "The Provider shall maintain professional indemnity cover of at least ${amount}."),
+    ("Renewal", "The Agreement renews for successive periods of {months} months unless notice is given "
+                "by {date}."),
+    ("Audit", "The Client may audit the Provider's records once every {months} months on {days} days' notice."),
+]
+FILLER = ("The parties acknowledge that this clause has been negotiated at arm's length and that each of them "
+          "has had the opportunity to take independent legal advice on its meaning and effect. ")
+
+
+def sample_contracts(count=3, clauses=30, seed=7):
+    """Synthetic contracts as ``(name, text)``; every clause carries distinct facts."""
+    rng = random.Random(seed)
+    docs = []
+    for n in range(count):
+        a, b = rng.sample(PARTIES, 2)
+        lines = [f"MASTER SERVICES AGREEMENT\n\nThis Agreement is made between {a} and {b}.\n"]
+        for i in range(1, clauses + 1):
+            title, template = CLAUSES[(i + n) % len(CLAUSES)]
+            body = template.format(
+                amount=f"{rng.randint(11, 990) * 1000:,}",
+                days=rng.choice([14, 21, 30, 45, 60, 90]) + i,
+                pct=f"{rng.randint(11, 99) / 10:.1f}",
+                months=rng.randint(3, 60),
+                date=f"{MONTHS[rng.randrange(12)]} {rng.randint(1, 28)}, {rng.randint(2024, 2030)}",
+            )
+            lines.append(f"{i}. {title}\n{body} {FILLER * rng.randint(1, 4)}")
+        docs.append((f"sample-{n + 1}", "\n".join(lines)))
+    return docs
+
+
+def load_samples(paths):
+    docs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            docs.append((os.path.basename(path), extractors.extract(f.read(), path).text))
+    return docs
+
+
+def facts(text):
+    """Amounts, periods, percentages and years in ``text``, reduced to their digits."""
+    return {re.sub(r"[^\d.]", "", m.group()) for m in FACT_RE.finditer(text)}
+
+
+def window_chunks(text, chunk_chars, overlap_chars=0):
+    """Fixed-size windows ending on whitespace, each overlapping the previous by ``overlap_chars``."""
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            space = text.rfind(" ", start + chunk_chars // 2, end)
+            end = space if space > 0 else end
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start = max(start + 1, end - overlap_chars)
+    return chunks
+
+
+def context_tokens(model):
+    """Context window Ollama will actually give ``model``: its own limit capped by the server setting."""
+    try:
+        info = ollama_client.show(model).get("model_info", {})
+    except Exception:
+        return DEFAULT_CONTEXT_TOKENS
+    limits = [v for k, v in info.items() if k.endswith(".context_length") and isinstance(v, int)]
+    return min([DEFAULT_CONTEXT_TOKENS] + limits)
+
+
+def fits(chunk_chars, context):
+    prompt_tokens = router.estimate_tokens(summary_tree.MAP_PROMPT) + router.estimate_tokens("x" * chunk_chars)
+    return prompt_tokens + router.get_router().num_predict(router.MAP, prompt_tokens) <= context
+
+
+def benchmark(model, docs, chunk_chars, overlap_chars, parallel=1):
+    """Summarise every chunk of ``docs`` once; returns throughput and fact recall."""
+    def summarise(chunk):
+        prompt = summary_tree.MAP_PROMPT.format(text=chunk)
+        options = {"num_predict": router.get_router().num_predict(router.MAP, router.estimate_tokens(prompt))}
+        return ollama_client.generate(prompt, model=model, options=options)
+
+    start = time.perf_counter()
+    kept = total = chunk_count = 0
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        for _, text in docs:
+            chunks = window_chunks(text, chunk_chars, overlap_chars)
+            chunk_count += len(chunks)
+            summaries = "\n".join(pool.map(summarise, chunks))
+            expected = facts(text)
+            kept += len(expected & facts(summaries))
+            total += len(expected)
+    seconds = time.perf_counter() - start
+    return {
+        "chunk_chars": chunk_chars,
+        "overlap_chars": overlap_chars,
+        "chunks": chunk_count,
+        "seconds": round(seconds, 2),
+        "docs_per_minute": round(len(docs) * 60 / seconds, 3),
+        "quality": round(kept / total, 3) if total else 1.0,
+    }
+
+
+def best(results, min_quality=MIN_QUALITY):
+    """Fastest result over the quality floor, or the most faithful one if none clears it."""
+    passing = [r for r in results if r["quality"] >= min_quality]
+    if passing:
+        return max(passing, key=lambda r: (r["docs_per_minute"], r["quality"]))
+    return max(results, key=lambda r: (r["quality"], r["docs_per_minute"]))
+
+
+def calibrate_model(model, docs, sizes=GRID_CHARS, overlaps=GRID_OVERLAP, min_quality=MIN_QUALITY,
+                    parallel=1, report=print):
+    """Benchmark ``model`` over the grid; returns ``(best, results)``."""
+    context = context_tokens(model)
+    # Load the model first so the first grid point does not pay for it
+    ollama_client.generate("Reply with OK.", model=model, options={"num_predict": 4})
+    results = []
+    for chunk_chars in sizes:
+        for share in overlaps:
+            overlap_chars = int(chunk_chars * share)
+            if not fits(chunk_chars, context):
+                report(f"  {chunk_chars:>5}/{overlap_chars:<4} skipped: exceeds {context}-token context")
+                continue
+            result = benchmark(model, docs, chunk_chars, overlap_chars, parallel=parallel)
+            results.append(result)
+            report(f"  {chunk_chars:>5}/{overlap_chars:<4} {result['docs_per_minute']:>8.2f} docs/min  "
+                   f"quality {result['quality']:.2f}  ({result['chunks']} chunks, {result['seconds']}s)")
+    if not results:
+        return None, results
+    choice = best(results, min_quality)
+    return {**choice, "context_tokens": context, "min_quality": min_quality,
+            "passed": choice["quality"] >= min_quality}, results
+
+
+def calibrate(models=None, docs=None, sizes=GRID_CHARS, overlaps=GRID_OVERLAP, min_quality=MIN_QUALITY,
+              parallel=1, save=True, report=print):
+    """Calibrate ``models`` (default: every installed chat model) and store the winners."""
+    models = models or [m for m in ollama_client.list_models() if "embed" not in m]
+    docs = docs or sample_contracts()
+    map_model = router.route(router.MAP).model
+    chosen = {}
+    for model in models:
+        report(f"{model}:")
+        choice, _ = calibrate_model(model, docs, sizes, overlaps, min_quality, parallel, report)
+        if choice is None:
+            report("  no grid point fits the context window")
+            continue
+        if not choice["passed"]:
+            # Speed is meaningless if summaries lose the facts: keep the chunkers' own defaults
+            report(f"  nothing reached quality {min_quality} (best {choice['quality']:.2f}); not saved")
+            continue
+        report(f"  -> chunk {choice['chunk_chars']}, overlap {choice['overlap_chars']}")
+        chosen[model] = choice
+        if save:
+            tuning.save(model, choice, make_default=model == map_model)
+    return chosen
+
+
+def _ints(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate chunk size and overlap per model")
+    parser.add_argument("--models", default="", help="comma-separated; default: every installed model")
+    parser.add_argument("--samples", nargs="*", default=[], help="contracts to benchmark on")
+    parser.add_argument("--sizes", default=",".join(map(str, GRID_CHARS)), help="chunk sizes in characters")
+    parser.add_argument("--overlaps", default=",".join(map(str, GRID_OVERLAP)),
+                        help="overlaps as fractions of the chunk size")
+    parser.add_argument("--min-quality", type=float, default=MIN_QUALITY, help="share of facts kept, 0-1")
+    parser.add_argument("--parallel", type=int, default=int(os.environ.get("OLLAMA_NUM_PARALLEL", "1")))
+    parser.add_argument("--dry-run", action="store_true", help="report without saving")
+    args = parser.parse_args(argv)
+    calibrate(
+        models=[m for m in args.models.split(",") if m],
+        docs=load_samples(args.samples) if args.samples else None,
+        sizes=_ints(args.sizes),
+        overlaps=[float(v) for v in args.overlaps.split(",") if v],
+        min_quality=args.min_quality,
+        parallel=args.parallel,
+        save=not args.dry_run,
+    )
+    if not args.dry_run:
+        print(f"Saved to {tuning.SETTINGS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Virtualized chat rendering for the Streamlit apps.
+
+Streamlit re-executes the whole script on every interaction, so a loop
+over ``st.chat_message`` costs time proportional to the conversation. Here
+only the newest ``PAGE_SIZE`` messages are rendered, with a "load earlier"
+button for the rest. The history runs as a fragment, so paging does not
+rerun the app. Finished messages go through :func:`prepare_markdown`,
+which is cached by content.
+
+:func:`fragment` wraps ``st.fragment`` and falls back to a plain function
+call on Streamlit versions without fragments.
+"""
+import os
+import re
+
+import streamlit as st
+
+PAGE_SIZE = int(os.environ.get("CLAUSEEASE_CHAT_PAGE_SIZE", "30"))
+
+FENCE_LINE_RE = re.compile(r"(^[ \t]*(?:```|~~~)[^\n]*$)", re.MULTILINE)
+DOLLAR_RE = re.compile(r"(?<!\\)\$")
+
+
+def fragment(func=None, **kwargs):
+    """``st.fragment`` when available (1.37+), else a no-op decorator."""
+    wrap = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if wrap is None:
+        return func if func is not None else (lambda f: f)
+    return wrap(func, **kwargs) if func is not None else wrap(**kwargs)
+
+
+@st.cache_data(max_entries=4096, show_spinner=False)
+def prepare_markdown(content):
+    """
+    Make stored replies safe to render as markdown.
+
+    Outside code blocks, ``$`` is escaped so amounts such as "$5,000 and
+    $10,000" are not rendered as LaTeX. An unterminated code fence, as left
+    by a stopped stream, is closed.
+    """
+    content = str(content)
+    # Odd items are the fence lines themselves
+    parts = FENCE_LINE_RE.split(content)
+    in_code = False
+    for i, part in enumerate(parts):
+        if i % 2:
+            in_code = not in_code
+        elif not in_code:
+            parts[i] = DOLLAR_RE.sub(r"\\$", part)
+    if in_code:
+        parts.append("\n```")
+    return "".join(parts)
+
+
+def _shown_key(key):
+    return f"_chat_view_{key}_shown"
+
+
+def _load_earlier(key, page_size):
+    st.session_state[_shown_key(key)] += page_size
+
+
+def reset(key="chat"):
+    """Show only the latest page again, e.g. after switching chats."""
+    st.session_state.pop(_shown_key(key), None)
+
+
+@fragment
+def render_messages(messages, key="chat", page_size=PAGE_SIZE):
+    """Render the newest ``page_size`` ``{"role", "content"}`` messages of ``messages``."""
+    shown = st.session_state.setdefault(_shown_key(key), page_size)
+    hidden = max(0, len(messages) - shown)
+    if hidden:
+        st.button(f"Load earlier messages ({hidden} more)", key=f"_chat_view_{key}_more",
+                  on_click=_load_earlier, args=(key, page_size))
+    for msg in messages[hidden:]:
+        with st.chat_message(msg["role"]):
+            st.markdown(prepare_markdown(msg["content"]))
@@ -0,0 +1,34 @@
+"""
+Streamlit diagnostics panel showing the in-memory metrics.
+"""
+import streamlit as st
+
+from . import metrics
+
+STAGE_LABELS = {
+    "clauseease_stage_seconds": "Stage time (s)",
+    "clauseease_queue_wait_seconds": "Queue wait (s)",
+    "clauseease_ttft_seconds": "Time to first token (s)",
+    "clauseease_generation_seconds": "Generation time (s)",
+    "clauseease_prefill_tokens_per_second": "Prefill tokens/s",
+    "clauseease_decode_tokens_per_second": "Decode tokens/s",
+}
+
+
+def render_diagnostics_panel(title="Diagnostics"):
+    """Render p50/p95 of every recorded metric inside a collapsed expander."""
+    with st.expander(title, expanded=False):
+        rows = metrics.REGISTRY.snapshot()
+        if not rows:
+            st.caption("No measurements yet.")
+            return
+        for row in rows:
+            row["metric"] = STAGE_LABELS.get(row["metric"], row["metric"])
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        st.download_button(
+            "Download Prometheus metrics",
+            metrics.to_prometheus(),
+            file_name="clauseease_metrics.prom",
+            mime="text/plain",
+            use_container_width=True,
+        )
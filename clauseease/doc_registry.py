@@ -0,0 +1,182 @@
+"""
+Process-wide registry of ingested documents shared between sessions.
+
+Ten people opening the same agreement should not hold ten copies of its
+text, chunks and indexes. Documents are keyed by a hash of the uploaded
+bytes and built once. Each session holds a lightweight
+:class:`DocumentHandle` that reads like the old per-session ``dict``.
+
+Handles are reference-counted: releasing one explicitly, or letting it be
+garbage-collected with its session, drops the count. Documents nobody
+holds stay cached until they have been idle longer than the TTL, or until
+the registry is over its memory cap; the least recently used go first.
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+import weakref
+
+from . import metrics
+
+MAX_BYTES = int(os.environ.get("CLAUSEEASE_REGISTRY_MB", "1024")) * 1024 * 1024
+IDLE_TTL = float(os.environ.get("CLAUSEEASE_REGISTRY_TTL", "1800"))
+
+
+def content_key(data):
+    """Registry key for uploaded bytes (bytes, memoryview or mmap)."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def estimate_size(fields):
+    """Rough in-memory size of a document's fields: strings and chunk lists."""
+    total = 0
+    for value in fields.values():
+        if isinstance(value, str):
+            total += sys.getsizeof(value)
+        elif isinstance(value, list):
+            total += sum(sys.getsizeof(c["text"] if isinstance(c, dict) else c) for c in value)
+    return total
+
+
+class _Entry:
+    def __init__(self):
+        self.fields = None
+        self.cleanup = None
+        self.size = 0
+        self.refs = 0
+        self.last_used = time.monotonic()
+        self.ready = threading.Event()
+        self.error = None
+
+
+class DocumentHandle:
+    """A session's reference to a shared document; read it like a ``dict``."""
+
+    def __init__(self, registry, key, entry, shared):
+        self.key = key
+        self.shared = shared
+        self._fields = entry.fields
+        self._finalizer = weakref.finalize(self, registry._release, key)
+
+    def __getitem__(self, name):
+        return self._fields[name]
+
+    def get(self, name, default=None):
+        return self._fields.get(name, default)
+
+    def release(self):
+        """Drop this reference now instead of waiting for garbage collection."""
+        self._finalizer()
+
+
+class DocumentRegistry:
+    """Reference-counted, memory-capped documents keyed by content hash."""
+
+    def __init__(self, max_bytes=MAX_BYTES, idle_ttl=IDLE_TTL):
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, build, cleanup=None):
+        """
+        Return a handle to the document ``key``, calling ``build()`` if it is new.
+
+        ``build`` returns the document's fields as a dict; concurrent
+        acquires of the same key wait for a single build. ``cleanup(fields)``
+        runs when the document is evicted.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry()
+            entry.refs += 1
+
+        if owner:
+            metrics.inc("clauseease_registry_total", result="miss")
+            try:
+                entry.fields = build()
+                entry.cleanup = cleanup
+                entry.size = estimate_size(entry.fields)
+            except BaseException as e:
+                with self._lock:
+                    self._entries.pop(key, None)
+                entry.error = e
+                entry.ready.set()
+                raise
+            entry.ready.set()
+        else:
+            metrics.inc("clauseease_registry_total", result="hit")
+            entry.ready.wait()
+            if entry.error is not None:
+                raise entry.error
+
+        with self._lock:
+            entry.last_used = time.monotonic()
+            self._evict_locked()
+        return DocumentHandle(self, key, entry, shared=not owner)
+
+    def lookup(self, key):
+        """A handle to ``key`` if it is already built, else ``None``; never builds."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.ready.is_set() or entry.error is not None:
+                return None
+            entry.refs += 1
+            entry.last_used = time.monotonic()
+        metrics.inc("clauseease_registry_total", result="hit")
+        return DocumentHandle(self, key, entry, shared=True)
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs = max(0, entry.refs - 1)
+                entry.last_used = time.monotonic()
+            self._evict_locked()
+
+    def sweep(self):
+        """Evict idle documents past their TTL or over the memory cap."""
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self):
+        now = time.monotonic()
+        idle = sorted((e.last_used, k) for k, e in self._entries.items()
+                      if e.refs == 0 and e.ready.is_set())
+        total = sum(e.size for e in self._entries.values())
+        for last_used, key in idle:
+            if total <= self.max_bytes and now - last_used < self.idle_ttl:
+                break
+            entry = self._entries.pop(key)
+            total -= entry.size
+            metrics.inc("clauseease_registry_total", result="evicted")
+            if entry.cleanup is not None:
+                try:
+                    entry.cleanup(entry.fields)
+                except Exception:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._entries),
+                "referenced": sum(1 for e in self._entries.values() if e.refs),
+                "bytes": sum(e.size for e in self._entries.values()),
+            }
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_registry():
+    """Process-wide registry sized by ``CLAUSEEASE_REGISTRY_MB`` and ``CLAUSEEASE_REGISTRY_TTL``."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = DocumentRegistry()
+        return _default
@@ -0,0 +1,146 @@
+"""
+Chunk embeddings cached by content hash, and the library-wide index over them.
+
+Embeddings are stored under the chunk hash from
+:mod:`clauseease.versioning`, so a new version of a contract only embeds
+the chunks whose text actually changed. :class:`LibraryIndex` is keyed the
+same way and holds the chunks of every open document in one
+:class:`clauseease.ann.IVFIndex`: it searches exactly while the library
+is small and switches to approximate IVF search once there are enough
+rows to train on. Questions about one document are answered from that
+document's rows of the shared index.
+"""
+import os
+import threading
+
+import numpy as np
+
+from . import ann, metrics, ollama_client
+from .versioning import ContentCache
+
+EMBED_MODEL = os.environ.get("CLAUSEEASE_EMBED_MODEL", "nomic-embed-text")
+BATCH_SIZE = 32
+
+VECTORS = ContentCache("embeddings", max_items=200_000)
+
+
+def embed_chunks(chunks, model=EMBED_MODEL):
+    """
+    Return ``{hash: unit vector}`` for ``chunks`` (dicts with ``hash`` and ``text``).
+
+    Only chunks missing from the cache are sent to Ollama.
+    """
+    vectors, missing = {}, []
+    for chunk in chunks:
+        key = f"{model}:{chunk['hash']}"
+        vector = VECTORS.get(key)
+        if vector is None:
+            missing.append(chunk)
+        else:
+            vectors[chunk["hash"]] = vector
+    with metrics.stage_timer("embedding", model=model):
+        for start in range(0, len(missing), BATCH_SIZE):
+            batch = missing[start:start + BATCH_SIZE]
+            for chunk, raw in zip(batch, ollama_client.embed([c["text"] for c in batch], model)):
+                vector = np.asarray(raw, dtype=np.float32)
+                vector /= np.linalg.norm(vector) or 1.0
+                VECTORS.put(f"{model}:{chunk['hash']}", vector)
+                vectors[chunk["hash"]] = vector
+    metrics.inc("clauseease_embedded_chunks_total", len(missing), model=model)
+    return vectors
+
+
+class LibraryIndex:
+    """
+    Every open document's chunks in one :class:`clauseease.ann.IVFIndex`, keyed by chunk hash.
+
+    A chunk shared by several documents (or versions) is embedded and
+    stored once, and dropped when the last document holding it goes.
+    """
+
+    def __init__(self, model=EMBED_MODEL):
+        self.model = model
+        self.index = None
+        self.texts = {}
+        # chunk hash -> documents holding it, and document -> its chunk hashes
+        self.owners = {}
+        self.documents = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def sync(self, doc, chunks):
+        """Make document ``doc`` hold exactly ``chunks``, embedding only chunks new to the library."""
+        wanted = {c["hash"]: c for c in chunks}
+        with self._lock:
+            held = self.documents.get(doc, set())
+            if held == wanted.keys():
+                return {"added": 0, "removed": 0, "missing": 0}
+            new = [c for h, c in wanted.items() if h not in self.texts]
+        vectors = embed_chunks(new, self.model) if new else {}
+        with self._lock:
+            # A short embed response leaves some chunks without a vector: they stay out of the
+            # index (and out of the document), so the next sync asks for them again
+            fresh = [c for c in new if c["hash"] in vectors and c["hash"] not in self.texts]
+            if fresh:
+                if self.index is None:
+                    self.index = ann.IVFIndex(len(vectors[fresh[0]["hash"]]))
+                self.index.add([c["hash"] for c in fresh], np.stack([vectors[c["hash"]] for c in fresh]))
+                for c in fresh:
+                    self.texts[c["hash"]] = c["text"]
+            indexed = {key for key in wanted if key in self.texts}
+            held = self.documents.get(doc, set())
+            for key in indexed - held:
+                self.owners.setdefault(key, set()).add(doc)
+            self.documents[doc] = indexed
+            self._release_locked(doc, held - indexed)
+        return {"added": len(fresh), "removed": len(held - indexed), "missing": len(wanted) - len(indexed)}
+
+    def drop(self, doc):
+        """Forget document ``doc``; its chunks leave the index unless another document holds them."""
+        with self._lock:
+            self._release_locked(doc, self.documents.pop(doc, set()))
+
+    def _release_locked(self, doc, keys):
+        orphans = []
+        for key in keys:
+            owners = self.owners.get(key)
+            if owners is None:
+                continue
+            owners.discard(doc)
+            if not owners:
+                del self.owners[key]
+                self.texts.pop(key, None)
+                orphans.append(key)
+        if orphans:
+            self.index.remove(orphans)
+
+    def search(self, query, k=5, docs=None):
+        """Return ``[(score, text)]`` for the ``k`` chunks closest to ``query``, from ``docs`` (default: all)."""
+        with self._lock:
+            if not self.texts:
+                return []
+            keys = None if docs is None else {key for doc in docs for key in self.documents.get(doc, ())}
+        if keys is not None and not keys:
+            return []
+        raw = ollama_client.embed([query], self.model)[0]
+        vector = np.asarray(raw, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        rows = None if keys is None else self.index.rows_for(keys)
+        hits = self.index.search(vector, k, rows=rows)
+        with self._lock:
+            return [(score, self.texts[key]) for score, key in hits if key in self.texts]
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_library():
+    """Process-wide library index shared by every document and session."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = LibraryIndex()
+        return _default
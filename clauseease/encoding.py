@@ -0,0 +1,125 @@
+"""
+Tiered, sample-based text encoding detection.
+
+``chardet.detect`` over a whole upload is pure Python and takes seconds
+on multi-megabyte files. Here only bounded samples from the start, middle
+and end of the data are inspected:
+
+1. strict UTF-8 on the samples (by far the most common case),
+2. a byte-order mark for UTF-16/UTF-32,
+3. chardet's incremental ``UniversalDetector``, stopping as soon as it is
+   confident.
+
+The verdict depends only on the samples, so it is cached by a hash of the
+samples and the data length; detection cost does not grow with file size.
+"""
+import codecs
+import hashlib
+import threading
+from collections import OrderedDict
+
+from . import metrics
+
+SAMPLE_BYTES = 64 * 1024
+FEED_BYTES = 4096
+CACHE_SIZE = 512
+FALLBACK = "cp1252"
+MIN_CONFIDENCE = 0.2
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def samples(data, size=SAMPLE_BYTES):
+    """Return (start, middle, end) windows of ``data``; small inputs are one window."""
+    n = len(data)
+    if n <= 3 * size:
+        return [bytes(data)]
+    mid = (n - size) // 2
+    return [bytes(data[:size]), bytes(data[mid:mid + size]), bytes(data[n - size:])]
+
+
+def _is_utf8(windows):
+    for i, window in enumerate(windows):
+        if i > 0:
+            # Skip continuation bytes of a character cut by the window start
+            skip = 0
+            while skip < 3 and skip < len(window) and 0x80 <= window[skip] <= 0xBF:
+                skip += 1
+            window = window[skip:]
+        decoder = codecs.getincrementaldecoder("utf-8")("strict")
+        try:
+            # A character cut by the window end is not an error
+            decoder.decode(window, final=(i == len(windows) - 1))
+        except UnicodeDecodeError:
+            return False
+    return True
+
+
+def _universal_detector(windows):
+    try:
+        from chardet import UniversalDetector
+    except ImportError:
+        return None
+    detector = UniversalDetector()
+    for window in windows:
+        for start in range(0, len(window), FEED_BYTES):
+            detector.feed(window[start:start + FEED_BYTES])
+            if detector.done:
+                break
+        if detector.done:
+            break
+    detector.close()
+    if (detector.result.get("confidence") or 0) < MIN_CONFIDENCE:
+        return None
+    return detector.result.get("encoding")
+
+
+def detect_encoding(data):
+    """Return a Python codec name for ``data`` (bytes, memoryview or mmap)."""
+    windows = samples(data)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(data)).encode())
+    for window in windows:
+        digest.update(window)
+    key = digest.hexdigest()
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            metrics.inc("clauseease_encoding_detections_total", tier="cache")
+            return _cache[key]
+
+    with metrics.stage_timer("encoding_detection"):
+        head = windows[0]
+        if _is_utf8(windows):
+            tier, encoding = "utf8", "utf-8-sig" if head.startswith(codecs.BOM_UTF8) else "utf-8"
+        else:
+            bom = next((enc for mark, enc in BOMS if head.startswith(mark)), None)
+            if bom:
+                tier, encoding = "bom", bom
+            else:
+                tier, encoding = "detector", _universal_detector(windows) or FALLBACK
+    metrics.inc("clauseease_encoding_detections_total", tier=tier)
+
+    with _cache_lock:
+        _cache[key] = encoding
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return encoding
+
+
+def decode(data, errors="replace"):
+    """Decode ``data`` with the detected encoding; returns ``(text, encoding)``."""
+    encoding = detect_encoding(data)
+    try:
+        return bytes(data).decode(encoding, errors=errors), encoding
+    except LookupError:
+        return bytes(data).decode(FALLBACK, errors=errors), FALLBACK
@@ -0,0 +1,106 @@
+"""
+Cold-start import cost per module, measured with ``python -X importtime``.
+
+Each target is imported in a fresh interpreter, so nothing is cached. The
+report lists the modules with the highest cumulative cost and the total::
+
+    python -m clauseease.importtime                      # ClauseEase modules and heavy dependencies
+    python -m clauseease.importtime "Smita Vaidya/chat.py" --top 15
+    python -m clauseease.importtime pandas fitz --repeat 5
+
+For an app script, only its top-level imports are run (not the Streamlit
+page), which is what a cold start or a new worker pays before the first
+render. Compare runs before and after a change to catch eager imports
+creeping back in.
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "clauseease"
+HEAVY = ("pandas", "numpy", "fitz", "pypdf", "PyPDF2", "docx", "langdetect", "chardet",
+         "langchain_text_splitters", "streamlit", "requests", "aiohttp")
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+
+def _package_modules():
+    names = []
+    for entry in sorted(os.listdir(os.path.join(ROOT, PACKAGE))):
+        if entry.endswith(".py") and entry != "__init__.py" and entry != "importtime.py":
+            names.append(f"{PACKAGE}.{entry[:-3]}")
+    return names
+
+
+def app_imports(path):
+    """The top-level import statements of an app script, as code."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    statements = [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(statements)
+
+
+def measure(code):
+    """Run ``code`` with ``-X importtime``; returns ``[(module, self_us, cumulative_us, depth)]``."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+               CLAUSEEASE_PREWARM="0")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                          env=env, cwd=ROOT)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2)), depth))
+    return rows
+
+
+def best_of(code, repeat):
+    """The fastest of ``repeat`` runs, by total import time (less noise from a busy machine)."""
+    runs = [measure(code) for _ in range(repeat)]
+    return min(runs, key=lambda rows: sum(r[2] for r in rows if r[3] == 0))
+
+
+def report(label, rows, top=10, out=print):
+    total = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    out(f"{label}: {total / 1000:.1f} ms")
+    # Modules imported directly by the target; their dependencies are included in the cumulative time
+    for name, own, cumulative, depth in sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:top]:
+        out(f"  {cumulative / 1000:>9.1f} ms  (self {own / 1000:>7.1f})  {name}")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import time per module")
+    parser.add_argument("targets", nargs="*", help="module names or app scripts; default: ClauseEase + heavy deps")
+    parser.add_argument("--top", type=int, default=10, help="modules to list per target")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per target; the fastest is reported")
+    args = parser.parse_args(argv)
+
+    targets = args.targets or _package_modules() + list(HEAVY)
+    totals = []
+    for target in targets:
+        if target.endswith(".py"):
+            code, label = app_imports(target), target
+        else:
+            code, label = f"import {target}", target
+        try:
+            rows = best_of(code, args.repeat)
+        except RuntimeError as e:
+            print(f"{label}: not importable ({e})")
+            continue
+        totals.append((report(label, rows, args.top if args.targets else 0), label))
+    if len(totals) > 1:
+        print("\nSlowest targets:")
+        for total, label in sorted(totals, reverse=True)[:args.top]:
+            print(f"  {total / 1000:>9.1f} ms  {label}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Document and chunk language detection.
+
+Only a short leading snippet is inspected, and text whose letters are all
+ASCII is taken to be English without calling the detector (typographic
+quotes, dashes and currency signs do not count). ``langdetect`` is
+optional; without it other text is reported as ``"Unknown"``.
+
+Chunks are tagged at ingestion (:func:`tag_chunks`) so that pipelines only
+send the foreign-language ones through translation.
+"""
+SNIPPET_CHARS = 500
+
+LANGUAGE_NAMES = {
+    "en": "English", "hi": "Hindi", "es": "Spanish", "fr": "French", "de": "German",
+    "zh-cn": "Chinese", "zh-tw": "Chinese", "ru": "Russian", "ja": "Japanese",
+    "ko": "Korean", "ar": "Arabic", "it": "Italian", "bn": "Bengali",
+}
+
+
+def detect_code(text):
+    """ISO code from ``langdetect`` (e.g. ``"hi"``), or ``None`` if it is missing or unsure."""
+    try:
+        # Imported on first use: langdetect also reads its language profiles then
+        from langdetect import DetectorFactory, detect
+
+        DetectorFactory.seed = 0
+        return detect(text)
+    except Exception:
+        return None
+
+
+def detect_language(text):
+    """Human-readable language name for ``text``, e.g. ``"English"``."""
+    snippet = text[:SNIPPET_CHARS].strip()
+    if all(c.isascii() for c in snippet if c.isalpha()):
+        return "English"
+    code = detect_code(snippet)
+    if code is None:
+        return "Unknown"
+    return LANGUAGE_NAMES.get(code, code)
+
+
+def needs_translation(lang, target="English"):
+    """True unless ``lang`` is already ``target``; undetectable text is translated to be safe."""
+    return lang != target
+
+
+def tag_chunks(chunks):
+    """Set ``chunk["lang"]`` on chunk dicts that lack it; returns characters per language."""
+    composition = {}
+    for chunk in chunks:
+        if "lang" not in chunk:
+            chunk["lang"] = detect_language(chunk["text"])
+        composition[chunk["lang"]] = composition.get(chunk["lang"], 0) + len(chunk["text"])
+    return composition
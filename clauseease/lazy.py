@@ -0,0 +1,106 @@
+"""
+Deferred imports for heavy, format-specific dependencies.
+
+``pandas`` alone costs about half a second to import, and ``fitz``,
+``pypdf``, ``docx`` and ``chardet`` add more, yet a user who only chats
+needs none of them. Modules hold a :class:`LazyModule` instead and import
+the dependency on first attribute access::
+
+    pd = lazy.module("pandas")
+
+:func:`prewarm` imports the usual suspects on a daemon thread while the
+first page renders, so the first upload rarely waits either. Set
+``CLAUSEEASE_PREWARM=0`` to turn it off (e.g. in worker processes).
+Import times go to ``clauseease_import_seconds{module}``; run
+``python -m clauseease.importtime`` to measure cold-start cost per module.
+"""
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+from . import metrics
+
+PREWARM = os.environ.get("CLAUSEEASE_PREWARM", "1") != "0"
+# A tuple means "the first of these that is installed", mirroring the extractors' fallbacks
+PREWARM_MODULES = (("fitz", "pypdf"), "docx", "chardet", "langdetect")
+
+_lock = threading.Lock()
+_prewarmed = False
+
+
+def _load_langdetect_profiles(langdetect):
+    # The language profiles are read from disk on the first detect() call
+    from langdetect.detector_factory import init_factory
+
+    init_factory()
+
+
+# Extra work that makes a module fully ready, beyond importing it
+WARMUPS = {"langdetect": _load_langdetect_profiles}
+
+
+def load(name):
+    """Import ``name`` (once), recording how long it took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    metrics.observe("clauseease_import_seconds", time.perf_counter() - start, module=name)
+    return module
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = load(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def module(name):
+    return LazyModule(name)
+
+
+def available(name):
+    """True if ``name`` can be imported, without importing it."""
+    return importlib.util.find_spec(name) is not None
+
+
+def _warm(names):
+    for entry in names:
+        for name in (entry,) if isinstance(entry, str) else entry:
+            try:
+                mod = load(name)
+                if name in WARMUPS:
+                    WARMUPS[name](mod)
+                break
+            except Exception:
+                # Optional dependency not installed: try the alternative, if any
+                continue
+
+
+def prewarm(names=PREWARM_MODULES):
+    """Import ``names`` on a daemon thread, once per process; no-op if ``CLAUSEEASE_PREWARM=0``."""
+    global _prewarmed
+    if not PREWARM:
+        return None
+    with _lock:
+        if _prewarmed:
+            return None
+        _prewarmed = True
+    thread = threading.Thread(target=_warm, args=(tuple(names),), daemon=True, name="clauseease-prewarm")
+    thread.start()
+    return thread
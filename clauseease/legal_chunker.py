@@ -0,0 +1,196 @@
+"""
+Legal-structure-aware chunking with a clause index.
+
+Contracts are split on their own structure — articles, sections, numbered
+clauses, schedules, annexes — so that "Section 12.3 Indemnification" is
+one chunk instead of being cut in half by a character window. Only
+clauses longer than ``max_chars`` are split further, on paragraph and then
+sentence boundaries, and every piece keeps its heading.
+
+The resulting :class:`ClauseIndex` maps clause numbers to chunks so that a
+question such as "What does 12.3 say?" resolves to one small prompt.
+"""
+import re
+
+from . import metrics, tuning
+
+# Used when chunk sizes have not been calibrated (see clauseease.calibrate)
+DEFAULT_MAX_CHARS = 2000
+
+KEYWORDS = {
+    "article": "article", "section": "section", "sec": "section", "clause": "clause",
+    "schedule": "schedule", "annex": "annex", "annexure": "annex", "exhibit": "exhibit",
+    "appendix": "appendix", "part": "part", "§": "section",
+}
+
+HEADING_RE = re.compile(
+    r"""^[ \t]*(?:
+        (?P<kw>article|section|sec\.|clause|schedule|annexure|annex|exhibit|appendix|part|§)
+            [ \t]*(?P<kwnum>\d+(?:\.\d+)*|[IVXLC]+|[A-Z])\b\.?
+      | (?P<num>\d{1,3}(?:\.\d{1,3}){0,4})(?P<punct>[.)]?)(?=[ \t]+\S)
+    )[ \t]*[:.\-–—]?[ \t]*(?P<title>[^\n]*)$""",
+    re.MULTILINE | re.VERBOSE | re.IGNORECASE,
+)
+
+REFERENCE_RE = re.compile(
+    r"(?:\b(?P<kw>article|section|sec\.?|clause|schedule|annexure|annex|exhibit|appendix|part)|§)"
+    r"\s*(?P<num>\d+(?:\.\d+)*|[IVXLC]+\b|[A-Z]\b)"
+    r"|\b(?P<bare>\d{1,3}(?:\.\d{1,3}){1,4})\b",
+    re.IGNORECASE,
+)
+
+SENTENCE_END_RE = re.compile(r"(?<=[.;:])\s+")
+MAX_HEADING_CHARS = 80
+
+
+def _normalize(kind, number):
+    number = number.rstrip(".").lower()
+    # Dotted and arabic numbers are unambiguous on their own; letters/roman numerals need the kind
+    if re.fullmatch(r"\d+(?:\.\d+)*", number) and kind in (None, "section", "clause"):
+        return number
+    return f"{kind or 'section'} {number}"
+
+
+def _is_heading(match):
+    if match.group("kw"):
+        return True
+    title = match.group("title").strip()
+    if not title:
+        return False
+    # Bare numbers ("30 days") only count with a dot or bracket, or an all-caps title
+    if "." in match.group("num") or match.group("punct"):
+        return title[0].isupper() or title[0] in "(\"“"
+    return title.isupper()
+
+
+def split_clauses(text):
+    """Return ``[(key, heading, body)]`` in document order; the preamble has key ``None``."""
+    clauses = []
+    last_start, last_key, last_heading = 0, None, "Preamble"
+    for match in HEADING_RE.finditer(text):
+        if not _is_heading(match):
+            continue
+        if match.group("kw"):
+            kind = KEYWORDS[match.group("kw").lower().rstrip(".")]
+            key = _normalize(kind, match.group("kwnum"))
+        else:
+            key = _normalize(None, match.group("num"))
+        body = text[last_start:match.start()].strip()
+        if body:
+            clauses.append((last_key, last_heading, body))
+        heading = match.group(0).strip()
+        last_start, last_key, last_heading = match.start(), key, heading[:MAX_HEADING_CHARS]
+    body = text[last_start:].strip()
+    if body:
+        clauses.append((last_key, last_heading, body))
+    return clauses
+
+
+def _split_oversize(body, max_chars):
+    """Split a long clause on paragraphs, then sentences, then hard cuts."""
+    units = []
+    for para in re.split(r"\n\s*\n", body):
+        units.extend([para] if len(para) <= max_chars else SENTENCE_END_RE.split(para))
+
+    pieces, current, size = [], [], 0
+    for unit in units:
+        # A single sentence longer than the budget is cut hard
+        for start in range(0, len(unit), max_chars):
+            piece = unit[start:start + max_chars]
+            if current and size + len(piece) > max_chars:
+                pieces.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 2
+    if current:
+        pieces.append("\n\n".join(current))
+    return pieces
+
+
+def chunk_by_clause(text, max_chars=None):
+    """
+    One chunk per clause; oversize clauses are split with their heading repeated.
+
+    ``max_chars`` defaults to the calibrated chunk size (:mod:`clauseease.tuning`).
+
+    Returns a list of dicts with ``id``, ``clause`` (normalised number or
+    ``None``), ``heading``, ``part`` and ``text``.
+    """
+    max_chars = max_chars or tuning.chunk_settings(default=(DEFAULT_MAX_CHARS, 0))[0]
+    chunks = []
+    with metrics.stage_timer("chunking", mode="clause"):
+        for key, heading, body in split_clauses(text):
+            parts = [body] if len(body) <= max_chars else _split_oversize(body, max_chars)
+            for i, part in enumerate(parts):
+                if i > 0:
+                    part = f"{heading} (continued)\n{part}"
+                chunks.append({"id": len(chunks), "clause": key, "heading": heading,
+                               "part": i, "text": part})
+    return chunks
+
+
+def find_references(question):
+    """Normalised clause keys mentioned in a question, e.g. ``["12.3", "schedule 2"]``."""
+    refs = []
+    for match in REFERENCE_RE.finditer(question):
+        if match.group("bare"):
+            key = _normalize(None, match.group("bare"))
+        else:
+            kw = (match.group("kw") or "§").lower().rstrip(".")
+            key = _normalize(KEYWORDS.get(kw, "section"), match.group("num"))
+        if key not in refs:
+            refs.append(key)
+    return refs
+
+
+class ClauseIndex:
+    """Clause key -> chunk ids, over the chunks from :func:`chunk_by_clause`."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self._index = {}
+        for chunk in chunks:
+            if chunk["clause"]:
+                self._index.setdefault(chunk["clause"], []).append(chunk["id"])
+
+    @classmethod
+    def from_text(cls, text, max_chars=None):
+        return cls(chunk_by_clause(text, max_chars=max_chars))
+
+    def __len__(self):
+        return len(self._index)
+
+    def keys(self):
+        return list(self._index)
+
+    def lookup(self, key, include_children=True, max_chunks=8):
+        """Chunks for one clause key, followed by its sub-clauses (12 -> 12.1, 12.2...)."""
+        ids = list(self._index.get(key, []))
+        if include_children:
+            prefix = key + "."
+            for other, other_ids in self._index.items():
+                if other.startswith(prefix):
+                    ids.extend(other_ids)
+        return [self.chunks[i] for i in sorted(set(ids))[:max_chunks]]
+
+    def resolve(self, question):
+        """Return ``(keys, chunks)`` for the clauses named in a question, or ``([], [])``."""
+        keys = [k for k in find_references(question) if k in self._index]
+        chunks = []
+        for key in keys:
+            chunks.extend(c for c in self.lookup(key) if c not in chunks)
+        return keys, chunks
+
+
+def pack_clauses(chunks, max_chars):
+    """Group consecutive clause chunks into prompts of up to ``max_chars`` without splitting any."""
+    groups, current, size = [], [], 0
+    for chunk in chunks:
+        if current and size + len(chunk["text"]) > max_chars:
+            groups.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(chunk["text"])
+        size += len(chunk["text"]) + 2
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
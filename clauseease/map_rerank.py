@@ -0,0 +1,182 @@
+"""
+Map-rerank Q&A for broad questions that a few retrieved chunks can't answer.
+
+"List every termination right in this agreement" needs evidence from all
+over a contract, and stuffing the whole text into one prompt is slow and
+truncates long documents. Instead the question is sent to every relevant
+chunk concurrently, on a small model (router task ``rerank``), which
+replies with JSON ``{"answer": ..., "score": 0-10}`` for its excerpt.
+Once ``enough`` answers score at least ``high_score`` the remaining calls
+are cancelled. The best answers are then merged into one reply by a single
+streamed call to the Q&A model::
+
+    hits = map_rerank.map_answers(question, chunks, user=session_id)
+    for piece in map_rerank.merged_stream(question, hits):
+        ...
+
+Calls go through the shared scheduler at interactive priority, so other
+users still take turns. Outcomes are counted in
+``clauseease_map_rerank_total{result}`` (``answered``, ``irrelevant``,
+``failed``, ``skipped``).
+"""
+import heapq
+import json
+import os
+import re
+from collections import namedtuple
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from . import metrics, ollama_client, router
+from .scheduler import INTERACTIVE, CancelToken, GenerationCancelled, SchedulerBusy, default_scheduler
+
+PARALLEL = int(os.environ.get("CLAUSEEASE_RERANK_PARALLEL", "4"))
+MAX_CHUNKS = 64
+HIGH_SCORE = 8
+MIN_SCORE = 3
+ENOUGH_HITS = 4
+MERGE_TOP = 6
+# Below this, one prompt with the whole document is faster than a fan-out
+STUFF_CHARS = 12000
+
+MAP_PROMPT = """Answer the question using only this contract excerpt.
+Reply with JSON: {{"answer": "<short answer, quoting amounts, dates and clause numbers>", "score": <0-10>}}
+The score says how well the excerpt answers the question: 0 if it is irrelevant, 10 if it answers it fully.
+
+EXCERPT:
+{text}
+
+QUESTION: {question}"""
+
+MERGE_PROMPT = """Combine these answers, each taken from a different excerpt of the same contract, into one answer.
+Keep every distinct point, drop repeats, and mention the excerpt numbers where it helps.{language}
+
+{answers}
+
+QUESTION: {question}
+ANSWER:"""
+
+# "any" alone is a yes/no question ("Is there any penalty?"), not a request for the whole document
+BROAD_RE = re.compile(r"\b(all|every|each|list|summari[sz]e|overview|throughout|anywhere)\b", re.I)
+WORD_RE = re.compile(r"[a-z0-9]{3,}")
+SCORE_RE = re.compile(r'"?score"?\s*[:=]\s*(\d+(?:\.\d+)?)', re.I)
+ANSWER_RE = re.compile(r'"?answer"?\s*[:=]\s*"((?:[^"\\]|\\.)*)"', re.I | re.S)
+STOPWORDS = {"the", "and", "for", "with", "what", "which", "who", "how", "are", "does", "this", "that",
+             "all", "any", "each", "every", "list", "agreement", "contract", "there", "under", "from"}
+
+Hit = namedtuple("Hit", "chunk answer score")
+
+
+def is_broad(question):
+    """True for questions that ask about the whole document rather than one fact."""
+    return bool(BROAD_RE.search(question or ""))
+
+
+def relevant_chunks(question, chunks, limit=MAX_CHUNKS):
+    """
+    ``[(index, text)]`` of chunks sharing words with the question, best first.
+
+    When no chunk shares a word (e.g. the question is in another language)
+    every chunk is relevant, in document order.
+    """
+    asked = set(WORD_RE.findall(question.lower())) - STOPWORDS
+    # Only the best ``limit`` indices are kept, so lazily decoded chunks are read one at a time
+    overlaps = ((-len(asked & set(WORD_RE.findall(text.lower()))), i) for i, text in enumerate(chunks))
+    best = heapq.nsmallest(limit, (pair for pair in overlaps if pair[0]))
+    if not best:
+        return list(islice(enumerate(chunks), limit))
+    return [(i, chunks[i]) for _, i in best]
+
+
+def parse_scored(reply):
+    """``(answer, score)`` from a model reply, or ``None`` if it has neither."""
+    try:
+        data = json.loads(reply)
+        if isinstance(data, dict):
+            return str(data.get("answer", "")).strip(), float(data.get("score", 0))
+    except (json.JSONDecodeError, TypeError, ValueError):
+        pass
+    # Small models sometimes wrap the JSON in prose or leave it unterminated
+    score, answer = SCORE_RE.search(reply), ANSWER_RE.search(reply)
+    if not score:
+        return None
+    return (answer.group(1).strip() if answer else ""), float(score.group(1))
+
+
+def _map_one(question, index, text, user, token, affinity):
+    prompt = MAP_PROMPT.format(text=text, question=question)
+    model, options = router.route(router.RERANK, prompt)
+    pieces = ollama_client.coalesced_stream(
+        prompt, model=model, options=options, cancel_token=token, affinity=affinity, format="json",
+        slot=lambda flight_token: default_scheduler().slot(user, INTERACTIVE, flight_token),
+    )
+    parsed = parse_scored("".join(pieces))
+    if token.cancelled:
+        return None
+    if parsed is None or not parsed[0] or parsed[1] < MIN_SCORE:
+        metrics.inc("clauseease_map_rerank_total", result="irrelevant")
+        return None
+    metrics.inc("clauseease_map_rerank_total", result="answered")
+    return Hit(index, parsed[0], min(parsed[1], 10.0))
+
+
+def map_answers(question, chunks, user="map-rerank", cancel_token=None, parallel=PARALLEL,
+                enough=ENOUGH_HITS, high_score=HIGH_SCORE, affinity=None):
+    """
+    Ask every relevant chunk concurrently; returns the hits, best first.
+
+    Stops early once ``enough`` hits score at least ``high_score``;
+    cancelling ``cancel_token`` stops it too.
+    """
+    candidates = relevant_chunks(question, chunks)
+    # Our own token, so an early exit does not cancel the caller's session
+    token = CancelToken()
+    hits = []
+    with metrics.stage_timer("map_rerank"), \
+            ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="map-rerank") as pool:
+        pending = {pool.submit(_map_one, question, i, text, user, token, affinity) for i, text in candidates}
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    hit = future.result()
+                except (GenerationCancelled, SchedulerBusy):
+                    continue
+                except Exception:
+                    metrics.inc("clauseease_map_rerank_total", result="failed")
+                    continue
+                if hit is not None:
+                    hits.append(hit)
+            confident = sum(hit.score >= high_score for hit in hits)
+            if pending and (confident >= enough or (cancel_token is not None and cancel_token.cancelled)):
+                metrics.inc("clauseease_map_rerank_total", len(pending), result="skipped")
+                for future in pending:
+                    future.cancel()
+                token.cancel()
+                break
+    # Ties keep document order, so merged answers read top to bottom
+    return sorted(hits, key=lambda hit: (-hit.score, hit.chunk))
+
+
+def merge_prompt(question, hits, language=None):
+    top = sorted(hits[:MERGE_TOP], key=lambda hit: hit.chunk)
+    answers = "\n".join(f"[{hit.chunk + 1}] {hit.answer}" for hit in top)
+    instruction = f"\nReply in {language}." if language else ""
+    return MERGE_PROMPT.format(answers=answers, question=question, language=instruction)
+
+
+def merged_stream(question, hits, model=None, user="map-rerank", language=None, cancel_token=None,
+                  affinity=None):
+    """Stream the final answer built from the best ``hits``; one model call, none for a single English hit."""
+    if not hits:
+        yield "The document does not appear to answer this question."
+        return
+    if len(hits) == 1 and not language:
+        yield hits[0].answer
+        return
+    prompt = merge_prompt(question, hits, language)
+    model, options = router.route(router.QA, prompt, override=model)
+    yield from ollama_client.coalesced_stream(
+        prompt, model=model, options=options, cancel_token=cancel_token, affinity=affinity,
+        slot=lambda flight_token: default_scheduler().slot(user, INTERACTIVE, flight_token),
+    )
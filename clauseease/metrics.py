@@ -0,0 +1,301 @@
+"""
+In-memory latency and throughput histograms for the ClauseEase apps.
+
+Everything is kept in a process-wide registry so that all Streamlit
+sessions served by one process share the same measurements. The registry
+can be exported in the Prometheus text format, either to a file
+(``CLAUSEEASE_METRICS_FILE``, rewritten at most every
+``CLAUSEEASE_METRICS_FILE_INTERVAL`` seconds) or over HTTP
+(``CLAUSEEASE_METRICS_PORT``).
+"""
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bucket upper bounds for durations (seconds) and rates (tokens/s)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 200, 500, 1000, 5000)
+
+NANOSECONDS = 1_000_000_000
+FILE_INTERVAL = float(os.environ.get("CLAUSEEASE_METRICS_FILE_INTERVAL", "5"))
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent samples for quantiles."""
+
+    def __init__(self, buckets, recent=512):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=recent)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+
+class MetricsRegistry:
+    """Thread-safe collection of labelled histograms and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(float(value))
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def histogram(self, name, **labels):
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self):
+        """Return one summary row per histogram, for tables and panels."""
+        rows = []
+        with self._lock:
+            for (name, labels), hist in sorted(self._histograms.items()):
+                rows.append({
+                    "metric": name,
+                    "labels": ", ".join(f"{k}={v}" for k, v in labels),
+                    "count": hist.count,
+                    "mean": round(hist.mean(), 4),
+                    "p50": round(hist.quantile(0.5), 4),
+                    "p95": round(hist.quantile(0.95), 4),
+                })
+        return rows
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), hist in sorted(self._histograms.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, count in zip(_bounds(hist.buckets), hist.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {hist.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def drain(self):
+        """Return everything recorded so far as plain data for :meth:`merge`, and start afresh."""
+        with self._lock:
+            state = {
+                "histograms": {key: (hist.buckets, hist.counts, hist.count, hist.sum, list(hist.recent))
+                               for key, hist in self._histograms.items()},
+                "counters": dict(self._counters),
+            }
+            self._histograms.clear()
+            self._counters.clear()
+        return state
+
+    def merge(self, state):
+        """Add metrics drained from another registry (e.g. a worker process's) to this one."""
+        with self._lock:
+            for key, (buckets, counts, count, total, recent) in state["histograms"].items():
+                hist = self._histograms.get(key)
+                if hist is None:
+                    hist = self._histograms[key] = Histogram(buckets)
+                hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+                hist.count += count
+                hist.sum += total
+                hist.recent.extend(recent)
+            for key, value in state["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+
+
+def _bounds(buckets):
+    return [repr(float(b)) for b in buckets] + ["+Inf"]
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value):
+    """Escape a label value as the exposition format requires."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
+
+
+def observe(name, value, buckets=SECONDS_BUCKETS, **labels):
+    REGISTRY.observe(name, value, buckets=buckets, **labels)
+
+
+def inc(name, amount=1, **labels):
+    REGISTRY.inc(name, amount, **labels)
+
+
+@contextmanager
+def stage_timer(stage, **labels):
+    """Time a pipeline stage (extraction, chunking, retrieval, ...)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("clauseease_stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+
+def record_generation(model, stats, ttft=None, queue_wait=None, total=None):
+    """
+    Record one finished Ollama generation.
+
+    ``stats`` is the final (``done``) response object from Ollama; its
+    ``*_duration`` fields are reported in nanoseconds.
+    """
+    if queue_wait is not None:
+        observe("clauseease_queue_wait_seconds", queue_wait, model=model)
+    if ttft is not None:
+        observe("clauseease_ttft_seconds", ttft, model=model)
+    if total is not None:
+        observe("clauseease_generation_seconds", total, model=model)
+
+    prompt_tokens = stats.get("prompt_eval_count") or 0
+    prompt_ns = stats.get("prompt_eval_duration") or 0
+    eval_tokens = stats.get("eval_count") or 0
+    eval_ns = stats.get("eval_duration") or 0
+
+    if prompt_tokens and prompt_ns:
+        observe("clauseease_prefill_tokens_per_second",
+                prompt_tokens * NANOSECONDS / prompt_ns, buckets=RATE_BUCKETS, model=model)
+    if eval_tokens and eval_ns:
+        observe("clauseease_decode_tokens_per_second",
+                eval_tokens * NANOSECONDS / eval_ns, buckets=RATE_BUCKETS, model=model)
+    inc("clauseease_prompt_tokens_total", prompt_tokens, model=model)
+    inc("clauseease_completion_tokens_total", eval_tokens, model=model)
+
+    if os.environ.get("CLAUSEEASE_METRICS_FILE"):
+        schedule_write()
+
+
+def to_prometheus():
+    return REGISTRY.to_prometheus()
+
+
+def write_prometheus(path=None):
+    """Atomically write the current metrics to a ``.prom`` file."""
+    path = path or os.environ.get("CLAUSEEASE_METRICS_FILE", "clauseease_metrics.prom")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(to_prometheus())
+    os.replace(tmp, path)
+    return path
+
+
+_write_lock = threading.Lock()
+_last_write = 0.0
+_pending_write = None
+
+
+def schedule_write(interval=FILE_INTERVAL):
+    """
+    Write the ``.prom`` file now, or once ``interval`` seconds have passed
+    since the last write; bursts of generations cost one write.
+    """
+    global _last_write, _pending_write
+    with _write_lock:
+        if _pending_write is not None:
+            return
+        wait = _last_write + interval - time.monotonic()
+        if wait > 0:
+            _pending_write = threading.Timer(wait, _timed_write)
+            _pending_write.daemon = True
+            _pending_write.start()
+            return
+        _last_write = time.monotonic()
+    write_prometheus()
+
+
+def _timed_write():
+    global _last_write, _pending_write
+    with _write_lock:
+        _pending_write = None
+        _last_write = time.monotonic()
+    write_prometheus()
+
+
+# --- HTTP exporter ---
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_exporter(port=None, host="127.0.0.1"):
+    """
+    Serve ``/metrics`` on a daemon thread. Safe to call on every rerun;
+    does nothing when no port is given or configured.
+    """
+    global _exporter
+    port = port or os.environ.get("CLAUSEEASE_METRICS_PORT")
+    if not port:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            threading.Thread(target=_exporter.serve_forever, daemon=True).start()
+    return _exporter
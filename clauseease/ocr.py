@@ -0,0 +1,119 @@
+"""
+Selective OCR for scanned PDF pages.
+
+Only pages whose text layer is empty or nearly empty are OCR'd. Scanned
+contracts get their text back, and born-digital PDFs pay nothing. Pages
+are rasterized with PyMuPDF in the calling process and recognised by local
+Tesseract in a process pool, so a 60-page scan uses every core. Inside an
+ingestion worker (see :mod:`clauseease.pipeline`) pages are recognised in
+that worker instead: the ingestion pool already spreads work over the cores.
+
+Results are cached by a hash of the page's content stream and embedded
+images. Re-uploading a scan, or a new version that keeps most of its
+pages, only OCRs the pages that changed.
+
+Needs the ``tesseract`` binary and ``pytesseract``; without them
+:func:`available` is false and extraction falls back to the text layer.
+Set ``CLAUSEEASE_OCR=0`` to disable OCR entirely.
+"""
+import hashlib
+import io
+import os
+import shutil
+import threading
+
+from . import metrics, workers
+from .versioning import ContentCache
+
+ENABLED = os.environ.get("CLAUSEEASE_OCR", "1") != "0"
+MIN_TEXT_CHARS = int(os.environ.get("CLAUSEEASE_OCR_MIN_CHARS", "20"))
+DPI = int(os.environ.get("CLAUSEEASE_OCR_DPI", "300"))
+LANGUAGES = os.environ.get("CLAUSEEASE_OCR_LANG", "eng")
+WORKERS = int(os.environ.get("CLAUSEEASE_OCR_WORKERS", "0")) or os.cpu_count() or 1
+
+PAGES = ContentCache("ocr_pages", max_items=5000)
+
+_pool = None
+_pool_lock = threading.Lock()
+_available = None
+
+
+def available():
+    """True when OCR is enabled and Tesseract can be called."""
+    global _available
+    if _available is None:
+        try:
+            import pytesseract  # noqa: F401
+            _available = ENABLED and shutil.which("tesseract") is not None
+        except ImportError:
+            _available = False
+    return _available
+
+
+def needs_ocr(text):
+    """A page needs OCR when its text layer has (almost) nothing in it."""
+    return len((text or "").strip()) < MIN_TEXT_CHARS
+
+
+def page_key(doc, page):
+    """Hash of what is drawn on the page: its content stream and embedded images."""
+    digest = hashlib.blake2b(f"{DPI}:{LANGUAGES}".encode(), digest_size=20)
+    digest.update(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(doc.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+
+def _recognise(png, languages):
+    # Runs in a worker process
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png)) as image:
+        return pytesseract.image_to_string(image, lang=languages)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = workers.process_pool(WORKERS)
+        return _pool
+
+
+def ocr_pages(doc, page_numbers):
+    """
+    OCR the given pages of an open PyMuPDF ``doc``.
+
+    Returns ``{page_number: text}``; cached pages are not rasterized again.
+    """
+    import fitz
+
+    results, pending = {}, {}
+    for number in page_numbers:
+        page = doc[number]
+        key = page_key(doc, page)
+        text = PAGES.get(key)
+        if text is None:
+            pending[number] = key
+        else:
+            results[number] = text
+    metrics.inc("clauseease_ocr_pages_total", len(results), result="cached")
+    if not pending:
+        return results
+
+    with metrics.stage_timer("ocr"):
+        images = {n: doc[n].get_pixmap(dpi=DPI, colorspace=fitz.csGRAY).tobytes("png") for n in pending}
+        if len(images) == 1 or workers.in_worker():
+            # Not worth starting workers for a single page; inside an ingestion worker the
+            # other workers already use every core, and a pool per worker would multiply processes
+            recognised = {n: _recognise(png, LANGUAGES) for n, png in images.items()}
+        else:
+            pool = _get_pool()
+            futures = {n: pool.submit(_recognise, png, LANGUAGES) for n, png in images.items()}
+            recognised = {n: future.result() for n, future in futures.items()}
+    for number, text in recognised.items():
+        PAGES.put(pending[number], text)
+        results[number] = text
+    metrics.inc("clauseease_ocr_pages_total", len(recognised), result="ocr")
+    return results
@@ -0,0 +1,205 @@
+"""
+Thin Ollama HTTP client that records per-request latency and throughput.
+
+Ollama's final (``done``) message carries ``prompt_eval_count``,
+``prompt_eval_duration``, ``eval_count`` and ``eval_duration``; these are
+forwarded to :mod:`clauseease.metrics` instead of being discarded.
+
+Without an explicit ``base_url``, requests are spread over ``OLLAMA_URLS``
+by :mod:`clauseease.balancer`; pass ``affinity`` (e.g. a document id) to
+keep follow-ups on the same server.
+
+Identical concurrent requests are coalesced (:mod:`clauseease.singleflight`).
+:func:`coalesced_stream` shares one generation between callers with the
+same model, options and prompt, and :func:`chat` does the same for
+non-streaming calls.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+import requests
+
+from . import metrics
+from .balancer import default_balancer
+from .singleflight import SingleFlight, flight_key
+
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+
+_generations = SingleFlight("generate")
+_chats = SingleFlight("chat")
+
+
+@contextmanager
+def _post(path, payload, model=None, affinity=None, timeout=300, base_url=None, stream=False):
+    """POST to ``base_url`` or a balanced endpoint; connection failures move on to the next endpoint."""
+    if base_url:
+        with requests.post(f"{base_url}{path}", json=payload, stream=stream, timeout=timeout) as resp:
+            resp.raise_for_status()
+            yield resp
+        return
+
+    balancer = default_balancer()
+    attempts = len(balancer.endpoints)
+    for attempt in range(attempts):
+        endpoint = balancer.acquire(model, affinity)
+        try:
+            resp = requests.post(f"{endpoint.url}{path}", json=payload, stream=stream, timeout=timeout)
+            break
+        except (requests.ConnectionError, requests.Timeout):
+            balancer.release(endpoint, failed=True)
+            if attempt == attempts - 1:
+                raise
+    failed = False
+    try:
+        with resp:
+            resp.raise_for_status()
+            yield resp
+    except (requests.ConnectionError, requests.Timeout):
+        failed = True
+        raise
+    finally:
+        balancer.release(endpoint, model=model, failed=failed)
+
+
+def stream_generate(prompt, model, system=None, options=None, timeout=300, base_url=None,
+                    cancel_token=None, affinity=None, format=None):
+    """
+    Yield response text pieces from ``/api/generate`` as they arrive.
+
+    If ``cancel_token`` is cancelled the HTTP stream is closed, which makes
+    Ollama stop generating and release the model slot. ``format="json"``
+    constrains the reply to valid JSON.
+    """
+    payload = {"model": model, "prompt": prompt, "stream": True}
+    if system:
+        payload["system"] = system
+    if options:
+        payload["options"] = options
+    if format:
+        payload["format"] = format
+
+    start = time.perf_counter()
+    ttft = None
+    with _post("/api/generate", payload, model=model, affinity=affinity, timeout=timeout,
+               base_url=base_url, stream=True) as resp:
+        # Headers arrive once Ollama has a runner for us: server-side queueing + model load
+        queue_wait = time.perf_counter() - start
+        if cancel_token is not None:
+            cancel_token.attach(resp)
+
+        try:
+            for line in resp.iter_lines():
+                if cancel_token is not None and cancel_token.cancelled:
+                    break
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                piece = data.get("response", "")
+                if piece:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    yield piece
+                if data.get("done"):
+                    metrics.record_generation(model, data, ttft=ttft, queue_wait=queue_wait,
+                                              total=time.perf_counter() - start)
+                    break
+        except (requests.RequestException, AttributeError, ValueError, OSError):
+            # Closing the response from another thread interrupts the read
+            if cancel_token is None or not cancel_token.cancelled:
+                raise
+        finally:
+            if cancel_token is not None:
+                cancel_token.detach(resp)
+
+
+def generate(prompt, model, system=None, options=None, timeout=300, base_url=None,
+             cancel_token=None, affinity=None, format=None):
+    """Return the full ``/api/generate`` response text."""
+    return "".join(stream_generate(prompt, model, system=system, options=options,
+                                   timeout=timeout, base_url=base_url,
+                                   cancel_token=cancel_token, affinity=affinity, format=format))
+
+
+def coalesced_stream(prompt, model, system=None, options=None, timeout=300, cancel_token=None,
+                     affinity=None, slot=None, format=None):
+    """
+    :func:`stream_generate`, shared by identical concurrent callers.
+
+    ``slot(token)`` returns a context manager (typically a scheduler slot)
+    that only the caller who starts the generation enters; the others
+    attach to its output. ``cancel_token`` stops this caller only.
+    """
+    def produce(token):
+        with slot(token) if slot else nullcontext():
+            yield from stream_generate(prompt, model, system=system, options=options, timeout=timeout,
+                                       cancel_token=token, affinity=affinity, format=format)
+
+    key = flight_key(model, options, system, format, prompt)
+    return _generations.stream(key, produce, cancel_token=cancel_token)
+
+
+def list_models(base_url=None, timeout=3):
+    """Return the names of the models installed on the Ollama server(s)."""
+    names = []
+    for url in [base_url] if base_url else default_balancer().urls:
+        try:
+            resp = requests.get(f"{url}/api/tags", timeout=timeout)
+            resp.raise_for_status()
+        except requests.RequestException:
+            if base_url:
+                raise
+            continue
+        names.extend(m["name"] for m in resp.json().get("models", []) if m["name"] not in names)
+    return names
+
+
+def version(base_url=None, timeout=3):
+    """Return the ``/api/version`` payload of the server (or the first reachable one)."""
+    error = None
+    for url in [base_url] if base_url else default_balancer().urls:
+        try:
+            resp = requests.get(f"{url}/api/version", timeout=timeout)
+            resp.raise_for_status()
+            return resp.json()
+        except requests.RequestException as e:
+            error = e
+    raise error
+
+
+def show(model, base_url=None, timeout=10):
+    """Return the ``/api/show`` details of ``model`` (parameters, ``model_info``)."""
+    with _post("/api/show", {"model": model}, model=model, timeout=timeout, base_url=base_url) as resp:
+        return resp.json()
+
+
+def chat(messages, model, options=None, timeout=300, base_url=None, affinity=None, coalesce=True):
+    """Return the assistant reply from a non-streaming ``/api/chat`` call."""
+    if coalesce:
+        return _chats.call(flight_key(model, options, messages),
+                           lambda: chat(messages, model, options=options, timeout=timeout, base_url=base_url,
+                                        affinity=affinity, coalesce=False))
+    payload = {"model": model, "messages": messages, "stream": False}
+    if options:
+        payload["options"] = options
+
+    start = time.perf_counter()
+    with _post("/api/chat", payload, model=model, affinity=affinity, timeout=timeout,
+               base_url=base_url) as resp:
+        data = resp.json()
+    metrics.record_generation(model, data, total=time.perf_counter() - start)
+    return data.get("message", {}).get("content", "")
+
+
+def embed(texts, model, timeout=300, base_url=None):
+    """Return one embedding vector per text from ``/api/embed``."""
+    start = time.perf_counter()
+    with _post("/api/embed", {"model": model, "input": list(texts)}, model=model, timeout=timeout,
+               base_url=base_url) as resp:
+        data = resp.json()
+    metrics.observe("clauseease_embedding_seconds", time.perf_counter() - start, model=model)
+    return data.get("embeddings", [])
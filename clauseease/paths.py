@@ -0,0 +1,23 @@
+"""
+Where ClauseEase keeps state shared by every app: calibration results,
+the translation memory and similar files.
+
+Everything goes under ``CLAUSEEASE_STATE_DIR`` (default ``.clauseease``
+at the repository root), never the working directory, so apps started
+from their own folders read and write the same files.
+"""
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DIR = os.environ.get("CLAUSEEASE_STATE_DIR") or os.path.join(ROOT, ".clauseease")
+
+
+def state_path(name):
+    """Absolute path of ``name`` inside the state directory."""
+    return os.path.join(STATE_DIR, name)
+
+
+def ensure_parent(path):
+    """Create the directory ``path`` will be written to; returns ``path``."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return path
@@ -0,0 +1,61 @@
+"""
+CPU-bound ingestion stages: extraction, chunking and language tagging.
+
+:func:`prepare_document` takes raw upload bytes and returns plain data
+(text, chunks, language) that pickles cheaply, so it runs in worker
+processes: the API server's pool and :mod:`clauseease.archive` both
+dispatch to it. A worker's metrics registry is its own, so the metrics
+recorded on the way travel back with the result; :func:`collect` adds
+them to the parent's registry. :func:`default_pool` is a process-wide pool (see
+:mod:`clauseease.workers`) for callers that do not manage their own.
+"""
+import os
+import threading
+
+from . import extractors, language, legal_chunker, metrics, profiling, versioning, workers
+
+WORKERS = int(os.environ.get("CLAUSEEASE_INGEST_WORKERS", "0")) or os.cpu_count()
+
+
+def prepare_document(data, filename, doc_id="", profile=False):
+    """CPU-bound ingestion stages; runs in a worker process."""
+    with profiling.profile("ingest", label=doc_id, enabled=profile):
+        prepared = _prepare(data, filename)
+    if workers.in_worker():
+        prepared["metrics"] = metrics.REGISTRY.drain()
+    return prepared
+
+
+def collect(prepared):
+    """Merge the metrics a worker returned with ``prepared`` into this process's registry."""
+    if isinstance(prepared, dict) and "metrics" in prepared:
+        metrics.REGISTRY.merge(prepared.pop("metrics"))
+    return prepared
+
+
+def _prepare(data, filename):
+    extraction = extractors.extract(data, filename)
+    text = extraction.text
+    clause_chunks = legal_chunker.chunk_by_clause(text)
+    # Per-chunk languages let the summary tree translate only the foreign-language parts
+    language.tag_chunks(clause_chunks)
+    return {
+        "kind": extraction.kind,
+        "full_text": text,
+        "chunks": versioning.cdc_chunks(text),
+        "clause_chunks": clause_chunks,
+        "lang": language.detect_language(text),
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def default_pool():
+    """Process-wide ingestion pool with ``CLAUSEEASE_INGEST_WORKERS`` processes (default: one per CPU)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = workers.process_pool(WORKERS)
+        return _pool
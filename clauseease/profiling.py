@@ -0,0 +1,158 @@
+"""
+Opt-in profiling of single pipeline runs and reruns.
+
+Profiling is off unless ``CLAUSEEASE_PROFILE=1`` is set, or a request
+carries ``?profile=<token>``. The token is ``CLAUSEEASE_PROFILE_TOKEN``; if
+that is unset, the query parameter alone is not honoured. A profiled run
+writes two files to ``CLAUSEEASE_PROFILE_DIR`` (default ``profiles``), named
+after the stage and label (usually the document hash):
+
+- ``<stage>-<label>-<time>.html`` — pyinstrument's interactive flame view
+- ``<stage>-<label>-<time>.pstats`` — for ``python -m pstats`` or snakeviz
+
+pyinstrument is a sampling profiler and is used when installed. Otherwise
+``cProfile`` writes the ``.pstats`` file and a plain-text report takes the
+place of the HTML. When profiling is off, :func:`profile` returns a shared
+no-op context manager, so wrapping hot paths costs one function call.
+
+Both profilers only see the thread that started them. Work handed to
+another thread on the run's behalf (e.g. the single-flight generation
+thread) is wrapped in :func:`follow`, which profiles that thread too and
+merges it into the run's report.
+"""
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from . import metrics
+
+ENABLED = os.environ.get("CLAUSEEASE_PROFILE", "0") == "1"
+TOKEN = os.environ.get("CLAUSEEASE_PROFILE_TOKEN")
+PROFILE_DIR = os.environ.get("CLAUSEEASE_PROFILE_DIR", "profiles")
+QUERY_PARAM = "profile"
+# Sampling interval for pyinstrument (seconds)
+INTERVAL = 0.001
+
+_DISABLED = nullcontext()
+# The run being profiled in this context; copied into threads started on its behalf
+_current = contextvars.ContextVar("clauseease_profile", default=None)
+UNSAFE_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def requested(query_params):
+    """True if a request's query parameters ask for profiling with the right token."""
+    return bool(TOKEN) and query_params.get(QUERY_PARAM) == TOKEN
+
+
+def profile(stage, label="", enabled=False):
+    """
+    Context manager profiling the enclosed block when profiling is on.
+
+    ``enabled`` turns it on for this call only (e.g. ``requested(params)``).
+    """
+    if not (ENABLED or enabled):
+        return _DISABLED
+    return _Profile(stage, label)
+
+
+def current():
+    """The run being profiled in this context, or ``None``."""
+    return _current.get()
+
+
+@contextmanager
+def follow(run=None):
+    """Profile the enclosed block in this thread as part of ``run`` (default: :func:`current`)."""
+    run = run or current()
+    if run is None:
+        yield
+        return
+    profiler = _start()
+    try:
+        yield
+    finally:
+        run._merge(profiler)
+
+
+def _start():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = Profiler(interval=INTERVAL, async_mode="disabled")
+        profiler.start()
+    return profiler
+
+
+class _Profile:
+    """One profiled run; ``label`` may be set until the block exits (it names the files)."""
+
+    def __init__(self, stage, label):
+        self.stage = stage
+        self.label = label
+        self.paths = []
+        self._profiler = None
+        self._reset = None
+        self._others = []
+        self._lock = threading.Lock()
+
+    def _base(self):
+        name = "-".join(UNSAFE_RE.sub("_", part)[:40] for part in (self.stage, self.label) if part)
+        return os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+    def _merge(self, profiler):
+        # Called from the other thread when its part of the run is done
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            profiler.create_stats()
+        else:
+            profiler = profiler.stop()
+        with self._lock:
+            self._others.append(profiler)
+
+    def __enter__(self):
+        self._profiler = _start()
+        self._reset = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._reset)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = self._base()
+        with self._lock:
+            others, self._others = self._others, []
+        if isinstance(self._profiler, cProfile.Profile):
+            self._profiler.disable()
+            stats = pstats.Stats(self._profiler)
+            for other in others:
+                stats.add(other)
+            stats.dump_stats(f"{base}.pstats")
+            report = io.StringIO()
+            stats.stream = report
+            stats.sort_stats("cumulative").print_stats(60)
+            with open(f"{base}.txt", "w", encoding="utf-8") as f:
+                f.write(report.getvalue())
+            self.paths = [f"{base}.txt", f"{base}.pstats"]
+        else:
+            from pyinstrument.renderers import HTMLRenderer, PstatsRenderer
+            from pyinstrument.session import Session
+
+            session = self._profiler.stop()
+            for other in others:
+                session = Session.combine(session, other)
+            with open(f"{base}.html", "w", encoding="utf-8") as f:
+                f.write(HTMLRenderer().render(session))
+            # PstatsRenderer returns the marshalled stats as a surrogate-escaped str
+            with open(f"{base}.pstats", "wb") as f:
+                f.write(PstatsRenderer().render(session).encode("utf-8", errors="surrogateescape"))
+            self.paths = [f"{base}.html", f"{base}.pstats"]
+        metrics.inc("clauseease_profiles_total", stage=self.stage)
+        return False
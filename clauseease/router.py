@@ -0,0 +1,140 @@
+"""
+Pick an Ollama model and ``num_predict`` budget for each kind of task.
+
+Map steps (per-chunk summaries and map-rerank answers) go to the fastest
+installed small model, while synthesis, Q&A and translation stay on a
+large model. Within a tier
+the choice is driven by the tokens/s measured in :mod:`clauseease.metrics`.
+Any task can be pinned with an argument or a ``CLAUSEEASE_MODEL_<TASK>``
+environment variable, e.g. ``CLAUSEEASE_MODEL_MAP=phi3:latest``.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+from . import metrics, ollama_client
+
+Route = namedtuple("Route", "model options")
+
+MAP = "map"
+SYNTHESIS = "synthesis"
+QA = "qa"
+CHAT = "chat"
+TRANSLATE = "translate"
+RERANK = "rerank"
+
+# Candidates in order of preference when nothing has been measured yet
+TIERS = {
+    "small": ["gemma2:2b", "phi3:latest", "llama3.2:3b", "tinyllama:latest"],
+    "large": ["llama3.1:8b", "llama3.1:latest", "llama3:latest", "mistral:latest"],
+}
+
+TASK_TIER = {MAP: "small", SYNTHESIS: "large", QA: "large", CHAT: "large", TRANSLATE: "large", RERANK: "small"}
+
+# (fraction of input tokens, floor, ceiling) for num_predict
+OUTPUT_BUDGET = {
+    MAP: (0.25, 128, 384),
+    SYNTHESIS: (0.5, 384, 1024),
+    QA: (0.0, 512, 512),
+    CHAT: (0.0, 512, 512),
+    TRANSLATE: (1.3, 256, 2048),
+    RERANK: (0.0, 160, 160),
+}
+
+# Small models lose track of long inputs; beyond this, escalate to the large tier
+SMALL_MODEL_MAX_INPUT_TOKENS = 3000
+
+# Rough speeds assumed for models we have not measured yet (tokens/s)
+DEFAULT_DECODE_TPS = {"small": 40.0, "large": 15.0}
+DEFAULT_PREFILL_TPS = {"small": 400.0, "large": 150.0}
+
+
+def model_name(name):
+    """``name`` with Ollama's implicit ``:latest`` tag, so ``tinyllama`` matches ``tinyllama:latest``."""
+    return name if ":" in name else f"{name}:latest"
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class ModelRouter:
+    """Route tasks to models using installed models and measured throughput."""
+
+    def __init__(self, tiers=None, overrides=None, refresh_seconds=60):
+        self.tiers = tiers or TIERS
+        self.overrides = dict(overrides or {})
+        self.refresh_seconds = refresh_seconds
+        self._installed = None
+        self._installed_at = 0.0
+        self._lock = threading.Lock()
+
+    def installed_models(self):
+        with self._lock:
+            if self._installed is None or time.time() - self._installed_at > self.refresh_seconds:
+                try:
+                    self._installed = {model_name(m) for m in ollama_client.list_models()}
+                except Exception:
+                    # Server unreachable: keep every candidate and let the call report the error
+                    self._installed = set()
+                self._installed_at = time.time()
+            return self._installed
+
+    def route(self, task, text="", override=None):
+        """Return a :class:`Route` for ``task`` over ``text``."""
+        input_tokens = estimate_tokens(text)
+        options = {"num_predict": self.num_predict(task, input_tokens)}
+
+        model = override or self.overrides.get(task) or os.environ.get(f"CLAUSEEASE_MODEL_{task.upper()}")
+        if model:
+            return Route(model, options)
+
+        tier = TASK_TIER.get(task, "large")
+        if tier == "small" and input_tokens > SMALL_MODEL_MAX_INPUT_TOKENS:
+            tier = "large"
+        return Route(self.fastest(tier, input_tokens, options["num_predict"]), options)
+
+    def num_predict(self, task, input_tokens):
+        share, floor, ceiling = OUTPUT_BUDGET.get(task, (0.0, 512, 512))
+        return int(min(ceiling, max(floor, input_tokens * share)))
+
+    def fastest(self, tier, input_tokens, output_tokens):
+        """Pick the installed model in ``tier`` with the lowest expected latency."""
+        candidates = [model_name(m) for m in self.tiers[tier]]
+        installed = self.installed_models()
+        available = [m for m in candidates if m in installed] or candidates
+        if not installed:
+            return available[0]
+        # Fall back to any installed chat model if none of the tier's candidates are present
+        if not any(m in installed for m in candidates):
+            available = sorted(m for m in installed if "embed" not in m) or available
+
+        def expected_seconds(model):
+            decode = _mean_rate("clauseease_decode_tokens_per_second", model) or DEFAULT_DECODE_TPS[tier]
+            prefill = _mean_rate("clauseease_prefill_tokens_per_second", model) or DEFAULT_PREFILL_TPS[tier]
+            return input_tokens / prefill + output_tokens / decode
+
+        # min() keeps list order on ties, so unmeasured models follow preference order
+        return min(available, key=expected_seconds)
+
+
+def _mean_rate(name, model):
+    hist = metrics.REGISTRY.histogram(name, model=model)
+    return hist.mean() if hist else None
+
+
+_default_router = None
+
+
+def get_router():
+    """Process-wide router shared by the apps."""
+    global _default_router
+    if _default_router is None:
+        _default_router = ModelRouter()
+    return _default_router
+
+
+def route(task, text="", override=None):
+    return get_router().route(task, text, override=override)
@@ -0,0 +1,191 @@
+"""
+Fair, cancellable scheduling of generations against a shared Ollama backend.
+
+Every Streamlit session owns a :class:`CancelToken`. Cancelling it closes
+the upstream HTTP stream, which makes Ollama abort the generation and free
+the model slot. The :class:`GenerationScheduler` hands out a fixed number
+of slots: interactive chat is served before bulk work, and users within
+the same priority class take turns.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from . import metrics
+
+INTERACTIVE = 0
+BULK = 1
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when a request is refused by admission control."""
+
+
+class GenerationCancelled(RuntimeError):
+    """Raised when a request is cancelled while queued or before its reply is complete."""
+
+
+class CancelToken:
+    """Per-session cancellation flag that also closes attached HTTP responses."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._resources = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            resources, self._resources = self._resources, []
+        for resource in resources:
+            try:
+                resource.close()
+            except Exception:
+                pass
+
+    def reset(self):
+        with self._lock:
+            self._event.clear()
+            self._resources = []
+
+    def attach(self, resource):
+        """Register something with a ``close()`` method to be closed on cancel."""
+        with self._lock:
+            if not self._event.is_set():
+                self._resources.append(resource)
+                return
+        resource.close()
+
+    def detach(self, resource):
+        with self._lock:
+            if resource in self._resources:
+                self._resources.remove(resource)
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+
+class _Ticket:
+    def __init__(self, user, priority, seq):
+        self.user = user
+        self.priority = priority
+        self.seq = seq
+        self.granted = threading.Event()
+        self.enqueued = time.perf_counter()
+
+
+class GenerationScheduler:
+    """
+    Hand out at most ``max_in_flight`` concurrent generation slots.
+
+    Admission control rejects new work with :class:`SchedulerBusy` once the
+    queue holds ``max_queued`` requests overall or ``max_queued_per_user``
+    from the same user, or when a request waited longer than ``max_wait``.
+    """
+
+    def __init__(self, max_in_flight=1, max_queued=32, max_queued_per_user=4, max_wait=120.0):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._queues = {}           # (priority, user) -> deque of tickets
+        self._last_served = {}      # user -> serial of their last grant
+        self._serial = itertools.count()
+        self._in_flight = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queued": sum(len(q) for q in self._queues.values()),
+            }
+
+    @contextmanager
+    def slot(self, user, priority=INTERACTIVE, token=None):
+        """Block until a slot is free for ``user``; release it on exit."""
+        ticket = self._enqueue(user, priority)
+        try:
+            self._wait_for_grant(ticket, token)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        metrics.observe("clauseease_scheduler_wait_seconds", time.perf_counter() - ticket.enqueued,
+                        priority=PRIORITY_NAMES.get(priority, priority))
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _enqueue(self, user, priority):
+        with self._lock:
+            queued = sum(len(q) for q in self._queues.values())
+            mine = sum(len(q) for (_, u), q in self._queues.items() if u == user)
+            if queued >= self.max_queued or mine >= self.max_queued_per_user:
+                metrics.inc("clauseease_scheduler_rejected_total", reason="queue_full")
+                raise SchedulerBusy("The model server is busy. Please try again shortly.")
+            ticket = _Ticket(user, priority, next(self._serial))
+            self._queues.setdefault((priority, user), deque()).append(ticket)
+            self._dispatch_locked()
+        return ticket
+
+    def _wait_for_grant(self, ticket, token):
+        deadline = ticket.enqueued + self.max_wait if self.max_wait else None
+        while not ticket.granted.wait(0.1):
+            if token is not None and token.cancelled:
+                raise GenerationCancelled()
+            if deadline is not None and time.perf_counter() > deadline:
+                metrics.inc("clauseease_scheduler_rejected_total", reason="timeout")
+                raise SchedulerBusy("Timed out waiting for the model server.")
+
+    def _abandon(self, ticket):
+        with self._lock:
+            queue = self._queues.get((ticket.priority, ticket.user))
+            if queue and ticket in queue:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[(ticket.priority, ticket.user)]
+                return
+        # The slot was granted while we were giving up: hand it back
+        if ticket.granted.is_set():
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch_locked()
+
+    def _dispatch_locked(self):
+        while self._in_flight < self.max_in_flight and self._queues:
+            # Highest priority class first, then the user who was served longest ago
+            key = min(self._queues, key=lambda k: (k[0], self._last_served.get(k[1], -1),
+                                                   self._queues[k][0].seq))
+            queue = self._queues[key]
+            ticket = queue.popleft()
+            if not queue:
+                del self._queues[key]
+            self._last_served[ticket.user] = next(self._serial)
+            self._in_flight += 1
+            ticket.granted.set()
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler():
+    """Process-wide scheduler; ``OLLAMA_NUM_PARALLEL`` sets the number of slots."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = GenerationScheduler(max_in_flight=int(os.environ.get("OLLAMA_NUM_PARALLEL", "1")))
+        return _default
@@ -0,0 +1,369 @@
+"""
+Async HTTP API for ingestion, search, summaries, translation and Q&A.
+
+The Streamlit apps can run as thin clients of this service (set
+``CLAUSEEASE_API_URL``), so document processing scales separately from
+the UI and other tools can use it too. Run it with::
+
+    python -m clauseease.server --port 8700 --workers 4
+
+Endpoints:
+
+- ``POST /documents?name=<file name>`` — raw upload body (or a multipart
+  ``file`` field); returns document metadata including its ``id``
+- ``GET /documents/{id}``, ``DELETE /documents/{id}``
+- ``POST /documents/{id}/search`` — ``{"query", "k"}``
+- ``POST /documents/{id}/summarize`` — ``{"request"}``, server-sent events
+- ``POST /documents/{id}/translate`` — server-sent events
+- ``POST /documents/{id}/ask`` — ``{"question"}``, server-sent events
+- ``POST /chat`` — ``{"prompt"}``, server-sent events
+- ``GET /healthz``, ``GET /metrics``
+
+Add ``?profile=<CLAUSEEASE_PROFILE_TOKEN>`` to an upload to profile its
+ingestion (see :mod:`clauseease.profiling`).
+
+Event streams send ``token`` events (``{"text": ...}``) followed by one
+``done`` or ``error`` event. Extraction and chunking run in a process pool
+and Ollama calls in a thread pool, so the event loop only moves bytes.
+
+Document ids are content hashes: uploads are idempotent and any replica
+can ingest a document it has not seen. Run several replicas behind a load
+balancer, ideally with affinity on the document id to keep caches warm.
+A replica answers 404 for documents it does not hold, and
+:class:`clauseease.api_client.APIClient` then uploads them again.
+Documents no request has touched for ``CLAUSEEASE_API_IDLE`` seconds are
+released to the registry, whose TTL and memory cap then apply.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from aiohttp import web
+
+from . import (doc_registry, extractors, legal_chunker, metrics, ollama_client, profiling, router, summary_tree,
+               versioning)
+from .embeddings import default_library
+from .pipeline import collect, prepare_document
+from .workers import process_pool
+from .scheduler import BULK, INTERACTIVE, CancelToken, GenerationCancelled, SchedulerBusy, default_scheduler
+
+DEFAULT_PORT = 8700
+CONTEXT_CHARS = 4000
+PREVIEW_CHARS = 500
+USER_HEADER = "X-ClauseEase-User"
+HANDLE_IDLE = float(os.environ.get("CLAUSEEASE_API_IDLE", "600"))
+SWEEP_SECONDS = 60
+
+
+def _metadata(doc_id, name, info, shared):
+    return {
+        "id": doc_id,
+        "name": name,
+        "kind": info["kind"],
+        "lang": info["lang"],
+        "family": info["family"],
+        "chunk_count": info["chunk_count"],
+        "preview": info["preview"],
+        "diff": info["diff"],
+        "summary_status": info["tree"].status if info["tree"] else summary_tree.SKIPPED,
+        "shared": shared,
+    }
+
+
+def _close_document(fields):
+    if fields["tree"] is not None:
+        fields["tree"].cancel()
+    default_library().drop(fields["key"])
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+class ClauseEaseAPI:
+    """Request handlers plus the worker pools they share."""
+
+    def __init__(self, workers=None, io_threads=32):
+        self.cpu_pool = process_pool(workers)
+        self.io_pool = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="api-io")
+        self.registry = doc_registry.default_registry()
+        self.handles = {}
+        self.names = {}
+        self.last_used = {}
+        self._sweeper = None
+
+    def app(self):
+        app = web.Application(client_max_size=512 * 1024 * 1024)
+        app.add_routes([
+            web.get("/healthz", self.healthz),
+            web.get("/metrics", self.metrics),
+            web.post("/documents", self.upload),
+            web.get("/documents/{id}", self.get_document),
+            web.delete("/documents/{id}", self.delete_document),
+            web.post("/documents/{id}/search", self.search),
+            web.post("/documents/{id}/summarize", self.summarize),
+            web.post("/documents/{id}/translate", self.translate),
+            web.post("/documents/{id}/ask", self.ask),
+            web.post("/chat", self.chat),
+        ])
+        app.on_startup.append(self._start_sweeper)
+        app.on_cleanup.append(self._shutdown)
+        return app
+
+    async def _start_sweeper(self, app):
+        self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(SWEEP_SECONDS)
+            self.release_idle()
+
+    def release_idle(self, idle=HANDLE_IDLE):
+        """Release documents no request has used for ``idle`` seconds, so the registry can evict them."""
+        cutoff = time.monotonic() - idle
+        for doc_id in [d for d, used in self.last_used.items() if used < cutoff]:
+            self._release(doc_id)
+        self.registry.sweep()
+
+    async def _shutdown(self, app):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        self.cpu_pool.shutdown(cancel_futures=True)
+        self.io_pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- Helpers ---
+    def _document(self, request):
+        doc_id = request.match_info["id"]
+        handle = self.handles.get(doc_id)
+        if handle is None:
+            # Released after idling (or uploaded through another replica) but possibly still cached
+            handle = self.registry.lookup(doc_id)
+            if handle is None:
+                raise web.HTTPNotFound(text=json.dumps({"error": f"Unknown document {doc_id}; upload it again"}),
+                                       content_type="application/json")
+            self._attach(doc_id, handle, handle.get("name", doc_id))
+        self.last_used[doc_id] = time.monotonic()
+        return doc_id, handle
+
+    def _attach(self, doc_id, handle, name):
+        self.handles[doc_id], self.names[doc_id] = handle, name
+        self.last_used[doc_id] = time.monotonic()
+
+    def _release(self, doc_id):
+        handle = self.handles.pop(doc_id)
+        del self.names[doc_id], self.last_used[doc_id]
+        handle.release()
+
+    async def _json(self, request):
+        if not request.can_read_body:
+            return {}
+        try:
+            return await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="Request body must be JSON")
+
+    async def _read_upload(self, request):
+        if request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "file":
+                    return await part.read(), part.filename or request.query.get("name", "")
+            raise web.HTTPBadRequest(text="Multipart upload needs a 'file' field")
+        return await request.read(), request.query.get("name", "")
+
+    async def _stream(self, request, prompt, task=router.QA, priority=INTERACTIVE, text=None, affinity=None):
+        """Stream ``text`` as-is, or a generation for ``prompt``, as server-sent events."""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        if text is not None:
+            await response.write(_sse("token", {"text": text}))
+            await response.write(_sse("done", {}))
+            return response
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        token = CancelToken()
+        user = request.headers.get(USER_HEADER) or request.remote or "anonymous"
+
+        def produce():
+            # Blocking: relays Ollama's stream to the event loop. Identical concurrent requests share
+            # one generation, and only the first of them waits for a scheduler slot.
+            try:
+                model, options = router.route(task, prompt)
+                pieces = ollama_client.coalesced_stream(
+                    prompt, model=model, options=options, cancel_token=token, affinity=affinity,
+                    slot=lambda flight_token: default_scheduler().slot(user, priority, flight_token),
+                )
+                for piece in pieces:
+                    loop.call_soon_threadsafe(queue.put_nowait, ("token", {"text": piece}))
+                loop.call_soon_threadsafe(queue.put_nowait, ("done", {}))
+            except GenerationCancelled:
+                loop.call_soon_threadsafe(queue.put_nowait, ("done", {"cancelled": True}))
+            except Exception as e:
+                error = {"error": str(e), "busy": isinstance(e, SchedulerBusy)}
+                loop.call_soon_threadsafe(queue.put_nowait, ("error", error))
+
+        loop.run_in_executor(self.io_pool, produce)
+        try:
+            while True:
+                event, payload = await queue.get()
+                await response.write(_sse(event, payload))
+                if event != "token":
+                    break
+        finally:
+            # Client went away (or we are done): stop the upstream generation
+            token.cancel()
+        return response
+
+    def _retrieve(self, doc_id, info, question, k=5):
+        """``(clause keys, passages)`` for a question: named clauses first, then the library index."""
+        keys, chunks = info["clauses"].resolve(question)
+        if chunks:
+            return keys, [(1.0, c["text"]) for c in chunks]
+        library = default_library()
+        try:
+            library.sync(doc_id, info["chunks"])
+            return [], library.search(question, k=k, docs=[doc_id])
+        except requests.RequestException:
+            # No embedding model on the Ollama server
+            return [], []
+
+    # --- Handlers ---
+    async def healthz(self, request):
+        return web.json_response({"status": "ok", "documents": len(self.handles),
+                                  "scheduler": default_scheduler().stats(), "registry": self.registry.stats()})
+
+    async def metrics(self, request):
+        return web.Response(text=metrics.to_prometheus(), content_type="text/plain")
+
+    async def upload(self, request):
+        data, name = await self._read_upload(request)
+        if not data:
+            raise web.HTTPBadRequest(text="Empty upload")
+        doc_id = doc_registry.content_key(data)
+        if doc_id in self.handles:
+            self.last_used[doc_id] = time.monotonic()
+            return web.json_response(_metadata(doc_id, name or self.names[doc_id], self.handles[doc_id], True))
+
+        handle = self.registry.lookup(doc_id)
+        if handle is not None:
+            # Released after idling but still cached: no need to extract it again
+            self._attach(doc_id, handle, name or handle.get("name", doc_id))
+            return web.json_response(_metadata(doc_id, self.names[doc_id], handle, True))
+
+        loop = asyncio.get_running_loop()
+        try:
+            with metrics.stage_timer("ingest"):
+                prepared = collect(await loop.run_in_executor(self.cpu_pool, prepare_document, data, name, doc_id,
+                                                              profiling.requested(request.query)))
+        except extractors.UnsupportedFormat as e:
+            raise web.HTTPUnsupportedMediaType(text=str(e))
+
+        def build():
+            text, chunks = prepared["full_text"], prepared["chunks"]
+            clauses = legal_chunker.ClauseIndex(prepared["clause_chunks"])
+            family = versioning.document_family(name or doc_id)
+            tree = summary_tree.for_document(name or doc_id, clauses.chunks, lang=prepared["lang"], source_text=text)
+            return {
+                "key": doc_id,
+                "name": name or doc_id,
+                "kind": prepared["kind"],
+                "full_text": text,
+                "chunks": chunks,
+                "chunk_count": len(chunks),
+                "preview": text[:PREVIEW_CHARS],
+                "clauses": clauses,
+                "tree": tree,
+                "lang": prepared["lang"],
+                "family": family,
+                "diff": versioning.default_store().add_version(family, chunks),
+            }
+
+        # Building indexes the chunks and starts the summary tree: keep it off the event loop
+        handle = await loop.run_in_executor(
+            self.io_pool, lambda: self.registry.acquire(doc_id, build, cleanup=_close_document)
+        )
+        if doc_id in self.handles:
+            # A concurrent upload of the same bytes got there first
+            handle.release()
+        else:
+            self._attach(doc_id, handle, name)
+        return web.json_response(_metadata(doc_id, name, self.handles[doc_id], handle.shared))
+
+    async def get_document(self, request):
+        doc_id, info = self._document(request)
+        return web.json_response(_metadata(doc_id, self.names[doc_id], info, True))
+
+    async def delete_document(self, request):
+        doc_id, info = self._document(request)
+        self._release(doc_id)
+        return web.json_response({"id": doc_id, "deleted": True})
+
+    async def search(self, request):
+        doc_id, info = self._document(request)
+        body = await self._json(request)
+        query = body.get("query", "")
+        loop = asyncio.get_running_loop()
+        keys, results = await loop.run_in_executor(
+            self.io_pool, self._retrieve, doc_id, info, query, int(body.get("k", 5))
+        )
+        return web.json_response({"clauses": keys, "results": [{"score": s, "text": t} for s, t in results]})
+
+    async def summarize(self, request):
+        doc_id, info = self._document(request)
+        body = await self._json(request)
+        tree = info["tree"]
+        # Precomputed in the background after upload: answer instantly when it is there
+        ask = body.get("request", "").lower().replace(self.names[doc_id].lower(), "")
+        section = tree.section_summary(ask) if tree else None
+        if section:
+            return await self._stream(request, None, text=section)
+        if tree and tree.ready and not tree.find_section(ask):
+            return await self._stream(request, None, text=tree.document_summary)
+        prompt = f"Summarize the following text:\n\n{info['full_text'][:CONTEXT_CHARS]}"
+        return await self._stream(request, prompt, task=router.SYNTHESIS, priority=BULK, affinity=doc_id)
+
+    async def translate(self, request):
+        doc_id, info = self._document(request)
+        tree = info["tree"]
+        if tree and tree.translation:
+            return await self._stream(request, None, text=tree.translation)
+        if tree and tree.ready:
+            # Every chunk was tagged English: there is nothing to translate
+            return await self._stream(request, None, text=summary_tree.ALREADY_ENGLISH)
+        prompt = f"The text is in {info['lang']}. Translate it to English:\n\n{info['full_text'][:CONTEXT_CHARS]}"
+        return await self._stream(request, prompt, task=router.TRANSLATE, priority=BULK, affinity=doc_id)
+
+    async def ask(self, request):
+        doc_id, info = self._document(request)
+        question = (await self._json(request)).get("question", "")
+        loop = asyncio.get_running_loop()
+        keys, passages = await loop.run_in_executor(self.io_pool, self._retrieve, doc_id, info, question)
+        if keys:
+            context = "\n\n".join(text for _, text in passages)
+            prompt = f"Use only these clauses ({', '.join(keys)}) to answer.\n\nCLAUSES:\n{context}\n\nQ:{question}\nA:"
+        else:
+            context = "\n\n".join(text for _, text in passages) or info["full_text"][:CONTEXT_CHARS]
+            prompt = f"Use only this document to answer.\n\nDOC:\n{context}\n\nQ:{question}\nA:"
+        return await self._stream(request, prompt, task=router.QA, affinity=doc_id)
+
+    async def chat(self, request):
+        prompt = (await self._json(request)).get("prompt", "")
+        return await self._stream(request, prompt, task=router.CHAT)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ClauseEase API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("CLAUSEEASE_API_PORT", DEFAULT_PORT)))
+    parser.add_argument("--workers", type=int, default=None, help="processes for extraction and chunking")
+    args = parser.parse_args(argv)
+    web.run_app(ClauseEaseAPI(workers=args.workers).app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
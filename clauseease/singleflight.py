@@ -0,0 +1,132 @@
+"""
+Single-flight coalescing of identical in-flight generations.
+
+When several people press "Summarize" on the same contract at once, the
+prompts are byte-identical. The first caller (the leader) starts the
+generation on a background thread, which appends pieces to an in-memory
+broadcast buffer. Identical callers arriving while it runs attach to the
+same buffer: they replay what was already produced, then follow live.
+
+The generation belongs to the flight, not to any one caller. A caller who
+cancels only stops reading (its iterator raises ``GenerationCancelled``,
+even after some pieces, so a cut-off reply never passes for a complete
+one), and the upstream generation is cancelled once the last subscriber
+has gone. Finished flights are forgotten immediately:
+this is coalescing, not a response cache.
+"""
+import contextvars
+import hashlib
+import json
+import threading
+
+from . import metrics, profiling
+from .scheduler import CancelToken, GenerationCancelled
+
+
+def flight_key(*parts):
+    """Stable key for a request, e.g. ``flight_key(model, options, system, prompt)``."""
+    blob = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.pieces = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.cond = threading.Condition()
+        self.token = CancelToken()
+
+
+class SingleFlight:
+    """Run at most one producer per key; concurrent callers share its output."""
+
+    def __init__(self, name):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def stream(self, key, produce, cancel_token=None):
+        """
+        Iterate the pieces produced by ``produce(token)`` for ``key``.
+
+        ``produce`` runs once per concurrent group of callers, on its own
+        thread, and must stop when ``token`` is cancelled. The caller joins
+        (or starts) the flight on its first ``next``, so an iterator that is
+        never read holds nothing.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            flight.subscribers += 1
+        try:
+            metrics.inc("clauseease_singleflight_total", flight=self.name, role="leader" if leader else "follower")
+            if leader:
+                # The leader's context goes along, so a profiled run also covers the generation thread
+                context = contextvars.copy_context()
+                threading.Thread(target=context.run, args=(self._run, key, flight, produce), daemon=True,
+                                 name=f"singleflight-{self.name}").start()
+            yield from self._follow(flight, cancel_token)
+        finally:
+            self._leave(key, flight)
+
+    def call(self, key, func):
+        """Coalesce a non-streaming call: concurrent callers get the leader's return value."""
+        return list(self.stream(key, lambda token: (func(),)))[0]
+
+    def inflight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def _run(self, key, flight, produce):
+        try:
+            with profiling.follow():
+                for piece in produce(flight.token):
+                    with flight.cond:
+                        flight.pieces.append(piece)
+                        flight.cond.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _follow(self, flight, cancel_token):
+        seen = 0
+        while True:
+            with flight.cond:
+                while seen >= len(flight.pieces) and not flight.done:
+                    if cancel_token is not None and cancel_token.cancelled:
+                        break
+                    flight.cond.wait(0.1)
+                batch = flight.pieces[seen:]
+                seen += len(batch)
+                finished = flight.done and seen >= len(flight.pieces)
+            for piece in batch:
+                yield piece
+            if cancel_token is not None and cancel_token.cancelled and not finished:
+                # Callers cache what they read: a partial reply must not look finished
+                raise GenerationCancelled()
+            if finished:
+                if flight.error is not None:
+                    raise flight.error
+                if flight.token.cancelled:
+                    raise GenerationCancelled()
+                return
+
+    def _leave(self, key, flight):
+        with self._lock:
+            flight.subscribers -= 1
+            abandoned = flight.subscribers == 0 and not flight.done
+            if abandoned and self._flights.get(key) is flight:
+                # Nobody is listening: later callers start afresh
+                del self._flights[key]
+        if abandoned:
+            flight.token.cancel()
@@ -0,0 +1,353 @@
+"""
+End-to-end latency SLO benchmark on a golden set of contracts.
+
+The fixture contracts and the scripted turns live in
+``clauseease/data/slo_golden.json``: a PDF, a DOCX, plain-text and
+mixed Spanish/English agreements and a CSV of vendor contracts, with
+summarize, translate and Q&A turns whose expected facts are known. The
+fixtures are rendered to real files, uploaded to an in-process
+:mod:`clauseease.server` and driven through :mod:`clauseease.api_client`,
+so every turn takes the same path as an app in API mode (extraction,
+chunking, summary tree, retrieval, scheduler, balancer, streaming)::
+
+    python -m clauseease.slo --standin           # simulated Ollama, no models needed
+    python -m clauseease.slo                     # the Ollama at OLLAMA_URL(S)
+    python -m clauseease.slo --repeat 3 --save-baseline
+
+Per scenario it reports p50/p95 time to first token and total latency,
+the retrieval hit rate (the expected fact is among the passages
+``/search`` returns) and the answer accuracy (the expected fact is in the
+answer). The results are compared with ``clauseease/data/slo_baseline.json``:
+a latency more than ``tolerance`` above its baseline, or a rate more than
+``tolerance`` below it, is a breach, and the exit status is 1.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+
+from . import metrics
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+GOLDEN_PATH = os.path.join(DATA_DIR, "slo_golden.json")
+BASELINE_PATH = os.path.join(DATA_DIR, "slo_baseline.json")
+DEFAULT_TOLERANCE = 0.1
+# How long a turn may wait for the summary tree before the benchmark gives up on it
+READY_TIMEOUT = 300
+
+LATENCIES = ("ttft", "total")
+RATES = ("retrieval_hit_rate", "answer_accuracy")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _digits(text):
+    # "48,000" and "48000" are the same fact
+    return "".join(text.split()).replace(",", "").lower()
+
+
+def contains(text, expect):
+    return _digits(expect) in _digits(text)
+
+
+# --- Fixtures ---
+def contract_text(spec):
+    lines = [spec["title"], ""]
+    for i, (title, body) in enumerate(spec["clauses"], 1):
+        lines.append(f"{i}. {title}\n{body}\n")
+    return "\n".join(lines)
+
+
+def render_pdf(text):
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page()
+    # The golden contracts are short enough for one page with 1-inch margins
+    page.insert_textbox(page.rect + (72, 72, -72, -72), text, fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def render_docx(spec):
+    import docx
+
+    document = docx.Document()
+    document.add_heading(spec["title"], level=1)
+    for i, (title, body) in enumerate(spec["clauses"], 1):
+        document.add_paragraph(f"{i}. {title}")
+        document.add_paragraph(body)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def render_csv(spec):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(spec["columns"])
+    writer.writerows(spec["rows"])
+    return out.getvalue().encode("utf-8")
+
+
+def render(spec):
+    """File bytes for one golden contract, in its declared format."""
+    fmt = spec["format"]
+    if fmt == "csv":
+        return render_csv(spec)
+    if fmt == "docx":
+        return render_docx(spec)
+    if fmt == "pdf":
+        return render_pdf(contract_text(spec))
+    return contract_text(spec).encode("utf-8")
+
+
+def load_golden(path=GOLDEN_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- Environment ---
+def start_standin(**options):
+    """Start a stand-in Ollama and point the client at it; call before the first model request."""
+    from . import standin_server
+
+    port = _free_port()
+    server = standin_server.serve(port, **options)
+    os.environ["OLLAMA_URL"] = os.environ["OLLAMA_URLS"] = f"http://127.0.0.1:{port}"
+    return server
+
+
+class LocalAPI:
+    """:class:`clauseease.server.ClauseEaseAPI` on a free port, served from a background event loop."""
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+
+    def __enter__(self):
+        from aiohttp import web
+
+        from .server import ClauseEaseAPI
+
+        async def start():
+            self._runner = web.AppRunner(ClauseEaseAPI(workers=self.workers).app())
+            await self._runner.setup()
+            await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+        threading.Thread(target=self._loop.run_forever, daemon=True, name="slo-api").start()
+        asyncio.run_coroutine_threadsafe(start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        return False
+
+
+# --- Turns ---
+def timed_stream(pieces):
+    """Drain a token stream; returns ``(text, ttft, total)`` in seconds."""
+    start = time.perf_counter()
+    ttft, parts = None, []
+    for piece in pieces:
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        parts.append(piece)
+    total = time.perf_counter() - start
+    return "".join(parts), ttft if ttft is not None else total, total
+
+
+def wait_ready(client, doc_id, timeout=READY_TIMEOUT):
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        resp = requests.get(f"{client.base_url}/documents/{doc_id}", timeout=client.timeout)
+        resp.raise_for_status()
+        if resp.json()["summary_status"] in ("ready", "failed"):
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def run_turn(client, turn, doc, data):
+    """One scripted turn; returns a result row."""
+    scenario, row = turn["scenario"], {"scenario": turn["scenario"], "contract": turn["contract"]}
+    expect = turn.get("expect")
+    if scenario in ("qa", "clause_lookup"):
+        hits = client.search(doc, turn["question"])["results"]
+        row["retrieval_hit"] = any(contains(hit["text"], expect) for hit in hits)
+        text, row["ttft"], row["total"] = timed_stream(client.ask(doc, turn["question"]))
+    elif scenario in ("summarize", "summarize_section"):
+        text, row["ttft"], row["total"] = timed_stream(client.summarize(doc, turn.get("request", "")))
+    elif scenario == "translate":
+        # The summary tree translates the foreign chunks in the background; this is the wait a user sees
+        text, row["ttft"], row["total"] = timed_stream(client.translate(doc))
+    elif scenario == "table":
+        # Aggregations run in pandas next to the app, as the CSV apps do
+        from .tabular import TableIndex, read_csv_columnar
+
+        start = time.perf_counter()
+        text = TableIndex(read_csv_columnar(io.BytesIO(data)), turn["contract"]).answer_aggregate(turn["question"])
+        row["total"] = time.perf_counter() - start
+        text = text or ""
+    else:
+        raise ValueError(f"Unknown scenario {scenario!r}")
+    if expect:
+        row["correct"] = contains(text, expect)
+    row["chars"] = len(text)
+    return row
+
+
+def run(golden, repeat=1, workers=2, out=print):
+    """Upload every fixture and play the scripted turns ``repeat`` times; returns the result rows."""
+    from .api_client import APIClient
+
+    fixtures = {spec["name"]: render(spec) for spec in golden["contracts"]}
+    rows = []
+    with LocalAPI(workers=workers) as api:
+        client = APIClient(api.url, user="slo-benchmark")
+        for rep in range(repeat):
+            docs = {}
+            for name, data in fixtures.items():
+                start = time.perf_counter()
+                docs[name] = client.upload(data, name)
+                rows.append({"scenario": "upload", "contract": name, "total": time.perf_counter() - start})
+            for turn in golden["turns"]:
+                row = run_turn(client, turn, docs[turn["contract"]], fixtures[turn["contract"]])
+                rows.append(row)
+                ttft = f"{row['ttft']:6.2f}s" if "ttft" in row else "      -"
+                out(f"  [{rep + 1}/{repeat}] {row['scenario']:<18} {row['contract']:<32} "
+                    f"ttft={ttft} total={row['total']:6.2f}s"
+                    + (f" hit={row['retrieval_hit']}" if "retrieval_hit" in row else "")
+                    + (f" correct={row['correct']}" if "correct" in row else ""))
+            if rep + 1 < repeat:
+                # Later repetitions measure warm documents: wait for the background summaries first
+                for doc in docs.values():
+                    wait_ready(client, doc["id"])
+    return rows
+
+
+# --- Report ---
+def summarize(rows):
+    """Per-scenario p50/p95 latencies and rates."""
+    by_scenario = {}
+    for row in rows:
+        by_scenario.setdefault(row["scenario"], []).append(row)
+    summary = {}
+    for scenario, group in by_scenario.items():
+        stats = {"turns": len(group)}
+        for name in LATENCIES:
+            hist = metrics.Histogram(metrics.SECONDS_BUCKETS)
+            for row in group:
+                if name in row:
+                    hist.observe(row[name])
+            if hist.count:
+                stats[f"{name}_p50"] = statistics.median(hist.recent)
+                stats[f"{name}_p95"] = hist.quantile(0.95)
+        for name, field in (("retrieval_hit_rate", "retrieval_hit"), ("answer_accuracy", "correct")):
+            values = [row[field] for row in group if field in row]
+            if values:
+                stats[name] = sum(values) / len(values)
+        summary[scenario] = stats
+    return summary
+
+
+def compare(summary, baseline):
+    """Breaches as ``(scenario, metric, measured, baseline)``; latencies may not rise, rates may not fall."""
+    tolerance = baseline.get("tolerance", DEFAULT_TOLERANCE)
+    breaches = []
+    for scenario, limits in baseline.get("scenarios", {}).items():
+        measured = summary.get(scenario, {})
+        for name, limit in limits.items():
+            if name not in measured:
+                continue
+            value = measured[name]
+            worse = value < limit - tolerance if name in RATES else value > limit * (1 + tolerance)
+            if worse:
+                breaches.append((scenario, name, value, limit))
+    return breaches
+
+
+def report(summary, baseline, out=print):
+    limits = baseline.get("scenarios", {})
+    out(f"\n{'scenario':<18} {'turns':>5} {'ttft p50/p95':>15} {'total p50/p95':>15} {'hit rate':>9} {'accuracy':>9}")
+    for scenario, stats in summary.items():
+        def pair(name):
+            if f"{name}_p50" not in stats:
+                return "-"
+            return f"{stats[f'{name}_p50']:.2f}/{stats[f'{name}_p95']:.2f}"
+
+        def rate(name):
+            return f"{stats[name]:.0%}" if name in stats else "-"
+
+        out(f"{scenario:<18} {stats['turns']:>5} {pair('ttft'):>15} {pair('total'):>15} "
+            f"{rate('retrieval_hit_rate'):>9} {rate('answer_accuracy'):>9}"
+            + ("" if scenario in limits else "  (no baseline)"))
+    breaches = compare(summary, baseline)
+    for scenario, name, value, limit in breaches:
+        out(f"SLO breach: {scenario} {name} = {value:.3g} (baseline {limit:.3g})")
+    if not breaches:
+        out("All scenarios within their SLO baselines.")
+    return breaches
+
+
+def save_baseline(summary, path=BASELINE_PATH, tolerance=DEFAULT_TOLERANCE):
+    scenarios = {}
+    for scenario, stats in summary.items():
+        scenarios[scenario] = {name: round(value, 3) for name, value in stats.items()
+                               if name.endswith("_p95") or name in RATES}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"tolerance": tolerance, "scenarios": scenarios}, f, indent=2)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end latency SLO benchmark on the golden contract set")
+    parser.add_argument("--standin", action="store_true", help="run against a simulated Ollama")
+    parser.add_argument("--tps", type=float, default=40.0, help="stand-in decode tokens per second")
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the script; later ones are warm")
+    parser.add_argument("--workers", type=int, default=2, help="API server ingestion processes")
+    parser.add_argument("--save-baseline", action="store_true", help="store the measured values as the baseline")
+    parser.add_argument("--json", help="also write the per-turn results and summary to this file")
+    args = parser.parse_args(argv)
+
+    if args.standin:
+        start_standin(tps=args.tps)
+    golden = load_golden(args.golden)
+    rows = run(golden, repeat=args.repeat, workers=args.workers)
+    summary = summarize(rows)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    breaches = report(summary, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"turns": rows, "summary": summary}, f, indent=2)
+    if args.save_baseline:
+        save_baseline(summary, args.baseline, baseline.get("tolerance", DEFAULT_TOLERANCE))
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    return 1 if breaches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+"""
+Bounded-memory ingestion for very large text uploads.
+
+Large uploads are copied block by block into a temporary file and
+memory-mapped, so the text never has to exist as one ``bytes`` object plus
+a second decoded ``str``. Chunk boundaries are computed as byte offsets
+on ASCII whitespace (never inside a UTF-8 sequence) and chunks are decoded
+only when they are read.
+
+A per-session :class:`MemoryBudget` caps how much decoded text may be held
+at once; streaming readers block on it, which gives natural backpressure.
+A :class:`SpooledDocument` holds a temp file and a memory map: close it
+when the document is dropped (it is also closed when garbage-collected).
+"""
+import codecs
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+
+from . import metrics
+
+MB = 1024 * 1024
+LARGE_FILE_BYTES = int(os.environ.get("CLAUSEEASE_LARGE_FILE_MB", "32")) * MB
+SESSION_MEMORY_BYTES = int(os.environ.get("CLAUSEEASE_SESSION_MEMORY_MB", "256")) * MB
+COPY_BLOCK = MB
+
+# Encodings whose whitespace bytes can never appear inside a multi-byte character
+ASCII_COMPATIBLE = {codecs.lookup(e).name for e in ("utf-8", "ascii", "latin-1", "cp1252")}
+
+
+class BudgetExceeded(MemoryError):
+    """Raised when a reservation cannot be satisfied within its timeout."""
+
+
+class MemoryBudget:
+    """Counting ceiling on bytes held by one session."""
+
+    def __init__(self, limit=SESSION_MEMORY_BYTES):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def try_acquire(self, n):
+        with self._cond:
+            if self.used + n > self.limit:
+                return False
+            self.used += n
+            return True
+
+    def acquire(self, n, timeout=None):
+        """Block until ``n`` bytes fit under the ceiling."""
+        n = min(n, self.limit)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.used + n <= self.limit, timeout):
+                raise BudgetExceeded(f"Session memory ceiling of {self.limit // MB} MB reached")
+            self.used += n
+        return n
+
+    def release(self, n):
+        with self._cond:
+            self.used = max(0, self.used - n)
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserve(self, n, timeout=None):
+        taken = self.acquire(n, timeout)
+        try:
+            yield
+        finally:
+            self.release(taken)
+
+
+def is_large(size):
+    return size >= LARGE_FILE_BYTES
+
+
+def byte_splittable(encoding):
+    """Whether text in ``encoding`` can be chunked on raw whitespace bytes."""
+    try:
+        return codecs.lookup(encoding).name in ASCII_COMPATIBLE
+    except LookupError:
+        return False
+
+
+class LazyChunks:
+    """Sequence of text chunks decoded from the memory map on access."""
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    def __len__(self):
+        return len(self.doc.offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = self.doc.offsets[index]
+        return self.doc.decode(start, end)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SpooledDocument:
+    """An upload spooled to disk, memory-mapped and chunked by byte offsets."""
+
+    def __init__(self, fileobj, encoding="utf-8", chunk_bytes=800, overlap_bytes=0, budget=None):
+        self.encoding = encoding
+        self.budget = budget
+        self._file = tempfile.TemporaryFile()
+        with metrics.stage_timer("spooling"):
+            fileobj.seek(0)
+            shutil.copyfileobj(fileobj, self._file, COPY_BLOCK)
+            self._file.flush()
+            self.size = self._file.tell()
+        self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._finalizer = weakref.finalize(self, _close, self.buf, self._file)
+        with metrics.stage_timer("chunking", mode="mmap"):
+            self.offsets = self._chunk_offsets(chunk_bytes, overlap_bytes)
+        self.chunks = LazyChunks(self)
+
+    def _chunk_offsets(self, chunk_bytes, overlap_bytes):
+        if not byte_splittable(self.encoding):
+            raise ValueError(f"Cannot split {self.encoding} text by byte offsets")
+        offsets = []
+        start = 0
+        while start < self.size:
+            end = min(start + chunk_bytes, self.size)
+            if end < self.size:
+                # Break on the last space/newline so words (and UTF-8 sequences) stay whole
+                cut = max(self.buf.rfind(b" ", start, end), self.buf.rfind(b"\n", start, end))
+                if cut > start:
+                    end = cut + 1
+            offsets.append((start, end))
+            if end >= self.size:
+                break
+            start = end
+            if overlap_bytes:
+                # Start the overlap on a word boundary too
+                space = self.buf.find(b" ", max(end - overlap_bytes, offsets[-1][0] + 1), end)
+                if space != -1:
+                    start = space + 1
+        return offsets
+
+    def decode(self, start, end):
+        return self.buf[start:end].decode(self.encoding, errors="replace")
+
+    def head_text(self, n_chars=500):
+        # 4 bytes per character is the UTF-8 worst case
+        return self.decode(0, min(self.size, n_chars * 4))[:n_chars]
+
+    def iter_text(self, block=COPY_BLOCK, timeout=None):
+        """Yield the decoded text block by block, holding budget for one block at a time."""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        for start in range(0, self.size, block):
+            end = min(start + block, self.size)
+            taken = self.budget.acquire(end - start, timeout) if self.budget else 0
+            try:
+                yield decoder.decode(self.buf[start:end], final=end == self.size)
+            finally:
+                if self.budget:
+                    self.budget.release(taken)
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _close(buf, file):
+    if isinstance(buf, mmap.mmap):
+        buf.close()
+    file.close()
@@ -0,0 +1,235 @@
+"""
+A stand-in Ollama server for local testing of balancing, scheduling and benchmarks.
+
+It speaks enough of the Ollama HTTP API for ClauseEase:
+``/api/tags``, ``/api/ps``, ``/api/version``, ``/api/generate``,
+``/api/chat``, ``/api/embed`` and ``/api/show``. Latency is simulated: a model that is
+not loaded yet costs ``--load-seconds`` once, the prompt is "prefilled" at
+``--prefill-tps`` and the reply streamed at ``--tps`` tokens per second,
+with at most ``--parallel`` requests generating at a time. The final
+message carries the same timing fields as real Ollama.
+
+Replies are extractive: the sentence of the prompt's context that shares
+the most words with the question, so answers are deterministic and
+roughly on topic. ``"format": "json"`` requests get that sentence as
+``{"answer", "score"}``, scored by word overlap. Start several on
+different ports to test balancing::
+
+    python -m clauseease.standin_server --port 11501 &
+    python -m clauseease.standin_server --port 11502 &
+    OLLAMA_URLS=http://127.0.0.1:11501,http://127.0.0.1:11502 streamlit run ...
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODELS = ["llama3:latest", "llama3.1:8b", "phi3:latest", "tinyllama:latest", "nomic-embed-text:latest"]
+EMBED_DIM = 64
+CONTEXT_LENGTH = 8192
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+
+def _tokens(text):
+    # Roughly what a tokenizer would count
+    return max(1, len(text) // 4)
+
+
+def _best_sentence(prompt):
+    """``(sentence, shared words)`` for the context sentence closest to the question."""
+    question, context = prompt, prompt
+    for marker in ("\nQ:", "Question:", "QUESTION:"):
+        if marker in prompt:
+            context, question = prompt.rsplit(marker, 1)
+            break
+    asked = set(WORD_RE.findall(question.lower()))
+    best, best_score = "", -1
+    for sentence in SENTENCE_RE.split(context):
+        sentence = sentence.strip()
+        if len(sentence) < 3:
+            continue
+        score = len(asked & set(WORD_RE.findall(sentence.lower())))
+        if score > best_score:
+            best, best_score = sentence, score
+    return best, max(best_score, 0)
+
+
+def extractive_reply(prompt):
+    """The context sentence with the most words in common with the question."""
+    return _best_sentence(prompt)[0] or "I don't know."
+
+
+def scored_reply(prompt):
+    """JSON ``{"answer", "score"}`` for ``format="json"`` requests; 3 points per shared word, up to 10."""
+    best, overlap = _best_sentence(prompt)
+    return json.dumps({"answer": best or "I don't know.", "score": min(10, 3 * overlap)})
+
+
+def embedding(text):
+    """Deterministic bag-of-words vector: texts sharing words are similar."""
+    vector = [0.0] * EMBED_DIM
+    for word in WORD_RE.findall(text.lower()):
+        vector[hashlib.blake2b(word.encode(), digest_size=2).digest()[0] % EMBED_DIM] += 1.0
+    return vector
+
+
+class StandinOllama:
+    def __init__(self, models=None, tps=40.0, prefill_tps=400.0, load_seconds=1.0, parallel=1):
+        self.models = list(models or DEFAULT_MODELS)
+        self.tps = tps
+        self.prefill_tps = prefill_tps
+        self.load_seconds = load_seconds
+        self.loaded = set()
+        self.slots = threading.Semaphore(parallel)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def _known(self, model):
+        return model in self.models or f"{model}:latest" in self.models
+
+    def _load(self, model):
+        with self.lock:
+            cold = model not in self.loaded
+            self.loaded.add(model)
+        if cold:
+            time.sleep(self.load_seconds)
+        return cold
+
+    def generate(self, model, prompt, format=None):
+        """Yield ``(piece, final_stats_or_None)`` with simulated timing."""
+        with self.lock:
+            self.requests += 1
+        start = time.perf_counter()
+        with self.slots:
+            load = self.load_seconds if self._load(model) else 0.0
+            prompt_tokens = _tokens(prompt)
+            prefill = prompt_tokens / self.prefill_tps
+            time.sleep(prefill)
+            words = (scored_reply(prompt) if format == "json" else extractive_reply(prompt)).split(" ")
+            for i, word in enumerate(words):
+                time.sleep(1.0 / self.tps)
+                yield (word if i == 0 else " " + word), None
+        total = time.perf_counter() - start
+        yield "", {
+            "done": True,
+            "total_duration": int(total * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill * 1e9),
+            "eval_count": len(words),
+            "eval_duration": int(len(words) / self.tps * 1e9),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "StandinOllama/1.0"
+    backend = None
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        backend = self.backend
+        if self.path == "/api/tags":
+            self._json({"models": [{"name": m, "model": m} for m in backend.models]})
+        elif self.path == "/api/ps":
+            with backend.lock:
+                self._json({"models": [{"name": m, "model": m} for m in sorted(backend.loaded)]})
+        elif self.path == "/api/version":
+            self._json({"version": "0.0.0-standin"})
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        backend = self.backend
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._json({"error": "invalid JSON"}, 400)
+        model = request.get("model", "")
+        if not backend._known(model):
+            return self._json({"error": f"model '{model}' not found"}, 404)
+
+        if self.path == "/api/show":
+            family = model.split(":")[0]
+            return self._json({"model_info": {f"{family}.context_length": CONTEXT_LENGTH}, "parameters": ""})
+        if self.path == "/api/embed":
+            texts = request.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            backend._load(model)
+            return self._json({"model": model, "embeddings": [embedding(t) for t in texts]})
+        if self.path == "/api/generate":
+            prompt, key = request.get("prompt", ""), "response"
+        elif self.path == "/api/chat":
+            prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+            key = "message"
+        else:
+            return self._json({"error": "not found"}, 404)
+
+        def message(piece):
+            return {key: piece} if key == "response" else {key: {"role": "assistant", "content": piece}}
+
+        if not request.get("stream", True):
+            text, stats = "", {}
+            for piece, final in backend.generate(model, prompt, request.get("format")):
+                text += piece
+                stats = final or stats
+            return self._json({"model": model, **message(text), **stats})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for piece, final in backend.generate(model, prompt, request.get("format")):
+                line = {"model": model, **message(piece), **(final or {"done": False})}
+                self.wfile.write((json.dumps(line) + "\n").encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled, as Ollama clients do by closing the stream
+            pass
+
+
+def serve(port=11434, host="127.0.0.1", **options):
+    """Start a stand-in server on a daemon thread; returns the ``ThreadingHTTPServer``."""
+    handler = type("Handler", (_Handler,), {"backend": StandinOllama(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name=f"standin-{port}").start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in Ollama server for testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS))
+    parser.add_argument("--tps", type=float, default=40.0, help="decode tokens per second")
+    parser.add_argument("--prefill-tps", type=float, default=400.0, help="prompt tokens per second")
+    parser.add_argument("--load-seconds", type=float, default=1.0, help="cold model load time")
+    parser.add_argument("--parallel", type=int, default=1, help="concurrent generations")
+    args = parser.parse_args(argv)
+    server = serve(args.port, args.host, models=args.models.split(","), tps=args.tps,
+                   prefill_tps=args.prefill_tps, load_seconds=args.load_seconds, parallel=args.parallel)
+    print(f"Stand-in Ollama on http://{args.host}:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Hierarchical summaries precomputed in the background after upload.
+
+As soon as a document is ingested a :class:`SummaryTree` is scheduled:
+every chunk is summarised, chunk summaries are rolled up per section
+(top-level clause, or a fixed run of chunks when the document has no
+structure), and section summaries are rolled up into a document summary.
+Chunks are tagged with their language and only the ones that are not in
+English are translated first; the English ones go straight to the map
+step. A mixed-language contract therefore costs only as much translation
+as its foreign-language part, and the assembled English text doubles as
+the document's translation.
+
+Background generations run at bulk priority through the shared
+scheduler, so interactive chat is always served first. Every summary is
+cached by the content hash of its input, so a revised version of a
+document only re-summarises the chunks and sections that changed.
+
+Documents over ``MAX_TREE_CHUNKS`` chunks, and spooled uploads (whose
+chunks are decoded from disk on access), get no tree:
+:func:`for_document` returns ``None`` for them without reading a chunk.
+"""
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import language, legal_chunker, metrics, ollama_client, router, spool, translation_memory, versioning
+from .scheduler import BULK, CancelToken, GenerationCancelled, default_scheduler
+
+SECTION_CHUNKS = 6
+MAX_TREE_CHUNKS = 400
+MAP_PROMPT = "Summarize the key points of this contract excerpt:\n\n{text}"
+ALREADY_ENGLISH = "Every part of this document is already in English, so there is nothing to translate."
+
+PENDING = "pending"
+BUILDING = "building"
+READY = "ready"
+FAILED = "failed"
+CANCELLED = "cancelled"
+# Reported for documents that get no tree
+SKIPPED = "skipped"
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary-tree")
+
+
+def _section_key(clause):
+    """Top-level clause a chunk belongs to: "12.3" -> "12", "schedule 2" stays."""
+    if not clause:
+        return None
+    return clause.split(".")[0] if clause[0].isdigit() else clause
+
+
+class SummaryTree:
+    """Chunk, section and document summaries for one document."""
+
+    def __init__(self, doc_id, chunks, lang="English", source_text=""):
+        self.doc_id = doc_id
+        # Accept clause chunks (dicts) or plain strings
+        self.chunks = [c if isinstance(c, dict) else {"id": i, "clause": None, "heading": "", "text": c}
+                       for i, c in enumerate(chunks)]
+        for chunk in self.chunks:
+            chunk.setdefault("hash", versioning.chunk_hash(chunk["text"]))
+        self.lang = lang
+        self.source_text = source_text
+        self.sections = self._group_sections()
+        self.chunk_summaries = {}
+        self.english = {}
+        self.document_summary = None
+        self.translation = None
+        self.status = PENDING
+        self.error = None
+        self.reused = 0
+        self.token = CancelToken()
+        self._done = threading.Event()
+
+    def _group_sections(self):
+        sections = []
+        for chunk in self.chunks:
+            key = _section_key(chunk.get("clause"))
+            if key and sections and sections[-1]["key"] == key:
+                sections[-1]["chunk_ids"].append(chunk["id"])
+            elif key:
+                sections.append({"key": key, "title": chunk.get("heading", ""),
+                                 "chunk_ids": [chunk["id"]], "summary": None})
+            elif sections and sections[-1]["key"] is None and len(sections[-1]["chunk_ids"]) < SECTION_CHUNKS:
+                sections[-1]["chunk_ids"].append(chunk["id"])
+            else:
+                sections.append({"key": None, "title": f"Part {len(sections) + 1}",
+                                 "chunk_ids": [chunk["id"]], "summary": None})
+        return sections
+
+    # --- Building ---
+    def _generate(self, task, prompt):
+        model, options = router.route(task, prompt)
+        # Same server for every call on this document: its prompt cache stays warm. Chunks shared
+        # with a version being summarized concurrently are generated once.
+        pieces = ollama_client.coalesced_stream(
+            prompt, model=model, options=options, cancel_token=self.token, affinity=self.doc_id,
+            slot=lambda token: default_scheduler().slot(f"summary-tree:{self.doc_id}", BULK, token),
+        )
+        return "".join(pieces).strip()
+
+    def _cached(self, task, prompt):
+        key = f"{task}:{versioning.chunk_hash(prompt)}"
+        summary = versioning.SUMMARIES.get(key)
+        if summary is None:
+            summary = self._generate(task, prompt)
+            if self.token.cancelled:
+                # Possibly cut off mid-stream: never cache it
+                raise GenerationCancelled()
+            versioning.SUMMARIES.put(key, summary)
+        else:
+            self.reused += 1
+        return summary
+
+    def _translate_chunks(self):
+        """English text of every chunk; only chunks in another language go through the translation model."""
+        language.tag_chunks(self.chunks)
+        memory = translation_memory.default_memory()
+        translated = 0
+        for chunk in self.chunks:
+            if language.needs_translation(chunk["lang"]):
+                # Boilerplate seen in earlier documents comes from the translation memory
+                self.english[chunk["id"]] = memory.translate(
+                    chunk["text"], chunk["lang"], lambda prompt: self._generate(router.TRANSLATE, prompt),
+                    cancel_token=self.token,
+                )
+                translated += 1
+            else:
+                self.english[chunk["id"]] = chunk["text"]
+        metrics.inc("clauseease_translation_chunks_total", translated, result="translated")
+        metrics.inc("clauseease_translation_chunks_total", len(self.chunks) - translated, result="skipped")
+        if translated:
+            # Predictive warm-up: documents with foreign-language text are usually translated next
+            self.translation = "\n\n".join(self.english[c["id"]] for c in self.chunks)
+
+    def build(self):
+        """Build every level; runs on the background executor."""
+        self.status = BUILDING
+        try:
+            with metrics.stage_timer("summary_tree"):
+                self._translate_chunks()
+                for chunk in self.chunks:
+                    self.chunk_summaries[chunk["id"]] = self._cached(
+                        router.MAP, MAP_PROMPT.format(text=self.english[chunk["id"]])
+                    )
+                for section in self.sections:
+                    notes = "\n".join(self.chunk_summaries[i] for i in section["chunk_ids"])
+                    section["summary"] = notes if len(section["chunk_ids"]) == 1 else self._cached(
+                        router.MAP, f"Combine these notes on '{section['title']}' into one short summary:\n\n{notes}"
+                    )
+                notes = "\n\n".join(f"{s['title']}: {s['summary']}" for s in self.sections)
+                self.document_summary = self._cached(
+                    router.SYNTHESIS, f"Write a cohesive summary of the document from these section notes:\n\n{notes}"
+                )
+            self.status = READY
+        except GenerationCancelled:
+            self.status = CANCELLED
+        except Exception as e:
+            self.status = FAILED
+            self.error = str(e)
+        finally:
+            self._done.set()
+
+    def cancel(self):
+        self.token.cancel()
+
+    @property
+    def ready(self):
+        return self.status == READY
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    # --- Lookup ---
+    def find_section(self, request):
+        """Section named in a request ("summarize section 4", "clause 12", "schedule 2")."""
+        for key in legal_chunker.find_references(request):
+            top = _section_key(key)
+            for section in self.sections:
+                if section["key"] in (key, top):
+                    return section
+        # Unstructured documents: "section 4" means the fourth part
+        match = re.search(r"\b(?:section|part)\s+(\d+)\b", request, re.IGNORECASE)
+        if match and 0 < int(match.group(1)) <= len(self.sections):
+            return self.sections[int(match.group(1)) - 1]
+        return None
+
+    def section_summary(self, request):
+        section = self.find_section(request)
+        if section and section["summary"]:
+            return f"**{section['title']}**\n\n{section['summary']}"
+        return None
+
+
+def for_document(doc_id, chunks, lang="English", source_text=""):
+    """A tree scheduled for building, or ``None`` when the document is too large to precompute."""
+    # len() only: building a tree reads and hashes every chunk, which decodes a spooled file whole
+    if isinstance(chunks, spool.LazyChunks) or len(chunks) > MAX_TREE_CHUNKS:
+        metrics.inc("clauseease_summary_tree_total", result=SKIPPED)
+        return None
+    return start(SummaryTree(doc_id, chunks, lang=lang, source_text=source_text))
+
+
+def start(tree):
+    """Schedule ``tree`` for background building; returns the tree."""
+    if len(tree.chunks) > MAX_TREE_CHUNKS:
+        tree.status = FAILED
+        tree.error = f"Too many chunks ({len(tree.chunks)}) to precompute"
+        tree._done.set()
+        return tree
+    _executor.submit(tree.build)
+    return tree
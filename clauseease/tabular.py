@@ -0,0 +1,183 @@
+"""
+Columnar CSV ingestion with row-level retrieval.
+
+Instead of flattening a whole CSV into one text blob, the table is kept as
+a DataFrame. Questions get a compact schema/statistics summary plus only
+the rows that match, and aggregation questions ("total amount by vendor",
+"how many contracts ...") are computed in pandas without calling the LLM.
+"""
+import re
+
+from . import lazy, metrics
+
+# Deferred: pandas is only needed once a CSV is uploaded
+pd = lazy.module("pandas")
+
+CHUNK_ROWS = 50_000
+MAX_CATEGORY_RATIO = 0.5
+
+STOPWORDS = {
+    "the", "and", "for", "with", "what", "which", "who", "how", "many", "much", "are",
+    "is", "was", "were", "does", "did", "show", "list", "give", "from", "that", "this",
+    "all", "any", "each", "per", "by", "of", "in", "on", "to", "a", "an", "me", "rows",
+    "row", "where", "have", "has", "total", "sum", "average", "mean", "count", "number",
+    "max", "min", "maximum", "minimum", "highest", "lowest", "largest", "smallest",
+}
+
+AGGREGATIONS = [
+    ("mean", re.compile(r"\b(average|avg|mean)\b")),
+    ("sum", re.compile(r"\b(sum|total)\b")),
+    ("max", re.compile(r"\b(max|maximum|highest|largest|biggest)\b")),
+    ("min", re.compile(r"\b(min|minimum|lowest|smallest)\b")),
+    ("count", re.compile(r"\b(count|how many|number of)\b")),
+]
+
+
+def read_csv_columnar(source, chunksize=CHUNK_ROWS):
+    """Read a CSV in row chunks into a compact, columnar DataFrame."""
+    with metrics.stage_timer("extraction", kind="csv"):
+        parts = list(pd.read_csv(source, chunksize=chunksize, low_memory=False))
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        try:
+            df = df.convert_dtypes(dtype_backend="pyarrow")
+        except (ImportError, TypeError, ValueError):
+            pass
+        # Repeated labels (vendor, status, country...) compress well as categories
+        for col in df.columns:
+            if _is_text(df[col]) and len(df) and df[col].nunique() / len(df) <= MAX_CATEGORY_RATIO:
+                df[col] = df[col].astype("category")
+    return df
+
+
+def _is_text(series):
+    return (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+            or isinstance(series.dtype, pd.CategoricalDtype))
+
+
+def _norm(name):
+    return re.sub(r"[\s_\-]+", " ", str(name)).strip().lower()
+
+
+class TableIndex:
+    """Schema summary, row retrieval and pandas aggregation over one table."""
+
+    def __init__(self, df, name="table"):
+        self.df = df
+        self.name = name
+        self._columns = {_norm(c): c for c in df.columns}
+        self._summary = None
+
+    # --- Schema ---
+    def schema_summary(self):
+        if self._summary is None:
+            lines = [f"Table `{self.name}`: {len(self.df)} rows x {len(self.df.columns)} columns"]
+            for col in self.df.columns:
+                series = self.df[col]
+                desc = f"- {col} ({series.dtype}; {series.notna().sum()} non-null; {series.nunique()} unique)"
+                if pd.api.types.is_numeric_dtype(series) and series.notna().any():
+                    desc += f" min={series.min()} max={series.max()} mean={series.mean():.4g}"
+                elif _is_text(series):
+                    top = series.value_counts().head(3).index.tolist()
+                    if top:
+                        desc += " e.g. " + ", ".join(str(v)[:30] for v in top)
+                lines.append(desc)
+            self._summary = "\n".join(lines)
+        return self._summary
+
+    # --- Row retrieval ---
+    def find_rows(self, question, limit=20):
+        """Return the rows that best match the question's keywords."""
+        with metrics.stage_timer("retrieval", kind="table"):
+            keywords = [w for w in re.findall(r"[\w.@-]+", question.lower())
+                        if len(w) > 2 and w not in STOPWORDS and w not in self._columns]
+            if not keywords:
+                return self.df.head(0)
+            scores = pd.Series(0, index=self.df.index)
+            for col in self.df.columns:
+                series = self.df[col]
+                if _is_text(series):
+                    text = series.astype(str).str.lower()
+                    for word in keywords:
+                        scores += text.str.contains(word, regex=False, na=False).astype(int)
+                elif pd.api.types.is_numeric_dtype(series):
+                    for word in keywords:
+                        try:
+                            scores += (series == float(word)).fillna(False).astype(int)
+                        except ValueError:
+                            continue
+            hits = scores[scores > 0].sort_values(ascending=False, kind="stable")
+            return self.df.loc[hits.index[:limit]]
+
+    def context_for(self, question, limit=20):
+        """Prompt context: schema summary plus only the matching rows."""
+        rows = self.find_rows(question, limit=limit)
+        if rows.empty:
+            rows = self.df.head(5)
+            label = "Sample rows"
+        else:
+            label = f"Matching rows ({len(rows)})"
+        return f"{self.schema_summary()}\n\n{label}:\n{rows.to_csv(index=False)}"
+
+    # --- Aggregation ---
+    def mentioned_columns(self, question):
+        text = _norm(question)
+        found = [(text.find(key), col) for key, col in self._columns.items()
+                 if re.search(rf"\b{re.escape(key)}\b", text)]
+        return [col for _, col in sorted(found)]
+
+    def answer_aggregate(self, question):
+        """
+        Compute sum/mean/count/max/min questions in pandas.
+
+        Returns a markdown answer, or ``None`` when the question is not an
+        aggregation this table can answer.
+        """
+        text = question.lower()
+        op = next((name for name, pattern in AGGREGATIONS if pattern.search(text)), None)
+        if op is None:
+            return None
+
+        df = self._filter_by_values(text)
+        group_col = self._group_column(text)
+        targets = [c for c in self.mentioned_columns(question)
+                   if c != group_col and pd.api.types.is_numeric_dtype(self.df[c])]
+        if op != "count" and not targets:
+            return None
+
+        with metrics.stage_timer("aggregation", kind="table"):
+            if op == "count":
+                result = df.groupby(group_col, observed=True).size() if group_col else len(df)
+                target = "rows"
+            else:
+                target = targets[0]
+                series = df.groupby(group_col, observed=True)[target] if group_col else df[target]
+                result = getattr(series, op)()
+
+        label = f"{op} of {target}" + (f" by {group_col}" if group_col else "")
+        if isinstance(result, pd.Series):
+            body = result.sort_values(ascending=False).head(50).to_string()
+            return f"**{label}** (computed over {len(df)} rows):\n\n```\n{body}\n```"
+        return f"**{label}** (computed over {len(df)} rows): {result}"
+
+    def _group_column(self, text):
+        match = re.search(r"\b(?:by|per|for each|grouped by)\s+([\w\s\-]+)", text)
+        if not match:
+            return None
+        tail = _norm(match.group(1))
+        for key, col in sorted(self._columns.items(), key=lambda kv: -len(kv[0])):
+            if tail.startswith(key):
+                return col
+        return None
+
+    def _filter_by_values(self, text):
+        """Keep rows whose categorical values are named in the question."""
+        df = self.df
+        for col in df.columns:
+            series = df[col]
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                continue
+            named = [v for v in series.cat.categories
+                     if len(str(v)) > 2 and re.search(rf"\b{re.escape(str(v).lower())}\b", text)]
+            if named:
+                df = df[series.isin(named)]
+        return df
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+Persistent segment-level translation memory.
+
+Contracts repeat the same sentences and clauses across documents and
+versions. Text is split into segments (sentences and lines), and each
+segment's translation is stored in SQLite (``CLAUSEEASE_TM_PATH``, default
+``translation_memory.sqlite3`` in the shared state directory, see
+:mod:`clauseease.paths`) keyed by the hash of the normalised segment and
+the language pair. On the next translation:
+
+- exact matches are reused without calling the model,
+- close matches (``difflib`` ratio >= ``FUZZY_THRESHOLD``) are passed to the
+  model as hints for the new segment,
+- only novel segments are sent to the model, numbered and in batches.
+
+Lookups are counted in ``clauseease_translation_memory_total{result}``
+(``exact``, ``fuzzy``, ``miss``); :meth:`TranslationMemory.stats` reports the
+hit rate.
+"""
+import difflib
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from . import metrics, paths
+
+TM_PATH = os.environ.get("CLAUSEEASE_TM_PATH") or paths.state_path("translation_memory.sqlite3")
+FUZZY_THRESHOLD = 0.75
+FUZZY_CANDIDATES = 200
+BATCH_CHARS = 3000
+
+# Sentence ends and line breaks; the separators are kept so the text can be reassembled
+SEGMENT_RE = re.compile(r"(\n+|(?<=[.!?;:])[ \t]+)")
+NUMBERED_RE = re.compile(r"^\s*\[?(\d+)[\].):]\s*(.*)$")
+QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'", "–": "-", "—": "-"})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    src_lang TEXT NOT NULL,
+    tgt_lang TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (src_lang, tgt_lang, hash)
+);
+CREATE INDEX IF NOT EXISTS segments_by_length ON segments (src_lang, tgt_lang, length);
+"""
+
+
+def normalize(segment):
+    """Form used for matching: Unicode-normalised, plain quotes and dashes, collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", segment).translate(QUOTES).split())
+
+
+def segment_hash(segment):
+    return hashlib.sha1(normalize(segment).encode("utf-8")).hexdigest()
+
+
+def split_segments(text):
+    """``[(segment, separator)]``; joining every pair reproduces ``text``."""
+    parts = SEGMENT_RE.split(text)
+    parts.append("")
+    return list(zip(parts[0::2], parts[1::2]))
+
+
+def _translatable(segment):
+    # Clause numbers, amounts and blank lines are the same in every language
+    return any(c.isalpha() for c in segment)
+
+
+def batch_prompt(segments, src_lang, tgt_lang, hints):
+    lines = [f"Translate each numbered segment from {src_lang} to {tgt_lang}.",
+             "Reply with the same numbers, one segment per line, and nothing else."]
+    if hints:
+        lines.append("\nEarlier translations of similar segments, for consistent terminology:")
+        lines.extend(f"- {source} => {target}" for source, target in hints)
+    lines.append("")
+    lines.extend(f"{i}. {normalize(s)}" for i, s in enumerate(segments, 1))
+    return "\n".join(lines)
+
+
+def parse_numbered(reply, count):
+    """Segment translations from a numbered reply, or ``None`` if any are missing."""
+    found = {}
+    for line in reply.splitlines():
+        match = NUMBERED_RE.match(line)
+        if match and match.group(2).strip():
+            found.setdefault(int(match.group(1)), match.group(2).strip())
+    if not all(i in found for i in range(1, count + 1)):
+        return None
+    return [found[i] for i in range(1, count + 1)]
+
+
+class TranslationMemory:
+    """Segment translations in SQLite, shared by every session and process on the machine."""
+
+    def __init__(self, path=TM_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.counts = {"exact": 0, "fuzzy": 0, "miss": 0}
+        self._conn = sqlite3.connect(paths.ensure_parent(path), check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    # --- Storage ---
+    def lookup(self, segment, src_lang, tgt_lang="English"):
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT target FROM segments WHERE src_lang=? AND tgt_lang=? AND hash=?",
+                (src_lang, tgt_lang, segment_hash(segment)),
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE segments SET hits = hits + 1 WHERE src_lang=? AND tgt_lang=? AND hash=?",
+                                   (src_lang, tgt_lang, segment_hash(segment)))
+        return row[0] if row else None
+
+    def fuzzy(self, segment, src_lang, tgt_lang="English"):
+        """Closest stored ``(source, target)`` for a segment, or ``None``."""
+        norm = normalize(segment)
+        low, high = int(len(norm) * FUZZY_THRESHOLD), int(len(norm) / FUZZY_THRESHOLD) + 1
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, target FROM segments WHERE src_lang=? AND tgt_lang=? AND length BETWEEN ? AND ? "
+                "ORDER BY hits DESC LIMIT ?",
+                (src_lang, tgt_lang, low, high, FUZZY_CANDIDATES),
+            ).fetchall()
+        best, best_ratio = None, FUZZY_THRESHOLD
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(norm)
+        for source, target in rows:
+            matcher.set_seq1(source)
+            if matcher.real_quick_ratio() >= best_ratio and matcher.quick_ratio() >= best_ratio:
+                ratio = matcher.ratio()
+                if ratio >= best_ratio:
+                    best, best_ratio = (source, target), ratio
+        return best
+
+    def store(self, segment, target, src_lang, tgt_lang="English"):
+        norm = normalize(segment)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO segments (src_lang, tgt_lang, hash, source, target, length, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (src_lang, tgt_lang, segment_hash(segment), norm, target, len(norm), time.time()),
+            )
+
+    # --- Translation ---
+    def translate(self, text, src_lang, generate, tgt_lang="English", cancel_token=None):
+        """
+        Translate ``text`` segment by segment; ``generate(prompt)`` is only called for novel segments.
+
+        Segment order, line breaks and spacing of ``text`` are preserved.
+        Only translations the model returned in the requested numbering are
+        stored, and nothing is stored once ``cancel_token`` is cancelled.
+        """
+        pairs = split_segments(text)
+        out = [segment for segment, _ in pairs]
+        novel, hints = {}, []
+        for i, (segment, _) in enumerate(pairs):
+            if not _translatable(segment):
+                continue
+            key = segment_hash(segment)
+            if key in novel:
+                # Repeats inside this text are translated once
+                novel[key].append(i)
+                continue
+            target = self.lookup(segment, src_lang, tgt_lang)
+            if target is not None:
+                out[i] = target
+                self._count("exact")
+                continue
+            novel[key] = [i]
+            hint = self.fuzzy(segment, src_lang, tgt_lang)
+            if hint and hint not in hints:
+                hints.append(hint)
+            self._count("fuzzy" if hint else "miss")
+
+        batch, size = [], 0
+        for indices in novel.values():
+            segment = pairs[indices[0]][0]
+            if batch and size + len(segment) > BATCH_CHARS:
+                self._translate_batch(batch, pairs, out, src_lang, tgt_lang, generate, hints, cancel_token)
+                batch, size = [], 0
+            batch.append(indices)
+            size += len(segment)
+        if batch:
+            self._translate_batch(batch, pairs, out, src_lang, tgt_lang, generate, hints, cancel_token)
+        return "".join(target + separator for target, (_, separator) in zip(out, pairs))
+
+    def _translate_batch(self, batch, pairs, out, src_lang, tgt_lang, generate, hints, cancel_token=None):
+        segments = [pairs[indices[0]][0] for indices in batch]
+        relevant = [h for h in hints if any(difflib.SequenceMatcher(None, h[0], normalize(s)).quick_ratio()
+                                            >= FUZZY_THRESHOLD for s in segments)]
+        targets = parse_numbered(generate(batch_prompt(segments, src_lang, tgt_lang, relevant)), len(segments))
+        clean = [targets is not None] * len(segments)
+        if targets is None:
+            # The model did not keep the numbering: fall back to one segment per call
+            targets, clean = [], []
+            for segment in segments:
+                reply = generate(batch_prompt([segment], src_lang, tgt_lang, relevant)).strip()
+                parsed = parse_numbered(reply, 1)
+                targets.append(parsed[0] if parsed else reply)
+                clean.append(parsed is not None)
+        # Unparsed or possibly cut-off replies are shown this once but never remembered
+        cancelled = cancel_token is not None and cancel_token.cancelled
+        for indices, segment, target, ok in zip(batch, segments, targets, clean):
+            if ok and not cancelled:
+                self.store(segment, target, src_lang, tgt_lang)
+            for i in indices:
+                out[i] = target
+
+    def _count(self, result):
+        with self._lock:
+            self.counts[result] += 1
+        metrics.inc("clauseease_translation_memory_total", result=result)
+
+    def stats(self):
+        """Lookups by result since start-up, stored segments and the exact-match hit rate."""
+        with self._lock:
+            counts = dict(self.counts)
+            segments = self._conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        total = sum(counts.values())
+        return {**counts, "segments": segments, "hit_rate": counts["exact"] / total if total else 0.0}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_memory():
+    """Process-wide translation memory at ``CLAUSEEASE_TM_PATH``."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = TranslationMemory()
+        return _default
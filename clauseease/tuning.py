@@ -0,0 +1,70 @@
+"""
+Chunk size and overlap settings measured by :mod:`clauseease.calibrate`.
+
+Calibration writes the best settings per model to a JSON file
+(``CLAUSEEASE_CHUNK_SETTINGS``, default ``chunk_settings.json`` in the
+shared state directory, see :mod:`clauseease.paths`).
+Chunkers ask :func:`chunk_settings` for their sizes and fall back to their
+own defaults when nothing has been calibrated, so the file is optional.
+The file is re-read when it changes, so a running app picks up a new
+calibration without a restart.
+"""
+import json
+import os
+import threading
+import time
+
+from . import paths
+
+SETTINGS_PATH = os.environ.get("CLAUSEEASE_CHUNK_SETTINGS") or paths.state_path("chunk_settings.json")
+
+_lock = threading.Lock()
+_cache = {"mtime": None, "data": {}}
+
+
+def load(path=None):
+    """Return the stored settings, ``{"default": model, "models": {model: {...}}}``."""
+    path = path or SETTINGS_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _lock:
+        if _cache["mtime"] != (path, mtime):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    _cache["data"] = json.load(f)
+            except (OSError, ValueError):
+                _cache["data"] = {}
+            _cache["mtime"] = (path, mtime)
+        return _cache["data"]
+
+
+def save(model, settings, make_default=True, path=None):
+    """Store ``settings`` (``chunk_chars``, ``overlap_chars`` and the measurements) for ``model``."""
+    path = path or SETTINGS_PATH
+    data = dict(load(path))
+    data.setdefault("models", {})[model] = {**settings, "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    if make_default or "default" not in data:
+        data["default"] = model
+    tmp = f"{paths.ensure_parent(path)}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+    return data
+
+
+def chunk_settings(model=None, default=(2000, 0)):
+    """
+    ``(chunk_chars, overlap_chars)`` calibrated for ``model``.
+
+    Without a model, the settings of the model calibrated for map steps are
+    used. ``default`` is returned when there is no calibration.
+    """
+    data = load()
+    models = data.get("models", {})
+    model = model or data.get("default")
+    settings = models.get(model) or models.get(f"{model}:latest")
+    if not settings:
+        return default
+    return int(settings["chunk_chars"]), int(settings.get("overlap_chars", 0))
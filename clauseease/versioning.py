@@ -0,0 +1,159 @@
+"""
+Versioned documents and content-defined chunking.
+
+Negotiations produce v2, v3, v4 of nearly the same contract. Chunk
+boundaries here are chosen by a rolling (gear) hash over the last few
+dozen words, not by position, so an inserted paragraph only changes the
+chunks around it and every later chunk keeps its exact text and hash.
+
+Chunks are identified by content hash. Anything derived from a chunk —
+summaries, embeddings — is cached by that hash in a :class:`ContentCache`,
+so re-processing a lightly edited version reuses almost everything from
+the previous one.
+"""
+import hashlib
+import math
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+from . import metrics
+
+MASK64 = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+# Boundary bits sit above the low bits, so the decision depends on ~this many recent words
+WINDOW_SHIFT = 24
+AVG_CHARS_PER_WORD = 6
+
+WORD_RE = re.compile(r"\S+\s*")
+VERSION_RE = re.compile(
+    r"([\s_\-]*(v|ver|version|rev|revision|draft)[\s_\-.]*\d+[a-z]?"
+    r"|[\s_\-]*\(\d+\)|[\s_\-]*-?\s*copy|[\s_\-]*(final|clean|redline))+$",
+    re.IGNORECASE,
+)
+
+
+def chunk_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _word_value(word):
+    return (zlib.crc32(word.encode("utf-8")) * GOLDEN) & MASK64
+
+
+def cdc_chunks(text, avg_chars=800, min_chars=None, max_chars=None):
+    """
+    Split ``text`` at content-defined word boundaries.
+
+    Returns ``[{"id", "hash", "text"}]``; joining the texts reproduces the
+    input exactly.
+    """
+    min_chars = min_chars or avg_chars // 3
+    max_chars = max_chars or avg_chars * 3
+    bits = max(1, round(math.log2(max(2, (avg_chars - min_chars) / AVG_CHARS_PER_WORD))))
+    mask = (1 << bits) - 1
+
+    chunks = []
+    with metrics.stage_timer("chunking", mode="cdc"):
+        start = 0
+        h = 0
+        for match in WORD_RE.finditer(text):
+            h = ((h << 1) + _word_value(match.group().rstrip())) & MASK64
+            end = match.end()
+            size = end - start
+            if (size >= min_chars and (h >> WINDOW_SHIFT) & mask == 0) or size >= max_chars:
+                piece = text[start:end]
+                chunks.append({"id": len(chunks), "hash": chunk_hash(piece), "text": piece})
+                start = end
+        if start < len(text):
+            piece = text[start:]
+            chunks.append({"id": len(chunks), "hash": chunk_hash(piece), "text": piece})
+    return chunks
+
+
+def document_family(filename):
+    """Name shared by all versions of a document: ``MSA_v3 (1).pdf`` -> ``msa``."""
+    stem = filename.rsplit(".", 1)[0] if "." in filename else filename
+    return VERSION_RE.sub("", stem).strip(" _-").lower() or stem.lower()
+
+
+class ContentCache:
+    """Thread-safe LRU mapping of content hash -> derived value."""
+
+    def __init__(self, name, max_items=50_000):
+        self.name = name
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                metrics.inc("clauseease_content_cache_total", cache=self.name, result="hit")
+                return self._items[key]
+        metrics.inc("clauseease_content_cache_total", cache=self.name, result="miss")
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+
+SUMMARIES = ContentCache("summaries")
+
+
+class VersionStore:
+    """Chunk-hash lists for every version of every document family."""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def add_version(self, family, chunks):
+        """
+        Record a new version and diff it against the previous one.
+
+        Returns ``{"version", "previous", "reused", "added", "removed"}``
+        where the last three are lists of chunk hashes.
+        """
+        hashes = [c["hash"] for c in chunks]
+        with self._lock:
+            history = self._versions.setdefault(family, [])
+            previous = history[-1] if history else []
+            if hashes == previous:
+                version = len(history)
+            else:
+                history.append(hashes)
+                version = len(history)
+        before = set(previous)
+        after = set(hashes)
+        return {
+            "version": version,
+            "previous": version - 1 if previous else None,
+            "reused": [h for h in hashes if h in before],
+            "added": [h for h in hashes if h not in before],
+            "removed": [h for h in previous if h not in after],
+        }
+
+    def versions(self, family):
+        with self._lock:
+            return len(self._versions.get(family, []))
+
+
+_store = VersionStore()
+
+
+def default_store():
+    return _store
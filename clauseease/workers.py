@@ -0,0 +1,77 @@
+"""
+Process pools that are safe to start from Streamlit and the API server.
+
+Both host processes are multi-threaded, so workers must not be forked
+from them: a fork copies locks held by other threads and can deadlock.
+Workers therefore start from a fresh interpreter (``forkserver`` where
+the platform has it, otherwise ``spawn``).
+
+A fresh interpreter normally re-runs the parent's ``__main__`` script,
+and while a page runs Streamlit installs the page script as
+``__main__``. Processes started by :func:`process_pool` are launched
+without that instruction, so no worker ever executes a page (or any
+other caller's script); ``sys.modules["__main__"]`` is never touched, so
+other threads are unaffected. Work sent to these pools must live in an
+importable module, such as :func:`clauseease.pipeline.prepare_document`.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import spawn
+
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# A worker that is not up by then has failed to start
+START_TIMEOUT = 120
+
+_context = multiprocessing.get_context(START_METHOD)
+_launching = threading.local()
+_preparation_data = spawn.get_preparation_data
+
+
+def _worker_preparation_data(name):
+    data = _preparation_data(name)
+    if getattr(_launching, "active", False):
+        # Leave the child's __main__ alone instead of importing the parent's script into it
+        data.pop("init_main_from_name", None)
+        data.pop("init_main_from_path", None)
+    return data
+
+
+# Both the spawn and forkserver launchers look this up on every start; only our own launches change
+spawn.get_preparation_data = _worker_preparation_data
+
+
+class _WorkerProcess(_context.Process):
+    def start(self):
+        _launching.active = True
+        try:
+            super().start()
+        finally:
+            _launching.active = False
+
+
+class _WorkerContext(type(_context)):
+    Process = _WorkerProcess
+
+
+def in_worker():
+    """True inside a worker process, where starting another pool would oversubscribe the CPUs."""
+    return multiprocessing.parent_process() is not None
+
+
+def _wait_for_siblings(barrier):
+    barrier.wait(START_TIMEOUT)
+
+
+def process_pool(max_workers=None):
+    """A :class:`ProcessPoolExecutor` with all ``max_workers`` workers started, none running ``__main__``."""
+    max_workers = max_workers or os.cpu_count() or 1
+    # The pool only starts a worker when none is idle; holding every worker at the barrier until
+    # the last one is up makes each warm-up task start its own
+    barrier = _context.Barrier(max_workers)
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=_WorkerContext(),
+                               initializer=_wait_for_siblings, initargs=(barrier,))
+    for future in [pool.submit(os.getpid) for _ in range(max_workers)]:
+        future.result()
+    return pool
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The clauseease package lives at the repository root, as it does for the apps
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,90 @@
+import threading
+
+import numpy as np
+import pytest
+
+from clauseease import ann
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return ann.synthetic(12000, 32, clusters=60)
+
+
+def built(vectors, nlist=64):
+    index = ann.IVFIndex(vectors.shape[1], nlist=nlist)
+    for start in range(0, len(vectors), 1000):
+        index.add([f"c{i}" for i in range(start, start + 1000)], vectors[start:start + 1000])
+    return index
+
+
+def recall(index, vectors, queries, k=10, **options):
+    truth = ann.exact_top(vectors, queries, k)
+    found = 0
+    for q, expected in zip(queries, truth):
+        found += len({f"c{i}" for i in expected} & {key for _, key in index.search(q, k=k, **options)})
+    return found / (k * len(queries))
+
+
+def test_small_index_searches_exactly():
+    vectors = ann.synthetic(50, 8)
+    index = ann.IVFIndex(8)
+    index.add([f"c{i}" for i in range(50)], vectors)
+    assert not index.trained
+    assert index.search(vectors[7], k=1)[0][1] == "c7"
+
+
+def test_index_trains_itself_and_keeps_recall(vectors):
+    index = built(vectors)
+    assert index.trained and len(index) == len(vectors)
+    queries = ann.normalize(vectors[:50] + 0.05 * np.random.default_rng(1).standard_normal((50, 32)))
+    assert recall(index, vectors, queries, nprobe=16, rerank=128) >= 0.9
+
+
+def test_removed_rows_are_never_returned(vectors):
+    index = built(vectors)
+    index.remove(["c5", "c6"])
+    assert "c5" not in {key for _, key in index.search(vectors[5], k=20)}
+    assert len(index) == len(vectors) - 2
+    # Adding the key again brings it back
+    index.add(["c5"], vectors[5:6])
+    assert index.search(vectors[5], k=1)[0][1] == "c5"
+
+
+def test_search_restricted_to_rows(vectors):
+    index = built(vectors)
+    keys = [f"c{i}" for i in range(100, 140)]
+    hits = index.search(vectors[0], k=5, rows=index.rows_for(keys))
+    assert len(hits) == 5 and {key for _, key in hits} <= set(keys)
+
+
+def test_save_and_load_round_trip(vectors, tmp_path):
+    index = built(vectors)
+    index.remove(["c3"])
+    index.save(tmp_path)
+    loaded = ann.IVFIndex.load(tmp_path)
+    assert len(loaded) == len(vectors) - 1
+    assert loaded.search(vectors[10], k=1)[0][1] == "c10"
+    loaded.add(["extra"], vectors[3:4])
+    assert loaded.search(vectors[3], k=1)[0][1] == "extra"
+
+
+def test_concurrent_adds_train_once(vectors, monkeypatch):
+    clusterings = []
+    kmeans = ann.spherical_kmeans
+    monkeypatch.setattr(ann, "spherical_kmeans", lambda *a, **k: clusterings.append(1) or kmeans(*a, **k))
+    index = ann.IVFIndex(vectors.shape[1], nlist=32)
+
+    def add(part):
+        for start in range(part * 3000, (part + 1) * 3000, 200):
+            index.add([f"c{i}" for i in range(start, start + 200)], vectors[start:start + 200])
+
+    threads = [threading.Thread(target=add, args=(part,)) for part in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(clusterings) == 1 and len(index) == len(vectors)
+    # Rows added while clustering ran are filed against the final centroids too
+    rows = index._rows_locked()
+    assert (rows["lists"] == ann.nearest(rows["vectors"], index.centroids)).all()
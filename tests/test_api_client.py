@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from clauseease import api_client
+from clauseease.scheduler import CancelToken
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, lines=()):
+        self.status_code = status_code
+        self.body = body
+        self.lines = lines
+        self.text = json.dumps(body) if body is not None else ""
+        self.encoding = None
+
+    def json(self):
+        return self.body
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def sse(*events):
+    lines = []
+    for event, data in events:
+        lines += [f"event: {event}", f"data: {json.dumps(data)}", ""]
+    return lines
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Record requests and answer them from a queue of responses."""
+    calls, replies = [], []
+
+    def post(url, **kwargs):
+        calls.append((url, kwargs))
+        return replies.pop(0)
+
+    monkeypatch.setattr(api_client.requests, "post", post)
+    return calls, replies
+
+
+def test_upload_and_search_send_user_header(server):
+    calls, replies = server
+    client = api_client.APIClient("http://api/", user="asha")
+    replies.append(FakeResponse(body={"id": "abc", "name": "lease.pdf"}))
+    doc = client.upload(b"%PDF", "lease.pdf")
+    assert doc.key == "abc" and doc["name"] == "lease.pdf" and not doc.shared
+
+    replies.append(FakeResponse(body={"results": []}))
+    assert client.search(doc, "rent") == {"results": []}
+    url, kwargs = calls[-1]
+    assert url == "http://api/documents/abc/search"
+    assert kwargs["headers"] == {api_client.USER_HEADER: "asha"}
+
+
+def test_unknown_document_is_uploaded_again(server):
+    calls, replies = server
+    client = api_client.APIClient("http://api")
+    doc = api_client.RemoteDocument({"id": "old"}, source=(b"data", "a.txt"))
+    replies += [FakeResponse(404), FakeResponse(body={"id": "new"}), FakeResponse(body={"results": [1]})]
+    assert client.search(doc, "q") == {"results": [1]}
+    assert doc.key == "new"
+    assert [url for url, _ in calls] == ["http://api/documents/old/search", "http://api/documents",
+                                         "http://api/documents/new/search"]
+
+
+def test_errors_raise_api_error(server):
+    _, replies = server
+    replies.append(FakeResponse(500, body={"error": "boom"}))
+    with pytest.raises(api_client.APIError, match="500"):
+        api_client.APIClient("http://api").search("abc", "q")
+
+
+def test_event_stream(server):
+    _, replies = server
+    replies.append(FakeResponse(lines=sse(("token", {"text": "Hel"}), ("token", {"text": "lo"}),
+                                          ("done", {}), ("token", {"text": "late"}))))
+    assert "".join(api_client.APIClient("http://api").chat("hi")) == "Hello"
+
+    replies.append(FakeResponse(lines=sse(("token", {"text": "a"}), ("error", {"error": "model crashed"}))))
+    with pytest.raises(api_client.APIError, match="model crashed"):
+        list(api_client.APIClient("http://api").ask("abc", "q"))
+
+
+def test_cancelled_stream_stops(server):
+    _, replies = server
+    token = CancelToken()
+    replies.append(FakeResponse(lines=sse(("token", {"text": "a"}), ("token", {"text": "b"}))))
+    pieces = api_client.APIClient("http://api").summarize("abc", cancel_token=token)
+    assert next(pieces) == "a"
+    token.cancel()
+    assert list(pieces) == []
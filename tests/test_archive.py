@@ -0,0 +1,58 @@
+import io
+import zipfile
+
+import pytest
+
+from clauseease import archive
+
+
+def make_zip(entries):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+    buf.seek(0)
+    return zipfile.ZipFile(buf)
+
+
+def test_members_skips_hidden_folders_and_bombs():
+    zf = make_zip({
+        "contracts/": b"",
+        "contracts/lease.txt": b"The tenant shall pay rent monthly.",
+        "__MACOSX/contracts/._lease.txt": b"junk",
+        ".DS_Store": b"junk",
+        "bomb.txt": b"0" * (archive.MAX_RATIO * 2000),
+    })
+    wanted, skipped = archive.members(zf)
+    assert [info.filename for info in wanted] == ["contracts/lease.txt"]
+    reasons = {info.filename: reason for info, reason in skipped}
+    assert reasons == {
+        "contracts/": "folder",
+        "__MACOSX/contracts/._lease.txt": "hidden file",
+        ".DS_Store": "hidden file",
+        "bomb.txt": "suspicious compression ratio",
+    }
+
+
+def test_encrypted_and_oversized_members_are_skipped(monkeypatch):
+    zf = make_zip({"a.txt": b"secret", "b.txt": b"x" * 100})
+    encrypted, big = zf.infolist()
+    encrypted.flag_bits |= 0x1
+    monkeypatch.setattr(archive, "MAX_MEMBER_BYTES", 50)
+    assert archive._skip_reason(encrypted) == "encrypted"
+    assert archive._skip_reason(big).startswith("larger than")
+
+
+def test_read_member_enforces_limit():
+    zf = make_zip({"a.txt": b"y" * 1000})
+    info = zf.infolist()[0]
+    assert archive.read_member(zf, info) == b"y" * 1000
+    with pytest.raises(ValueError):
+        archive.read_member(zf, info, limit=999)
+
+
+def test_is_archive():
+    zf = make_zip({"a.txt": b"hello"})
+    zf.fp.seek(0)
+    assert archive.is_archive(zf.fp.read(), "bundle.zip")
+    assert not archive.is_archive(b"plain text", "notes.txt")
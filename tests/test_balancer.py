@@ -0,0 +1,63 @@
+import pytest
+import requests
+
+from clauseease import balancer
+
+
+@pytest.fixture
+def pool():
+    b = balancer.Balancer(["http://a", "http://b", "http://c"], eject_seconds=60)
+    # No background polling in tests
+    b.start_health_checks = lambda: None
+    return b
+
+
+def test_configured_urls(monkeypatch):
+    monkeypatch.setenv("OLLAMA_URLS", "http://gpu1:11434/, http://gpu2:11434,")
+    assert balancer.configured_urls() == ["http://gpu1:11434", "http://gpu2:11434"]
+
+
+def test_least_outstanding_requests(pool):
+    a, b, c = pool.endpoints
+    a.in_flight, b.in_flight, c.in_flight = 3, 1, 2
+    assert pool.pick() is b
+
+
+def test_prefers_warm_endpoint_unless_clearly_busier(pool):
+    a, b, c = pool.endpoints
+    c.loaded = {"mistral:latest"}
+    c.in_flight = balancer.AFFINITY_SLACK
+    assert pool.pick("mistral:latest") is c
+    c.in_flight = balancer.AFFINITY_SLACK + 1
+    assert pool.pick("mistral:latest") is a
+
+
+def test_affinity_is_sticky(pool):
+    first = pool.pick(affinity="doc-1")
+    assert all(pool.pick(affinity="doc-1") is first for _ in range(5))
+    first.in_flight = balancer.AFFINITY_SLACK + 1
+    assert pool.pick(affinity="doc-1") is not first
+
+
+def test_ejected_endpoint_is_avoided(pool):
+    a, b, c = pool.endpoints
+    pool.eject(a)
+    pool.eject(b)
+    assert pool.pick() is c
+    pool.eject(c)
+    # Every endpoint ejected: still route somewhere
+    assert pool.pick() in pool.endpoints
+
+
+def test_lease_counts_and_ejects_on_connection_error(pool):
+    with pool.lease("mistral:latest") as url:
+        endpoint = next(e for e in pool.endpoints if e.url == url)
+        assert endpoint.in_flight == 1
+    assert endpoint.in_flight == 0
+    assert "mistral:latest" in endpoint.loaded
+
+    with pytest.raises(requests.ConnectionError):
+        with pool.lease() as url:
+            raise requests.ConnectionError("refused")
+    failed = next(e for e in pool.endpoints if e.url == url)
+    assert not failed.healthy and failed.in_flight == 0
@@ -0,0 +1,55 @@
+import pytest
+
+from clauseease import calibrate, ollama_client, summary_tree, tuning
+
+
+@pytest.fixture
+def echo_model(monkeypatch, tmp_path):
+    """A model whose summaries repeat the chunk, so every fact survives."""
+    prefix = summary_tree.MAP_PROMPT.split("{text}")[0]
+    suffix = summary_tree.MAP_PROMPT.split("{text}")[1]
+
+    def generate(prompt, model, options=None, **kwargs):
+        return prompt[len(prefix):len(prompt) - len(suffix)] if prompt.startswith(prefix) else "OK"
+
+    monkeypatch.setattr(ollama_client, "generate", generate)
+    monkeypatch.setattr(ollama_client, "show", lambda model: {"model_info": {"llama.context_length": 2048}})
+    monkeypatch.setattr(ollama_client, "list_models", lambda: ["tinyllama:latest", "nomic-embed-text:latest"])
+    monkeypatch.setattr(tuning, "SETTINGS_PATH", str(tmp_path / "chunk_settings.json"))
+
+
+def test_facts_reduce_to_digits():
+    found = calibrate.facts("Pay $48,000 within 30 days; interest 1.5% from March 3, 2026.")
+    assert {"48000", "30", "1.5", "2026"} <= found
+
+
+def test_window_chunks_cover_text_with_overlap():
+    text = " ".join(f"w{i}" for i in range(400))
+    chunks = calibrate.window_chunks(text, 200, 50)
+    assert all(len(c) <= 200 for c in chunks)
+    assert chunks[0].startswith("w0") and chunks[-1].endswith("w399")
+    assert chunks[1][:10] in chunks[0]
+
+
+def test_best_prefers_speed_over_the_quality_floor():
+    results = [{"docs_per_minute": 10, "quality": 0.95}, {"docs_per_minute": 30, "quality": 0.8},
+               {"docs_per_minute": 90, "quality": 0.4}]
+    assert calibrate.best(results, 0.7)["docs_per_minute"] == 30
+    assert calibrate.best(results, 0.99)["quality"] == 0.95
+
+
+def test_sample_contracts_are_deterministic():
+    assert calibrate.sample_contracts(2, clauses=5) == calibrate.sample_contracts(2, clauses=5)
+    assert len(calibrate.sample_contracts(2, clauses=5)) == 2
+
+
+def test_calibrate_saves_choice(echo_model):
+    lines = []
+    docs = calibrate.sample_contracts(1, clauses=6)
+    chosen = calibrate.calibrate(docs=docs, sizes=(500, 9000), overlaps=(0.0,), report=lines.append)
+    assert list(chosen) == ["tinyllama:latest"]
+    assert chosen["tinyllama:latest"]["quality"] == 1.0
+    assert chosen["tinyllama:latest"]["context_tokens"] == 2048
+    # 9000 characters do not fit a 2048-token context
+    assert any("9000" in line and "skipped" in line for line in lines)
+    assert tuning.chunk_settings("tinyllama:latest") == (500, 0)
@@ -0,0 +1,18 @@
+import pytest
+
+pytest.importorskip("streamlit")
+
+from clauseease import chat_view  # noqa: E402
+
+
+def test_dollar_amounts_are_not_latex():
+    assert chat_view.prepare_markdown("Fees are $5,000 and $10,000.") == "Fees are \\$5,000 and \\$10,000."
+
+
+def test_code_blocks_are_left_alone():
+    text = "Cost $5\n```\necho $HOME\n```\n"
+    assert chat_view.prepare_markdown(text) == "Cost \\$5\n```\necho $HOME\n```\n"
+
+
+def test_unterminated_fence_is_closed():
+    assert chat_view.prepare_markdown("```python\nprint(1)").endswith("\n```")
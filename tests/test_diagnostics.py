@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from clauseease import metrics  # noqa: E402
+
+
+def panel():
+    from clauseease.diagnostics import render_diagnostics_panel
+
+    render_diagnostics_panel()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    fresh = metrics.MetricsRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", fresh)
+    return fresh
+
+
+def test_empty_panel(registry):
+    app = AppTest.from_function(panel).run()
+    assert not app.exception
+    assert app.caption[0].value == "No measurements yet."
+
+
+def test_panel_lists_metrics_with_labels(registry):
+    registry.observe("clauseease_ttft_seconds", 0.4, model="tinyllama")
+    app = AppTest.from_function(panel).run()
+    assert not app.exception
+    table = app.dataframe[0].value
+    assert list(table["metric"]) == ["Time to first token (s)"]
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from clauseease import doc_registry
+
+
+def fields(text="contract text"):
+    return {"full_text": text, "chunks": [{"text": text}]}
+
+
+def test_concurrent_acquires_build_once():
+    registry, builds = doc_registry.DocumentRegistry(), []
+    gate = threading.Event()
+
+    def build():
+        builds.append(1)
+        gate.wait(5)
+        return fields()
+
+    handles = []
+    threads = [threading.Thread(target=lambda: handles.append(registry.acquire("k", build))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert len(builds) == 1 and len(handles) == 4
+    assert sorted(h.shared for h in handles) == [False, True, True, True]
+    assert handles[0]["full_text"] == "contract text"
+
+
+def test_unreferenced_documents_are_evicted_over_the_cap():
+    registry, cleaned = doc_registry.DocumentRegistry(max_bytes=1), []
+    handle = registry.acquire("k", fields, cleanup=lambda f: cleaned.append(f["full_text"]))
+    assert registry.stats()["documents"] == 1
+    handle.release()
+    assert registry.stats()["documents"] == 0 and cleaned == ["contract text"]
+
+
+def test_idle_documents_expire_but_lookup_reattaches_before_that():
+    registry = doc_registry.DocumentRegistry(idle_ttl=60)
+    registry.acquire("k", fields).release()
+    handle = registry.lookup("k")
+    assert handle is not None and handle.shared
+    handle.release()
+    registry.idle_ttl = 0
+    registry.sweep()
+    assert registry.lookup("k") is None
+
+
+def test_failed_build_is_not_cached():
+    registry = doc_registry.DocumentRegistry()
+    with pytest.raises(ValueError):
+        registry.acquire("k", lambda: (_ for _ in ()).throw(ValueError("bad file")))
+    assert registry.acquire("k", fields)["full_text"] == "contract text"
+
+
+def test_content_key_is_stable_across_buffer_types():
+    data = b"%PDF-1.7 contract"
+    assert doc_registry.content_key(data) == doc_registry.content_key(memoryview(data))
@@ -0,0 +1,76 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from clauseease import embeddings
+
+
+def fake_vector(text, dim=16):
+    seed = int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).standard_normal(dim).tolist()
+
+
+@pytest.fixture
+def embed(monkeypatch):
+    calls = []
+
+    def fake(texts, model):
+        calls.append(list(texts))
+        return [fake_vector(t) for t in texts]
+
+    monkeypatch.setattr(embeddings.ollama_client, "embed", fake)
+    monkeypatch.setattr(embeddings, "VECTORS", embeddings.ContentCache("test_embeddings"))
+    return calls
+
+
+def chunk(text):
+    return {"hash": hashlib.sha1(text.encode()).hexdigest(), "text": text}
+
+
+def test_shared_chunks_are_embedded_once(embed):
+    library = embeddings.LibraryIndex()
+    a = [chunk("penalty clause"), chunk("term of one year")]
+    b = [chunk("term of one year"), chunk("governing law")]
+    assert library.sync("a", a)["added"] == 2
+    assert library.sync("b", b)["added"] == 1
+    assert len(library) == 3
+    assert sum(len(batch) for batch in embed) == 3
+
+
+def test_search_is_limited_to_the_named_documents(embed):
+    library = embeddings.LibraryIndex()
+    library.sync("a", [chunk("penalty clause"), chunk("term of one year")])
+    library.sync("b", [chunk("governing law")])
+    assert library.search("governing law", k=1) == [(pytest.approx(1.0), "governing law")]
+    assert sorted(text for _, text in library.search("governing law", k=5, docs=["a"])) == [
+        "penalty clause", "term of one year"]
+    assert library.search("anything", docs=["missing"]) == []
+
+
+def test_drop_keeps_chunks_other_documents_hold(embed):
+    library = embeddings.LibraryIndex()
+    library.sync("a", [chunk("penalty clause"), chunk("term of one year")])
+    library.sync("b", [chunk("term of one year")])
+    library.drop("a")
+    assert sorted(library.texts.values()) == ["term of one year"]
+    assert [text for _, text in library.search("penalty clause", k=5)] == ["term of one year"]
+
+
+def test_sync_replaces_a_documents_chunks(embed):
+    library = embeddings.LibraryIndex()
+    library.sync("a", [chunk("old clause"), chunk("kept clause")])
+    stats = library.sync("a", [chunk("kept clause"), chunk("new clause")])
+    assert (stats["added"], stats["removed"]) == (1, 1)
+    assert sorted(library.texts.values()) == ["kept clause", "new clause"]
+
+
+def test_chunks_missing_from_a_short_embed_response_are_retried(embed, monkeypatch):
+    library = embeddings.LibraryIndex()
+    monkeypatch.setattr(embeddings.ollama_client, "embed", lambda texts, model: [fake_vector(texts[0])])
+    stats = library.sync("a", [chunk("penalty clause"), chunk("governing law")])
+    assert (stats["added"], stats["missing"]) == (1, 1)
+    monkeypatch.setattr(embeddings.ollama_client, "embed", lambda texts, model: [fake_vector(t) for t in texts])
+    stats = library.sync("a", [chunk("penalty clause"), chunk("governing law")])
+    assert (stats["added"], stats["missing"]) == (1, 0)
+    assert len(library) == 2
@@ -0,0 +1,30 @@
+import codecs
+
+from clauseease import encoding
+
+
+def test_utf8_and_bom():
+    assert encoding.detect_encoding("Vertragsklausel: Kündigung".encode("utf-8")) == "utf-8"
+    assert encoding.detect_encoding(codecs.BOM_UTF8 + b"Agreement") == "utf-8-sig"
+    assert encoding.detect_encoding(codecs.BOM_UTF16_LE + "Agreement".encode("utf-16-le")).startswith("utf-16")
+
+
+def test_utf8_split_across_sample_windows():
+    # Multi-byte characters cut at window edges must not look like invalid UTF-8
+    data = ("é" * (encoding.SAMPLE_BYTES * 2)).encode("utf-8")
+    windows = encoding.samples(data)
+    assert len(windows) == 3 and all(len(w) == encoding.SAMPLE_BYTES for w in windows)
+    assert encoding.detect_encoding(data) == "utf-8"
+
+
+def test_legacy_text_decodes():
+    data = "Die Kündigungsfrist beträgt drei Monate zum Quartalsende. ".encode("cp1252") * 20
+    text, detected = encoding.decode(data)
+    assert detected != "utf-8"
+    assert "Kündigungsfrist beträgt" in text
+
+
+def test_results_are_cached():
+    data = b"plain ascii contract text " * 10
+    first = encoding.detect_encoding(data)
+    assert encoding.detect_encoding(data) == first
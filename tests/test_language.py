@@ -0,0 +1,16 @@
+from clauseease import language
+
+
+def test_ascii_text_is_english_without_the_detector(monkeypatch):
+    monkeypatch.setattr(language, "detect_code", lambda text: (_ for _ in ()).throw(AssertionError))
+    assert language.detect_language("The “Tenant” shall pay $1,000 – monthly.") == "English"
+
+
+def test_foreign_text_is_detected():
+    assert language.detect_language("El arrendatario pagará la renta el primer día de cada mes.") == "Spanish"
+
+
+def test_tag_chunks_keeps_existing_tags():
+    chunks = [{"text": "Plain English clause."}, {"text": "Texto", "lang": "Spanish"}]
+    assert language.tag_chunks(chunks) == {"English": 21, "Spanish": 5}
+    assert language.needs_translation(chunks[1]["lang"]) and not language.needs_translation(chunks[0]["lang"])
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+from clauseease import importtime, lazy, paths
+
+
+def test_lazy_module_imports_on_first_use():
+    mod = lazy.module("json")
+    assert "not loaded" in repr(mod)
+    assert mod.dumps([1]) == "[1]"
+    assert "loaded" in repr(mod) and "not loaded" not in repr(mod)
+
+
+def test_available_does_not_import():
+    assert lazy.available("json")
+    assert not lazy.available("clauseease_no_such_module")
+
+
+def test_warm_falls_back_to_alternative():
+    lazy._warm([("clauseease_no_such_module", "json")])
+    assert "json" in sys.modules
+
+
+def test_importing_the_package_leaves_heavy_dependencies_unloaded():
+    code = ("import sys, clauseease.pipeline, clauseease.extractors, clauseease.language;"
+            f"print(','.join(m for m in {importtime.HEAVY!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=paths.ROOT,
+                         env={"CLAUSEEASE_PREWARM": "0", "PATH": ""})
+    assert out.stdout.strip() == ""
+
+
+def test_measure_reports_top_level_imports():
+    rows = importtime.measure("import json")
+    assert any(name == "json" and depth == 0 for name, _, _, depth in rows)
+    lines = []
+    assert importtime.report("json", rows, out=lines.append) > 0
+    assert lines[0].startswith("json:")
@@ -0,0 +1,52 @@
+from clauseease import legal_chunker
+
+CONTRACT = """MASTER SERVICES AGREEMENT
+This Agreement is made between Acme Ltd and Globex Inc.
+
+1. DEFINITIONS
+Terms used in this Agreement have the meanings below.
+
+12. Termination
+Either party may terminate this Agreement.
+
+12.1 Termination for convenience
+On ninety days' written notice. Payment is due within 30 days of the notice.
+
+12.2 Termination for cause
+Immediately, on material breach.
+
+Schedule 2 - Fees
+The fees are set out in this schedule.
+"""
+
+
+def test_split_clauses_finds_headings_not_amounts():
+    keys = [key for key, _, _ in legal_chunker.split_clauses(CONTRACT)]
+    assert keys == [None, "1", "12", "12.1", "12.2", "schedule 2"]
+
+
+def test_find_references():
+    assert legal_chunker.find_references("What does clause 12.1 say about Schedule 2?") == ["12.1", "schedule 2"]
+    assert legal_chunker.find_references("Explain § 4 and Article IV") == ["4", "article iv"]
+
+
+def test_lookup_includes_sub_clauses():
+    index = legal_chunker.ClauseIndex.from_text(CONTRACT, max_chars=2000)
+    assert [c["clause"] for c in index.lookup("12")] == ["12", "12.1", "12.2"]
+    keys, chunks = index.resolve("Summarise section 12.2")
+    assert keys == ["12.2"] and "material breach" in chunks[0]["text"]
+    assert index.resolve("What is the governing law?") == ([], [])
+
+
+def test_oversize_clauses_repeat_their_heading():
+    text = "7. Liability\n" + " ".join(f"Sentence number {i} limits liability." for i in range(60))
+    chunks = legal_chunker.chunk_by_clause(text, max_chars=300)
+    assert len(chunks) > 1
+    assert all(len(c["text"]) <= 300 + len("7. Liability (continued)\n") for c in chunks)
+    assert chunks[1]["text"].startswith("7. Liability (continued)")
+    assert {c["clause"] for c in chunks} == {"7"}
+
+
+def test_pack_clauses_never_splits_a_chunk():
+    chunks = [{"text": "a" * 40}, {"text": "b" * 40}, {"text": "c" * 40}]
+    assert legal_chunker.pack_clauses(chunks, 90) == ["a" * 40 + "\n\n" + "b" * 40, "c" * 40]
@@ -0,0 +1,51 @@
+import time
+
+from clauseease import map_rerank
+
+
+def test_is_broad():
+    assert map_rerank.is_broad("List every termination right")
+    assert map_rerank.is_broad("Summarise the indemnities")
+    assert not map_rerank.is_broad("What is the notice period?")
+    assert not map_rerank.is_broad(None)
+
+
+def test_relevant_chunks_best_overlap_first():
+    chunks = ["payment terms and invoices", "termination notice period of thirty days", "governing law"]
+    ranked = map_rerank.relevant_chunks("What is the termination notice period?", chunks)
+    assert ranked == [(1, chunks[1])]
+
+
+def test_relevant_chunks_without_overlap_keeps_document_order():
+    chunks = ["alpha", "beta", "gamma"]
+    assert map_rerank.relevant_chunks("¿Cuál es el plazo?", chunks, limit=2) == [(0, "alpha"), (1, "beta")]
+
+
+def test_parse_scored_json():
+    assert map_rerank.parse_scored('{"answer": "30 days", "score": 9}') == ("30 days", 9.0)
+
+
+def test_parse_scored_wrapped_or_unterminated():
+    assert map_rerank.parse_scored('Sure: {"answer": "Delhi courts", "score": 7') == ("Delhi courts", 7.0)
+    assert map_rerank.parse_scored("score: 2") == ("", 2.0)
+    assert map_rerank.parse_scored("no idea") is None
+
+
+def test_map_answers_sorted_and_stops_early(monkeypatch):
+    calls = []
+
+    def fake_map_one(question, index, text, user, token, affinity):
+        calls.append(index)
+        time.sleep(0.01)
+        return map_rerank.Hit(index, text, 9.0 if index % 2 else 5.0)
+
+    monkeypatch.setattr(map_rerank, "_map_one", fake_map_one)
+    chunks = [f"clause {i} about payment" for i in range(4)]
+    hits = map_rerank.map_answers("payment", chunks, parallel=1, enough=10)
+    assert [hit.chunk for hit in hits] == [1, 3, 0, 2]
+
+    calls.clear()
+    chunks = [f"clause {i} about payment" for i in range(40)]
+    hits = map_rerank.map_answers("payment", chunks, parallel=1, enough=1, high_score=9)
+    assert hits[0].score == 9.0
+    assert len(calls) < len(chunks)
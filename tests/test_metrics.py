@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from clauseease import metrics
+
+
+def test_histogram_quantiles_and_mean():
+    hist = metrics.Histogram(metrics.SECONDS_BUCKETS)
+    for value in (0.1, 0.2, 0.3, 0.4):
+        hist.observe(value)
+    assert hist.count == 4
+    assert abs(hist.mean() - 0.25) < 1e-9
+    assert hist.quantile(0.5) == 0.3
+
+
+def test_prometheus_text_has_cumulative_buckets():
+    registry = metrics.MetricsRegistry()
+    registry.observe("x_seconds", 0.02, stage="chunking")
+    registry.observe("x_seconds", 7, stage="chunking")
+    registry.inc("x_total", 2, result="hit")
+    text = registry.to_prometheus()
+    assert '# TYPE x_seconds histogram' in text
+    assert 'x_seconds_bucket{stage="chunking",le="0.025"} 1' in text
+    assert 'x_seconds_bucket{stage="chunking",le="+Inf"} 2' in text
+    assert 'x_seconds_count{stage="chunking"} 2' in text
+    assert 'x_total{result="hit"} 2' in text
+
+
+def test_label_values_are_escaped():
+    registry = metrics.MetricsRegistry()
+    registry.inc("x_total", model='odd "name"\\with\nnewline')
+    assert 'x_total{model="odd \\"name\\"\\\\with\\nnewline"} 1' in registry.to_prometheus()
+
+
+def test_stage_timer_records_on_error(monkeypatch):
+    monkeypatch.setattr(metrics, "REGISTRY", metrics.MetricsRegistry())
+    with pytest.raises(ValueError):
+        with metrics.stage_timer("failing"):
+            raise ValueError
+    assert metrics.REGISTRY.histogram("clauseease_stage_seconds", stage="failing").count == 1
+
+
+def test_write_prometheus_replaces_the_file(tmp_path):
+    path = tmp_path / "clauseease.prom"
+    metrics.write_prometheus(str(path))
+    assert path.read_text() == metrics.to_prometheus()
+    assert os.listdir(tmp_path) == ["clauseease.prom"]
@@ -0,0 +1,41 @@
+import pytest
+
+from clauseease import ocr, workers
+
+fitz = pytest.importorskip("fitz")
+
+
+@pytest.fixture
+def scan():
+    doc = fitz.open()
+    for _ in range(3):
+        doc.new_page()
+    yield doc
+    doc.close()
+
+
+def test_needs_ocr():
+    assert ocr.needs_ocr("")
+    assert ocr.needs_ocr("  12 \n")
+    assert not ocr.needs_ocr("This Agreement is made between the parties.")
+
+
+def test_ocr_in_worker_runs_serially(scan, monkeypatch):
+    monkeypatch.setattr(ocr, "PAGES", ocr.ContentCache("test_ocr_pages", max_items=10))
+    monkeypatch.setattr(ocr, "_recognise", lambda png, languages: f"{len(png) > 0}:{languages}")
+    monkeypatch.setattr(workers, "in_worker", lambda: True)
+
+    def no_pool():
+        raise AssertionError("an ingestion worker must not start its own OCR pool")
+
+    monkeypatch.setattr(ocr, "_get_pool", no_pool)
+    assert ocr.ocr_pages(scan, [0, 2]) == {0: f"True:{ocr.LANGUAGES}", 2: f"True:{ocr.LANGUAGES}"}
+
+
+def test_ocr_pages_are_cached(scan, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr, "PAGES", ocr.ContentCache("test_ocr_pages", max_items=10))
+    monkeypatch.setattr(ocr, "_recognise", lambda png, languages: calls.append(png) or "text")
+    assert ocr.ocr_pages(scan, [1]) == {1: "text"}
+    assert ocr.ocr_pages(scan, [1]) == {1: "text"}
+    assert len(calls) == 1
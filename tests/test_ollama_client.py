@@ -0,0 +1,70 @@
+import json
+
+import pytest
+import requests
+
+from clauseease import balancer, metrics, ollama_client, slo, standin_server
+from clauseease.scheduler import CancelToken
+
+CONTEXT = "The rent is INR 48,000 per month. Notice is 30 days. The courts of Delhi have jurisdiction."
+
+
+@pytest.fixture(scope="module")
+def standin():
+    server = standin_server.serve(slo._free_port(), tps=1000, prefill_tps=1e6, load_seconds=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    fresh = metrics.MetricsRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", fresh)
+    return fresh
+
+
+def test_extractive_and_scored_replies():
+    prompt = f"{CONTEXT}\nQ: Which courts have jurisdiction?"
+    assert standin_server.extractive_reply(prompt) == "The courts of Delhi have jurisdiction."
+    assert json.loads(standin_server.scored_reply(prompt)) == {
+        "answer": "The courts of Delhi have jurisdiction.", "score": 9}
+    assert standin_server.embedding("rent notice") != standin_server.embedding("courts")
+
+
+def test_generate_records_metrics(standin, registry):
+    text = ollama_client.generate(f"{CONTEXT}\nQ: How much is the rent?", "tinyllama", base_url=standin)
+    assert text == "The rent is INR 48,000 per month."
+    names = {row["metric"] for row in registry.snapshot()}
+    assert {"clauseease_ttft_seconds", "clauseease_decode_tokens_per_second"} <= names
+
+
+def test_cancelled_stream_stops(standin):
+    token = CancelToken()
+    pieces = ollama_client.stream_generate(CONTEXT, "tinyllama", base_url=standin, cancel_token=token)
+    first = next(pieces)
+    token.cancel()
+    assert first and len("".join(pieces)) < len(CONTEXT)
+
+
+def test_models_chat_embed_and_show(standin):
+    assert "nomic-embed-text:latest" in ollama_client.list_models(base_url=standin)
+    assert ollama_client.version(base_url=standin)["version"].endswith("standin")
+    reply = ollama_client.chat([{"role": "user", "content": f"{CONTEXT}\nQ: Notice days?"}],
+                               "tinyllama", base_url=standin)
+    assert reply == "Notice is 30 days."
+    assert len(ollama_client.embed(["a", "b"], "nomic-embed-text", base_url=standin)) == 2
+    assert ollama_client.show("tinyllama", base_url=standin)["model_info"]["tinyllama.context_length"] > 0
+    with pytest.raises(requests.HTTPError):
+        ollama_client.show("missing-model", base_url=standin)
+
+
+def test_refused_endpoint_fails_over(standin, monkeypatch):
+    dead = f"http://127.0.0.1:{slo._free_port()}"
+    pool = balancer.Balancer([dead, standin])
+    pool.start_health_checks = lambda: None
+    # The dead endpoint looks least busy, so it is tried first
+    pool.endpoints[1].in_flight = 5
+    monkeypatch.setattr(ollama_client, "default_balancer", lambda: pool)
+    assert ollama_client.generate(f"{CONTEXT}\nQ: rent?", "tinyllama") == "The rent is INR 48,000 per month."
+    assert not pool.endpoints[0].healthy
+    assert ollama_client.list_models() == standin_server.DEFAULT_MODELS
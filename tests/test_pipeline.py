@@ -0,0 +1,65 @@
+import io
+import zipfile
+
+from clauseease import archive, metrics, pipeline, workers
+
+CONTRACT = b"""1. Definitions
+In this Agreement the following terms apply.
+
+2. Term
+This Agreement lasts for one year from the Effective Date.
+
+3. Termination
+Either party may terminate on thirty days' written notice.
+"""
+
+
+def stage_count(stage):
+    return sum(row["count"] for row in metrics.REGISTRY.snapshot()
+               if row["metric"] == "clauseease_stage_seconds" and f"stage={stage}" in row["labels"].split(", "))
+
+
+def test_prepare_document_in_process():
+    prepared = pipeline.prepare_document(CONTRACT, "lease.txt")
+    assert "metrics" not in prepared
+    assert prepared["full_text"].startswith("1. Definitions")
+    assert prepared["chunks"] and prepared["clause_chunks"]
+
+
+def test_worker_metrics_reach_the_parent():
+    pool = workers.process_pool(1)
+    try:
+        before = stage_count("extraction")
+        prepared = pipeline.collect(pool.submit(pipeline.prepare_document, CONTRACT, "lease.txt").result())
+    finally:
+        pool.shutdown()
+    assert "metrics" not in prepared
+    assert stage_count("extraction") == before + 1
+
+
+def test_archive_ingest_collects_worker_metrics():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("a.txt", CONTRACT)
+        zf.writestr("b.txt", CONTRACT + b"\n4. Notices\nIn writing.\n")
+    pool = workers.process_pool(2)
+    try:
+        before = stage_count("extraction")
+        with zipfile.ZipFile(buffer) as zf:
+            results = list(archive.ingest(zf, executor=pool))
+    finally:
+        pool.shutdown()
+    assert [r.status for r in results] == [archive.PREPARED, archive.PREPARED]
+    assert all("metrics" not in r.value for r in results)
+    assert stage_count("extraction") == before + 2
+
+
+def test_registry_merge_adds_up():
+    source, target = metrics.MetricsRegistry(), metrics.MetricsRegistry()
+    source.observe("t_seconds", 0.2, stage="x")
+    source.inc("t_total", 3, kind="y")
+    target.observe("t_seconds", 0.4, stage="x")
+    target.merge(source.drain())
+    assert target.histogram("t_seconds", stage="x").count == 2
+    assert target.counter("t_total", kind="y") == 3
+    assert source.counter("t_total", kind="y") == 0
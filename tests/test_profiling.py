@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from clauseease import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", False)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def busy():
+    return sum(i * i for i in range(20000))
+
+
+def test_disabled_by_default(profile_dir):
+    with profiling.profile("ingest") as run:
+        assert run is None
+        assert profiling.current() is None
+    assert list(profile_dir.iterdir()) == []
+
+
+def test_requested_needs_the_token(monkeypatch):
+    monkeypatch.setattr(profiling, "TOKEN", "s3cret")
+    assert profiling.requested({"profile": "s3cret"})
+    assert not profiling.requested({"profile": "guess"})
+    monkeypatch.setattr(profiling, "TOKEN", None)
+    assert not profiling.requested({"profile": None})
+
+
+def test_profile_writes_files_including_other_threads(profile_dir):
+    with profiling.profile("ask", label="lease/v2.pdf", enabled=True) as run:
+        assert profiling.current() is run
+
+        def work():
+            with profiling.follow(run):
+                busy()
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        busy()
+    assert profiling.current() is None
+    assert len(run.paths) == 2
+    for path in run.paths:
+        assert path.startswith(str(profile_dir))
+        assert "ask-lease_v2.pdf-" in path
+    assert all((profile_dir / p.rsplit("/", 1)[-1]).stat().st_size for p in run.paths)
+
+
+def test_follow_without_run_is_a_no_op(profile_dir):
+    with profiling.follow():
+        busy()
@@ -0,0 +1,43 @@
+import pytest
+
+from clauseease import router
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    def install(*models):
+        monkeypatch.setattr(router.ollama_client, "list_models", lambda: list(models))
+    return install
+
+
+def test_model_name_adds_latest_tag():
+    assert router.model_name("tinyllama") == "tinyllama:latest"
+    assert router.model_name("llama3.1:8b") == "llama3.1:8b"
+
+
+def test_untagged_install_matches_candidate(installed):
+    installed("tinyllama", "mistral")
+    r = router.ModelRouter()
+    assert r.route(router.MAP, "short text").model == "tinyllama:latest"
+    assert r.route(router.QA, "short text").model == "mistral:latest"
+
+
+def test_fallback_never_picks_an_embedding_model(installed):
+    installed("nomic-embed-text:latest", "qwen2:7b")
+    assert router.ModelRouter().route(router.QA, "question").model == "qwen2:7b"
+
+
+def test_only_embedding_models_keeps_tier_candidate(installed):
+    installed("nomic-embed-text:latest")
+    assert router.ModelRouter().route(router.QA, "question").model == router.TIERS["large"][0]
+
+
+def test_long_map_input_escalates_to_large_tier(installed):
+    installed()
+    text = "x" * 4 * (router.SMALL_MODEL_MAX_INPUT_TOKENS + 1)
+    assert router.ModelRouter().route(router.MAP, text).model == router.TIERS["large"][0]
+
+
+def test_override_wins(installed):
+    installed("tinyllama")
+    assert router.ModelRouter(overrides={router.MAP: "phi3:latest"}).route(router.MAP).model == "phi3:latest"
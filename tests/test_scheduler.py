@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from clauseease.scheduler import (
+    BULK, INTERACTIVE, CancelToken, GenerationCancelled, GenerationScheduler, SchedulerBusy,
+)
+
+
+class Closable:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_cancel_closes_attached_resources():
+    token, resource = CancelToken(), Closable()
+    token.attach(resource)
+    token.cancel()
+    assert token.cancelled and resource.closed
+    late = Closable()
+    token.attach(late)
+    assert late.closed
+    token.reset()
+    assert not token.cancelled
+
+
+def grant_order(scheduler, requests):
+    """Queue ``(user, priority)`` requests behind a held slot and return the order they are served in."""
+    order, lock = [], threading.Lock()
+    hold = scheduler.slot("holder")
+    hold.__enter__()
+
+    def run(user, priority):
+        with scheduler.slot(user, priority):
+            with lock:
+                order.append(user)
+
+    threads = []
+    for user, priority in requests:
+        threads.append(threading.Thread(target=run, args=(user, priority)))
+        threads[-1].start()
+        # Queue in a known order
+        time.sleep(0.05)
+    hold.__exit__(None, None, None)
+    for t in threads:
+        t.join(5)
+    return order
+
+
+def test_interactive_is_served_before_bulk():
+    order = grant_order(GenerationScheduler(), [("bulk", BULK), ("chat", INTERACTIVE)])
+    assert order == ["chat", "bulk"]
+
+
+def test_users_take_turns():
+    requests = [("a", INTERACTIVE), ("a", INTERACTIVE), ("a", INTERACTIVE), ("b", INTERACTIVE)]
+    order = grant_order(GenerationScheduler(), requests)
+    assert order.index("b") <= 1
+
+
+def test_per_user_queue_limit():
+    scheduler, token = GenerationScheduler(max_queued_per_user=1), CancelToken()
+
+    def wait():
+        with pytest.raises(GenerationCancelled):
+            with scheduler.slot("a", token=token):
+                pass
+
+    with scheduler.slot("holder"):
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        time.sleep(0.05)
+        with pytest.raises(SchedulerBusy):
+            with scheduler.slot("a"):
+                pass
+        token.cancel()
+        waiter.join(5)
+
+
+def test_cancelled_while_queued_gives_up_its_place():
+    scheduler, token = GenerationScheduler(), CancelToken()
+    with scheduler.slot("holder"):
+        token.cancel()
+        with pytest.raises(GenerationCancelled):
+            with scheduler.slot("a", token=token):
+                pass
+        assert scheduler.stats()["queued"] == 0
+    assert scheduler.stats() == {"in_flight": 0, "queued": 0}
+
+
+def test_wait_timeout_rejects():
+    scheduler = GenerationScheduler(max_wait=0.2)
+    with scheduler.slot("holder"):
+        with pytest.raises(SchedulerBusy):
+            with scheduler.slot("a"):
+                pass
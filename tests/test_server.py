@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from clauseease import api_client, server, slo, summary_tree  # noqa: E402
+
+CONTRACT = b"""SERVICE AGREEMENT
+
+1. Fees
+The Client shall pay INR 48,000 per month.
+
+2. Termination
+Either party may terminate on 30 days written notice.
+"""
+
+
+@pytest.fixture(scope="module")
+def api():
+    # No Ollama in tests: uploads get no background summary tree
+    patch = pytest.MonkeyPatch()
+    patch.setattr(summary_tree, "for_document", lambda *args, **kwargs: None)
+    with slo.LocalAPI(workers=1) as local:
+        yield local
+    patch.undo()
+
+
+@pytest.fixture
+def client(api):
+    return api_client.APIClient(api.url, user="tester", timeout=60)
+
+
+def test_upload_is_shared_on_repeat(client):
+    doc = client.upload(CONTRACT, "service.txt")
+    assert doc["kind"] and doc["chunk_count"] >= 1
+    assert doc["summary_status"] == summary_tree.SKIPPED
+    again = client.upload(CONTRACT, "service.txt")
+    assert again.key == doc.key and again.shared
+
+
+def test_search_resolves_named_clause(client):
+    doc = client.upload(CONTRACT, "service.txt")
+    found = client.search(doc, "What does clause 2 say?")
+    assert found["clauses"] == ["2"]
+    assert "30 days" in found["results"][0]["text"]
+
+
+def test_unknown_document_and_empty_upload(client):
+    with pytest.raises(api_client.APIError, match="404"):
+        client.search("no-such-document", "rent")
+    with pytest.raises(api_client.APIError, match="400"):
+        client.upload(b"", "empty.txt")
+
+
+def test_healthz_and_metrics(api):
+    import requests
+
+    health = requests.get(f"{api.url}/healthz", timeout=10).json()
+    assert health["status"] == "ok"
+    assert "scheduler" in health and "registry" in health
+    assert "clauseease_" in requests.get(f"{api.url}/metrics", timeout=10).text
+    assert server.USER_HEADER == api_client.USER_HEADER
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from clauseease.scheduler import CancelToken, GenerationCancelled
+from clauseease.singleflight import SingleFlight, flight_key
+
+
+def slow_pieces(release, runs, pieces=("a", "b", "c")):
+    def produce(token):
+        runs.append(token)
+        for piece in pieces:
+            release.wait(5)
+            if token.cancelled:
+                return
+            yield piece
+    return produce
+
+
+def test_flight_key_is_stable():
+    assert flight_key("m", {"b": 1, "a": 2}, "p") == flight_key("m", {"a": 2, "b": 1}, "p")
+    assert flight_key("m", None, "p") != flight_key("m", None, "q")
+
+
+def test_concurrent_callers_share_one_run():
+    flights, release, runs, outputs = SingleFlight("test"), threading.Event(), [], []
+    produce = slow_pieces(release, runs)
+    readers = [threading.Thread(target=lambda: outputs.append("".join(flights.stream("k", produce))))
+               for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    time.sleep(0.2)
+    release.set()
+    for reader in readers:
+        reader.join(5)
+    assert outputs == ["abc"] * 3 and len(runs) == 1
+    assert flights.inflight() == 0
+
+
+def test_unread_stream_holds_nothing():
+    flights, runs = SingleFlight("test"), []
+    stream = flights.stream("k", slow_pieces(threading.Event(), runs))
+    assert flights.inflight() == 0 and not runs
+    stream.close()
+    assert flights.inflight() == 0
+
+
+def test_last_subscriber_leaving_cancels_the_flight():
+    flights, release, runs = SingleFlight("test"), threading.Event(), []
+    release.set()
+    stream = flights.stream("k", slow_pieces(release, runs, pieces=iter(lambda: "x", None)))
+    assert next(stream) == "x"
+    stream.close()
+    assert runs[0].cancelled and flights.inflight() == 0
+
+
+def test_cancelled_caller_raises_after_partial_output():
+    flights, more = SingleFlight("test"), threading.Event()
+
+    def produce(token):
+        yield "a"
+        more.wait(5)
+        yield "b"
+
+    token = CancelToken()
+    stream = flights.stream("k", produce, cancel_token=token)
+    assert next(stream) == "a"
+    token.cancel()
+    with pytest.raises(GenerationCancelled):
+        list(stream)
+    more.set()
+
+
+def test_call_shares_return_value():
+    assert SingleFlight("test").call("k", lambda: 42) == 42
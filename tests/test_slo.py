@@ -0,0 +1,44 @@
+from clauseease import slo
+
+
+def test_contains_ignores_separators():
+    assert slo.contains("The fee is INR 48,000 per month.", "48000")
+    assert not slo.contains("The fee is INR 4,800.", "48000")
+
+
+def test_contract_text_numbers_clauses():
+    text = slo.contract_text({"title": "Lease", "clauses": [["Rent", "Monthly."], ["Term", "One year."]]})
+    assert text.startswith("Lease\n")
+    assert "1. Rent\nMonthly." in text and "2. Term\nOne year." in text
+
+
+def test_timed_stream():
+    text, ttft, total = slo.timed_stream(iter(["a", "b"]))
+    assert text == "ab" and 0 <= ttft <= total
+    assert slo.timed_stream(iter([]))[0] == ""
+
+
+def test_summarize_and_compare():
+    rows = [{"scenario": "qa", "ttft": 0.5, "total": 2.0, "retrieval_hit": True, "correct": True},
+            {"scenario": "qa", "ttft": 0.7, "total": 3.0, "retrieval_hit": False, "correct": True}]
+    summary = slo.summarize(rows)
+    stats = summary["qa"]
+    assert stats["turns"] == 2
+    assert stats["retrieval_hit_rate"] == 0.5 and stats["answer_accuracy"] == 1.0
+    assert stats["ttft_p50"] <= stats["ttft_p95"]
+
+    baseline = {"tolerance": 0.1, "scenarios": {"qa": {"total_p50": 2.5, "retrieval_hit_rate": 0.9,
+                                                        "answer_accuracy": 0.9, "missing_p50": 1}}}
+    breaches = slo.compare(summary, baseline)
+    assert [(scenario, name) for scenario, name, _, _ in breaches] == [("qa", "retrieval_hit_rate")]
+    baseline["scenarios"]["qa"]["total_p50"] = 2.0
+    assert ("qa", "total_p50") in [(s, n) for s, n, _, _ in slo.compare(summary, baseline)]
+
+
+def test_golden_contracts_render():
+    golden = slo.load_golden()
+    names = set()
+    for spec in golden["contracts"]:
+        assert slo.render(spec)
+        names.add(spec["name"])
+    assert {turn["contract"] for turn in golden["turns"]} <= names
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+from clauseease import spool
+
+
+def spooled(data, **options):
+    return spool.SpooledDocument(io.BytesIO(data), **options)
+
+
+def test_chunks_break_on_whitespace_and_cover_the_text():
+    text = " ".join(f"word{i}" for i in range(500))
+    with spooled(text.encode(), chunk_bytes=100) as doc:
+        chunks = list(doc.chunks)
+        assert len(chunks) == len(doc.chunks) > 1
+        assert "".join(chunks) == text
+        assert all(len(c.encode()) <= 100 and not c.startswith(" ") for c in chunks)
+        assert doc.chunks[1:3] == chunks[1:3]
+
+
+def test_utf8_characters_are_never_split():
+    text = "Kündigung " * 300
+    with spooled(text.encode(), chunk_bytes=64) as doc:
+        assert "�" not in "".join(doc.chunks)
+        assert doc.head_text(20) == text[:20]
+
+
+def test_utf16_cannot_be_split_by_bytes():
+    assert not spool.byte_splittable("utf-16")
+    with pytest.raises(ValueError):
+        spooled("text".encode("utf-16"), encoding="utf-16")
+
+
+def test_iter_text_holds_one_block_of_budget():
+    budget = spool.MemoryBudget(limit=16)
+    text = "abcdefgh" * 10
+    with spooled(text.encode(), budget=budget) as doc:
+        seen = []
+        for block in doc.iter_text(block=8):
+            seen.append(budget.used)
+            assert len(block) == 8
+        assert max(seen) == 8 and budget.used == 0
+
+
+def test_budget_refuses_what_does_not_fit():
+    budget = spool.MemoryBudget(limit=10)
+    assert budget.try_acquire(8)
+    assert not budget.try_acquire(3)
+    with pytest.raises(spool.BudgetExceeded):
+        budget.acquire(5, timeout=0.05)
+    budget.release(8)
+    with budget.reserve(10):
+        assert budget.used == 10
+    assert budget.used == 0
+
+
+def test_close_releases_the_map():
+    doc = spooled(b"some contract text")
+    doc.close()
+    assert doc.buf.closed
+    # Closing twice is harmless
+    doc.close()
@@ -0,0 +1,79 @@
+import io
+
+import pytest
+
+from clauseease import legal_chunker, spool, summary_tree, translation_memory, versioning
+
+CONTRACT = """1. Term
+This Agreement lasts one year.
+
+2. Payment
+Fees are due monthly.
+
+2.1 Late payment
+Late fees accrue at 2% per month.
+"""
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(versioning, "SUMMARIES", versioning.ContentCache("test_summaries"))
+    memory = translation_memory.TranslationMemory(str(tmp_path / "tm.sqlite3"))
+    monkeypatch.setattr(translation_memory, "default_memory", lambda: memory)
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    prompts = []
+
+    def generate(tree, task, prompt):
+        prompts.append(prompt)
+        return f"summary {len(prompts)}"
+
+    monkeypatch.setattr(summary_tree.SummaryTree, "_generate", generate)
+    return prompts
+
+
+def tree_for(text=CONTRACT, doc_id="lease"):
+    return summary_tree.SummaryTree(doc_id, legal_chunker.chunk_by_clause(text, max_chars=2000))
+
+
+def test_build_fills_every_level(generated):
+    tree = tree_for()
+    tree.build()
+    assert tree.status == summary_tree.READY
+    assert [s["key"] for s in tree.sections] == ["1", "2"]
+    assert tree.document_summary and all(s["summary"] for s in tree.sections)
+    assert tree.translation is None
+    assert tree.section_summary("summarise clause 2.1").startswith("**2. Payment**")
+
+
+def test_unchanged_chunks_reuse_cached_summaries(generated):
+    tree_for().build()
+    first = len(generated)
+    again = tree_for(doc_id="lease v2")
+    again.build()
+    assert len(generated) == first and again.reused == first
+
+
+def test_cancelled_summaries_are_not_cached(generated, monkeypatch):
+    def cut_off(self, task, prompt):
+        self.token.cancel()
+        return "half a summ"
+
+    with monkeypatch.context() as patch:
+        patch.setattr(summary_tree.SummaryTree, "_generate", cut_off)
+        tree = tree_for()
+        tree.build()
+    assert tree.status == summary_tree.CANCELLED
+    # Nothing from the cut-off run was kept: a new tree generates everything afresh
+    again = tree_for()
+    again.build()
+    assert again.reused == 0 and "half a summ" not in again.chunk_summaries.values()
+
+
+def test_spooled_and_oversized_documents_get_no_tree():
+    with spool.SpooledDocument(io.BytesIO(b"word " * 1000)) as doc:
+        assert summary_tree.for_document("big", doc.chunks) is None
+    chunks = [f"chunk {i}" for i in range(summary_tree.MAX_TREE_CHUNKS + 1)]
+    assert summary_tree.for_document("long", chunks) is None
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from clauseease import tabular  # noqa: E402
+
+CSV = b"""vendor,status,amount
+Acme,active,100
+Acme,expired,50
+Globex,active,300
+Initech,active,25
+"""
+
+
+@pytest.fixture
+def table():
+    return tabular.TableIndex(tabular.read_csv_columnar(io.BytesIO(CSV)), name="contracts.csv")
+
+
+def test_schema_summary(table):
+    summary = table.schema_summary()
+    assert summary.startswith("Table `contracts.csv`: 4 rows x 3 columns")
+    assert "- amount" in summary
+
+
+def test_find_rows_matches_keywords(table):
+    rows = table.find_rows("Which contracts do we have with Globex?")
+    assert list(rows["vendor"].astype(str)) == ["Globex"]
+
+
+def test_aggregates_are_computed_without_the_model(table):
+    assert table.answer_aggregate("What is the total amount?").endswith(": 475")
+    by_vendor = table.answer_aggregate("total amount by vendor")
+    assert "sum of amount by vendor" in by_vendor and "Acme" in by_vendor
+    assert "count of rows" in table.answer_aggregate("How many contracts are active?")
+
+
+def test_non_aggregate_question(table):
+    assert table.answer_aggregate("Who signed the Globex contract?") is None
@@ -0,0 +1,60 @@
+import re
+
+import pytest
+
+from clauseease import translation_memory
+from clauseease.scheduler import CancelToken
+
+
+@pytest.fixture
+def memory(tmp_path):
+    return translation_memory.TranslationMemory(str(tmp_path / "tm.sqlite3"))
+
+
+def numbered_translator(calls):
+    """Stand-in model: "translates" each numbered segment by upper-casing it."""
+    def generate(prompt):
+        calls.append(prompt)
+        return "\n".join(f"[{n}] {text.upper()}" for n, text in re.findall(r"^(\d+)\. (.*)$", prompt, re.M))
+    return generate
+
+
+def test_split_segments_round_trips():
+    text = "Primera cláusula. Segunda cláusula!\n\nTercera; cuarta"
+    assert "".join(s + sep for s, sep in translation_memory.split_segments(text)) == text
+
+
+def test_parse_numbered():
+    assert translation_memory.parse_numbered("[1] one\n2) two", 2) == ["one", "two"]
+    assert translation_memory.parse_numbered("[1] one", 2) is None
+
+
+def test_second_translation_comes_from_memory(memory):
+    calls = []
+    text = "El arrendatario pagará la renta mensual. El contrato dura un año."
+    first = memory.translate(text, "Spanish", numbered_translator(calls))
+    assert first == text.upper() and len(calls) == 1
+    assert memory.translate(text, "Spanish", numbered_translator(calls)) == first
+    assert len(calls) == 1 and memory.stats()["exact"] == 2
+
+
+def test_unparsed_replies_are_not_stored(memory):
+    memory.translate("El contrato dura un año.", "Spanish", lambda prompt: "Sorry, I cannot number that.")
+    assert memory.stats()["segments"] == 0
+
+
+def test_nothing_is_stored_after_cancel(memory):
+    token = CancelToken()
+
+    def generate(prompt):
+        token.cancel()
+        return numbered_translator([])(prompt)
+
+    memory.translate("El contrato dura un año.", "Spanish", generate, cancel_token=token)
+    assert memory.stats()["segments"] == 0
+
+
+def test_fuzzy_match_is_offered_as_a_hint(memory):
+    memory.store("El contrato dura un año.", "The contract lasts one year.", "Spanish")
+    assert memory.fuzzy("El contrato dura dos años.", "Spanish")[1] == "The contract lasts one year."
+    assert memory.fuzzy("Cláusula de confidencialidad.", "Spanish") is None
@@ -0,0 +1,34 @@
+import pytest
+
+from clauseease import paths, tuning
+
+
+@pytest.fixture
+def settings_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "state" / "chunk_settings.json")
+    monkeypatch.setattr(tuning, "SETTINGS_PATH", path)
+    return path
+
+
+def test_no_calibration_returns_default(settings_path):
+    assert tuning.load() == {}
+    assert tuning.chunk_settings(default=(1500, 0)) == (1500, 0)
+
+
+def test_save_and_read_back(settings_path):
+    tuning.save("tinyllama:latest", {"chunk_chars": 1200, "overlap_chars": 120, "quality": 0.9})
+    tuning.save("mistral:latest", {"chunk_chars": 3000}, make_default=False)
+    data = tuning.load()
+    assert data["default"] == "tinyllama:latest"
+    assert "calibrated_at" in data["models"]["mistral:latest"]
+    assert tuning.chunk_settings() == (1200, 120)
+    assert tuning.chunk_settings("mistral") == (3000, 0)
+    assert tuning.chunk_settings("unknown", default=(1, 2)) == (1, 2)
+
+
+def test_state_path_uses_state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(paths, "STATE_DIR", str(tmp_path))
+    path = paths.state_path("x.json")
+    assert path == str(tmp_path / "x.json")
+    assert paths.ensure_parent(str(tmp_path / "a" / "b.json")) == str(tmp_path / "a" / "b.json")
+    assert (tmp_path / "a").is_dir()
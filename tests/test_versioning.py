@@ -0,0 +1,53 @@
+import random
+
+from clauseease import versioning
+
+
+def contract(words=3000, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ["party", "shall", "notice", "term", "fees", "agreement", "breach", "days", "law", "clause"]
+    return " ".join(rng.choice(vocabulary) + str(rng.randrange(50)) for _ in range(words))
+
+
+def test_cdc_chunks_reproduce_the_text():
+    text = contract()
+    chunks = versioning.cdc_chunks(text, avg_chars=400)
+    assert "".join(c["text"] for c in chunks) == text
+    # A chunk closes at the first word boundary past max_chars (3 x avg_chars)
+    assert all(len(c["text"]) < 1200 + 20 for c in chunks)
+    assert [c["id"] for c in chunks] == list(range(len(chunks)))
+
+
+def test_an_edit_only_changes_nearby_chunks():
+    text = contract()
+    edited = text[:5000] + " inserted words here " + text[5000:]
+    before = {c["hash"] for c in versioning.cdc_chunks(text, avg_chars=400)}
+    after = versioning.cdc_chunks(edited, avg_chars=400)
+    changed = [c for c in after if c["hash"] not in before]
+    assert 1 <= len(changed) <= 3
+
+
+def test_version_store_diffs_against_the_previous_version():
+    store = versioning.VersionStore()
+    first = versioning.cdc_chunks(contract(seed=1), avg_chars=400)
+    assert store.add_version("msa", first)["previous"] is None
+    second = first[:-1] + versioning.cdc_chunks("a brand new final clause", avg_chars=400)
+    diff = store.add_version("msa", second)
+    assert diff["version"] == 2 and diff["previous"] == 1
+    assert diff["removed"] == [first[-1]["hash"]] and len(diff["added"]) == 1
+    # Re-uploading the same version does not add one
+    assert store.add_version("msa", second)["version"] == 2
+
+
+def test_document_family():
+    assert versioning.document_family("MSA_v3 (1).pdf") == versioning.document_family("msa.pdf") == "msa"
+
+
+def test_content_cache_is_lru():
+    cache = versioning.ContentCache("test", max_items=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+    assert cache.get_or_compute("d", lambda: 4) == 4
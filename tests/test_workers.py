@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from clauseease import workers
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_process_pool_starts_every_worker():
+    pool = workers.process_pool(3)
+    try:
+        assert len(pool._processes) == 3
+        assert all(process.is_alive() for process in pool._processes.values())
+    finally:
+        pool.shutdown()
+
+
+def test_workers_do_not_rerun_main(tmp_path):
+    marker = tmp_path / "runs.txt"
+    script = tmp_path / "page.py"
+    # Stands in for a Streamlit page: any top-level side effect would repeat in a worker that re-ran it
+    script.write_text(textwrap.dedent(f"""
+        import os, sys
+        sys.path.insert(0, {str(ROOT)!r})
+        from clauseease import workers
+
+        with open({str(marker)!r}, "a") as f:
+            f.write("run\\n")
+
+        if __name__ == "__main__":
+            pool = workers.process_pool(2)
+            pids = {{pool.submit(os.getpid).result() for _ in range(8)}}
+            pool.shutdown()
+            assert os.getpid() not in pids
+    """))
+    subprocess.run([sys.executable, str(script)], check=True, timeout=120)
+    assert marker.read_text().splitlines() == ["run"]
+
+
+def test_in_worker():
+    pool = workers.process_pool(1)
+    try:
+        assert pool.submit(workers.in_worker).result()
+    finally:
+        pool.shutdown()
+    assert not workers.in_worker()